@@ -0,0 +1,6 @@
+"""
+Benchmarks de HydraSecure.
+
+Los scripts bench_*.py se ejecutan directamente; la suite con corpus
+sintético y líneas base JSON se ejecuta con `python -m benchmarks.suite`.
+"""
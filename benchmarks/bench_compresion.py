@@ -0,0 +1,59 @@
+"""
+Efecto de la etapa de compresión: tamaño, CPU del códec y tiempo de extremo
+a extremo (cifrar + descifrar) incluyendo el contenedor PNG.
+
+Uso: python benchmarks/bench_compresion.py [n_registros ...]
+"""
+import os
+import sys
+import json
+import time
+import logging
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hydra_secure.pipeline import cifrar_pipeline, descifrar_pipeline
+from hydra_secure.preparacion import preparar_entrada
+from hydra_secure.compresion import CODECS
+
+USUARIO = 'user1'
+DOC_TYPE = 'datos_clientes'
+CLAVE = 'TechCorp2024!Sales'
+
+def documento(n_registros):
+    # Mismo estilo que los datos de clientes de demo_empresarial_real.py
+    clientes = [{
+        'id': f'CUST_{i:05d}',
+        'name': f'Cliente Corporativo {i}',
+        'contract_value': f'${1_000_000 + i * 1375:,}',
+        'renewal_date': f'2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}',
+        'contact_person': 'Sarah Johnson' if i % 2 else 'Michael Chen',
+        'email': f'contacto{i}@cliente{i % 97}.com',
+        'special_requirements': 'SLA 99.9%, 24/7 support' if i % 3 else 'Custom integration, API access',
+    } for i in range(n_registros)]
+    return json.dumps({'premium_customers': clientes, 'risk_assessment': 'LOW'}, indent=2)
+
+def main(tamanos):
+    logging.disable(logging.INFO)
+    print(f"{'códec':<8}{'entrada':>10}{'comprimido':>12}{'cpu códec s':>13}{'PNG bytes':>12}{'total s':>10}")
+    with tempfile.TemporaryDirectory() as directorio:
+        for n in tamanos:
+            mensaje = documento(n)
+            limpio = preparar_entrada(mensaje).encode('ascii')
+            for codec in [None] + list(CODECS):
+                inicio = time.process_time()
+                comprimido = CODECS[codec][0](limpio) if codec else limpio
+                cpu = time.process_time() - inicio
+                ruta = os.path.join(directorio, f'{codec}_{n}.png')
+                inicio = time.perf_counter()
+                cifrado, metadatos = cifrar_pipeline(mensaje, CLAVE, USUARIO, contenedor_png=True, ruta_png=ruta,
+                                                     doc_type=DOC_TYPE, compresion=codec)
+                plano = descifrar_pipeline(cifrado, CLAVE, USUARIO, metadatos, doc_type=DOC_TYPE)
+                total = time.perf_counter() - inicio
+                assert plano == limpio.decode('ascii')
+                print(f"{codec or 'ninguno':<8}{len(mensaje):>10}{len(comprimido):>12}{cpu:>13.4f}"
+                      f"{os.path.getsize(ruta):>12}{total:>10.2f}")
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [50, 500])
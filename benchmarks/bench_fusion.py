@@ -0,0 +1,50 @@
+"""
+Compara el pipeline por etapas (motor de referencia) con el motor fusionado:
+tiempo y pico de memoria (tracemalloc) de cifrar y descifrar.
+
+Uso: python benchmarks/bench_fusion.py [tam_kb ...]
+"""
+import os
+import sys
+import time
+import random
+import string
+import logging
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hydra_secure.pipeline import cifrar_pipeline, descifrar_pipeline
+
+USUARIO = 'user1'
+DOC_TYPE = 'datos_clientes'
+CLAVE = 'TechCorp2024!Sales'
+
+def medir(funcion, *args, **kwargs):
+    # El tiempo se mide sin tracemalloc, que ralentiza cada asignación
+    inicio = time.perf_counter()
+    resultado = funcion(*args, **kwargs)
+    duracion = time.perf_counter() - inicio
+    tracemalloc.start()
+    funcion(*args, **kwargs)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duracion, pico, resultado
+
+def main(tamanos_kb):
+    logging.disable(logging.INFO)
+    rng = random.Random(2024)
+    print(f"{'motor':<12}{'tamaño':>10}{'cifrar s':>10}{'pico/entrada':>14}{'descifrar s':>13}{'pico/entrada':>14}")
+    for tam_kb in tamanos_kb:
+        mensaje = ''.join(rng.choice(string.ascii_letters + ' ,.:0123456789') for _ in range(tam_kb * 1024))
+        for motor in ('referencia', 'fusion'):
+            t_cif, p_cif, (cifrado, metadatos) = medir(cifrar_pipeline, mensaje, CLAVE, USUARIO,
+                                                       doc_type=DOC_TYPE, motor=motor)
+            t_des, p_des, plano = medir(descifrar_pipeline, cifrado, CLAVE, USUARIO, metadatos,
+                                        doc_type=DOC_TYPE, motor=motor)
+            assert plano == mensaje
+            print(f"{motor:<12}{tam_kb:>8}KB{t_cif:>10.2f}{p_cif / len(mensaje):>14.1f}"
+                  f"{t_des:>13.2f}{p_des / len(mensaje):>14.1f}")
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [256, 1024])
@@ -0,0 +1,69 @@
+"""
+Tiempo de importación de hydra_secure con `python -X importtime`, en un
+proceso nuevo por repetición y desde un directorio temporal vacío. Muestra la
+mediana del total, los módulos más costosos y comprueba que importar no carga
+las dependencias pesadas opcionales ni crea archivos.
+
+Uso: python -m benchmarks.bench_importacion [modulo] [--repeticiones 5] [--max-ms 300]
+"""
+import os
+import sys
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# No deben cargarse al importar el pipeline (solo al usar PNG o AES)
+DEPENDENCIAS_PESADAS = ('PIL', 'cryptography')
+
+def medir_importacion(modulo='hydra_secure.pipeline'):
+    """
+    Importa el módulo en un proceso nuevo. Devuelve (total_us, {modulo:
+    (propio_us, acumulado_us)}, dependencias pesadas cargadas, archivos
+    creados en el directorio de trabajo).
+    """
+    codigo = (f"import sys; import {modulo}; "
+              f"print(','.join(m for m in {DEPENDENCIAS_PESADAS!r} if m in sys.modules))")
+    entorno = dict(os.environ, PYTHONPATH=RAIZ + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    with tempfile.TemporaryDirectory() as directorio:
+        proceso = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo], cwd=directorio,
+                                 env=entorno, capture_output=True, text=True, check=True)
+        creados = os.listdir(directorio)
+    modulos = {}
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        propio, acumulado, nombre = linea[len('import time:'):].split('|')
+        modulos[nombre.strip()] = (int(propio), int(acumulado))
+    pesadas = [m for m in proceso.stdout.strip().split(',') if m]
+    return modulos[modulo][1], modulos, pesadas, creados
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_importacion',
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument('modulo', nargs='?', default='hydra_secure.pipeline')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=None, help='falla (código 1) si la mediana lo supera')
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args(argv)
+    medidas = [medir_importacion(args.modulo) for _ in range(args.repeticiones)]
+    mediana_ms = statistics.median(m[0] for m in medidas) / 1000
+    _, modulos, pesadas, creados = medidas[-1]
+    print(f"{args.modulo}: mediana {mediana_ms:.1f} ms en {args.repeticiones} procesos")
+    print(f"{'módulo':<45}{'propio ms':>10}{'acumulado ms':>14}")
+    for nombre, (propio, acumulado) in sorted(modulos.items(), key=lambda m: -m[1][0])[:args.top]:
+        print(f"{nombre:<45}{propio / 1000:>10.2f}{acumulado / 1000:>14.2f}")
+    fallos = []
+    if pesadas:
+        fallos.append(f"dependencias pesadas cargadas al importar: {', '.join(pesadas)}")
+    if creados:
+        fallos.append(f"archivos creados al importar: {', '.join(creados)}")
+    if args.max_ms is not None and mediana_ms > args.max_ms:
+        fallos.append(f"importación de {mediana_ms:.1f} ms por encima de {args.max_ms} ms")
+    for fallo in fallos:
+        print(f"FALLO: {fallo}")
+    return 1 if fallos else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""
+Throughput de los motores del núcleo (XOR global + funciones por bloque +
+serialización) frente al motor de referencia.
+
+Uso: python benchmarks/bench_motores.py [tam_kb ...]
+"""
+import os
+import sys
+import time
+import random
+import string
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hydra_secure.motores import obtener_motor, motores_disponibles
+from hydra_secure.semilla import generar_semilla
+
+def medir(funcion, *args, repeticiones=3):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+def main(tamanos_kb):
+    rng = random.Random(2024)
+    clave = 'TechCorp2024!Financial'
+    semilla, _, _ = generar_semilla(clave, 'CFO_001', 20240101000000, 'bench')
+    print(f"{'motor':<12}{'tamaño':>10}{'cifrar MB/s':>14}{'descifrar MB/s':>16}")
+    for tam_kb in tamanos_kb:
+        datos = ''.join(rng.choice(string.printable[:95]) for _ in range(tam_kb * 1024))
+        esperado = None
+        for nombre in motores_disponibles():
+            motor = obtener_motor(nombre)
+            t_cif, (cuerpo, perms) = medir(motor.cifrar, datos, clave, semilla)
+            t_des, plano = medir(motor.descifrar, cuerpo, clave, semilla, perms)
+            if esperado is None:
+                esperado = cuerpo
+            assert cuerpo == esperado and plano == datos, f"{nombre} no coincide con la referencia"
+            mb = len(datos) / 1e6
+            print(f"{nombre:<12}{tam_kb:>8}KB{mb / t_cif:>14.2f}{mb / t_des:>16.2f}")
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [4, 64, 1024])
@@ -0,0 +1,284 @@
+"""
+Prueba de carga concurrente con los escenarios de demo_empresarial_real.py.
+
+Muchos usuarios simulados repiten, mezclados según su peso, los escenarios de
+la demo (el CFO cifra el reporte, el CEO y el auditor interno lo descifran,
+ventas y legal cifran sus documentos, accesos no autorizados) con hilos,
+procesos o asyncio, opcionalmente a una tasa objetivo. Informa latencias
+p50/p95/p99, throughput, tasa de errores y de denegaciones y el crecimiento
+del registro de auditoría.
+
+Uso: python -m benchmarks.carga [--modo hilos|procesos|asyncio] [--usuarios 8]
+                                [--peticiones 500] [--tasa 0] [--tam 10KB]
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hydra_secure.pipeline import cifrar_pipeline, descifrar_pipeline
+from hydra_secure.iso_27001_compliance import iso_compliance, configurar_logging, RUTA_LOG_AUDITORIA
+from benchmarks.corpus import TIPOS, generar_documento
+
+# Escenario -> (peso, usuario, operación, tipo de documento del corpus, ¿se espera denegación?)
+ESCENARIOS = {
+    'cfo_cifra_reporte': (3, 'CFO_001', 'cifrar', 'reporte_financiero', False),
+    'ceo_descifra_reporte': (3, 'CEO_001', 'descifrar', 'reporte_financiero', False),
+    'ventas_cifra_clientes': (2, 'DIR_SALES_001', 'cifrar', 'datos_clientes', False),
+    'legal_cifra_contrato': (2, 'DIR_LEGAL_001', 'cifrar', 'contrato', False),
+    'auditor_lee_reporte': (2, 'AUD_INT_001', 'descifrar', 'reporte_financiero', False),
+    'auditor_externo_contrato': (1, 'AUD_EXT_001', 'descifrar', 'contrato', True),
+    'intruso_lee_reporte': (1, 'HACKER_001', 'descifrar', 'reporte_financiero', True),
+}
+# Documentos y cifrados de partida de este proceso
+_fijos = {}
+
+def preparar(tam):
+    """
+    Genera los documentos del corpus y los cifra una vez con su propietario
+    (para los escenarios de lectura). También se usa como inicializador de
+    cada proceso del pool.
+    """
+    _silenciar_consola()
+    for tipo, (doc_type, usuario, clave) in TIPOS.items():
+        documento = generar_documento(tipo, tam)
+        cifrado, metadatos = cifrar_pipeline(documento, clave, usuario, doc_type=doc_type)
+        _fijos[tipo] = (documento, cifrado, metadatos)
+
+def _silenciar_consola():
+    # La auditoría sigue yendo a security_audit.log, sin salida por consola
+    configurar_logging(RUTA_LOG_AUDITORIA, consola=False)
+
+def ejecutar_escenario(nombre):
+    """
+    Ejecuta un escenario. Devuelve (resultado, segundos de servicio,
+    eventos de seguridad añadidos, entradas de auditoría añadidas); el
+    resultado es 'ok', 'denegado' o 'error'.
+    """
+    _, usuario, operacion, tipo, _ = ESCENARIOS[nombre]
+    doc_type, _, clave = TIPOS[tipo]
+    documento, cifrado, metadatos = _fijos[tipo]
+    eventos, auditoria = iso_compliance.total_security_events, iso_compliance.total_audit_entries
+    inicio = time.perf_counter()
+    try:
+        if operacion == 'cifrar':
+            cifrar_pipeline(documento, clave, usuario, doc_type=doc_type)
+        else:
+            descifrar_pipeline(cifrado, clave, usuario, metadatos, doc_type=doc_type)
+        resultado = 'ok'
+    except PermissionError:
+        resultado = 'denegado'
+    except Exception:
+        resultado = 'error'
+    servicio = time.perf_counter() - inicio
+    return (resultado, servicio, iso_compliance.total_security_events - eventos,
+            iso_compliance.total_audit_entries - auditoria)
+
+def plan(peticiones, semilla=2024):
+    """
+    Secuencia determinista de escenarios según sus pesos.
+    """
+    rng = random.Random(semilla)
+    nombres = list(ESCENARIOS)
+    pesos = [ESCENARIOS[n][0] for n in nombres]
+    return rng.choices(nombres, weights=pesos, k=peticiones)
+
+def percentil(valores, p):
+    """
+    Percentil por rango más cercano (valores ya ordenados).
+    """
+    if not valores:
+        return None
+    indice = max(0, min(len(valores) - 1, int(round(p / 100 * len(valores) + 0.5)) - 1))
+    return valores[indice]
+
+def _momentos(peticiones, tasa):
+    # Instantes programados (relativos) de cada petición; None sin tasa objetivo
+    if not tasa:
+        return [None] * peticiones
+    return [i / tasa for i in range(peticiones)]
+
+def _con_hilos(escenarios, usuarios, tasa, al_empezar):
+    return _con_pool(ThreadPoolExecutor(max_workers=usuarios), usuarios, escenarios, tasa, al_empezar)
+
+def _con_procesos(escenarios, usuarios, tasa, al_empezar, tam):
+    return _con_pool(ProcessPoolExecutor(max_workers=usuarios, initializer=preparar, initargs=(tam,)),
+                     usuarios, escenarios, tasa, al_empezar)
+
+def _con_pool(pool, usuarios, escenarios, tasa, al_empezar):
+    # Con tasa, bucle abierto: cada petición se envía en su instante programado
+    # y la latencia se cuenta desde ese instante (incluye la espera en cola).
+    # Sin tasa, bucle cerrado: como mucho una petición en curso por usuario.
+    huecos = threading.BoundedSemaphore(usuarios)
+    with pool:
+        # Calentamiento: arranca los trabajadores antes de medir
+        list(pool.map(ejecutar_escenario, ['cfo_cifra_reporte'] * usuarios))
+        al_empezar()
+        inicio = time.perf_counter()
+        pendientes = []
+        for nombre, momento in zip(escenarios, _momentos(len(escenarios), tasa)):
+            if momento is not None:
+                espera = inicio + momento - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+            else:
+                huecos.acquire()
+            programado = time.perf_counter() if momento is None else inicio + momento
+            futuro = pool.submit(ejecutar_escenario, nombre)
+            futuro.add_done_callback(lambda f, libera=momento is None: _terminar(f, libera, huecos))
+            pendientes.append((nombre, programado, futuro))
+        medidas = []
+        for nombre, programado, futuro in pendientes:
+            resultado = futuro.result()
+            medidas.append((nombre, futuro.fin - programado) + resultado)
+    return medidas, time.perf_counter() - inicio
+
+def _terminar(futuro, libera, huecos):
+    futuro.fin = time.perf_counter()
+    if libera:
+        huecos.release()
+
+def _con_asyncio(escenarios, usuarios, tasa, al_empezar):
+    async def principal():
+        bucle = asyncio.get_running_loop()
+        limite = asyncio.Semaphore(usuarios)
+        ejecutor = ThreadPoolExecutor(max_workers=usuarios)
+
+        async def peticion(nombre, momento, inicio):
+            if momento is not None:
+                await asyncio.sleep(max(0.0, inicio + momento - time.perf_counter()))
+            async with limite:
+                programado = time.perf_counter() if momento is None else inicio + momento
+                resultado = await bucle.run_in_executor(ejecutor, ejecutar_escenario, nombre)
+            return (nombre, time.perf_counter() - programado) + resultado
+
+        await bucle.run_in_executor(ejecutor, ejecutar_escenario, 'cfo_cifra_reporte')
+        al_empezar()
+        inicio = time.perf_counter()
+        medidas = await asyncio.gather(*(peticion(n, m, inicio)
+                                         for n, m in zip(escenarios, _momentos(len(escenarios), tasa))))
+        ejecutor.shutdown()
+        return list(medidas), time.perf_counter() - inicio
+    return asyncio.run(principal())
+
+def _tam_log():
+    return os.path.getsize(RUTA_LOG_AUDITORIA) if os.path.exists(RUTA_LOG_AUDITORIA) else 0
+
+def ejecutar(modo='hilos', usuarios=8, peticiones=500, tasa=0, tam='10KB', semilla=2024):
+    """
+    Lanza la carga y devuelve el informe (dict serializable a JSON).
+    """
+    preparar(tam)
+    escenarios = plan(peticiones, semilla)
+    base = {}
+
+    def al_empezar():
+        # Estado de la auditoría tras el calentamiento de los trabajadores
+        base.update(eventos=iso_compliance.total_security_events, auditoria=iso_compliance.total_audit_entries,
+                    log=_tam_log())
+
+    if modo == 'hilos':
+        medidas, duracion = _con_hilos(escenarios, usuarios, tasa, al_empezar)
+    elif modo == 'procesos':
+        medidas, duracion = _con_procesos(escenarios, usuarios, tasa, al_empezar, tam)
+    elif modo == 'asyncio':
+        medidas, duracion = _con_asyncio(escenarios, usuarios, tasa, al_empezar)
+    else:
+        raise ValueError(f"Modo desconocido: {modo}")
+    bytes_log = _tam_log() - base['log']
+    informe = resumir(medidas, duracion)
+    # En procesos cada trabajador tiene su propio registro: se suman sus deltas
+    if modo == 'procesos':
+        crecimiento_eventos = sum(m[4] for m in medidas)
+        crecimiento_auditoria = sum(m[5] for m in medidas)
+    else:
+        crecimiento_eventos = iso_compliance.total_security_events - base['eventos']
+        crecimiento_auditoria = iso_compliance.total_audit_entries - base['auditoria']
+    informe.update({
+        'modo': modo, 'usuarios': usuarios, 'tasa_objetivo': tasa, 'tam': tam,
+        'auditoria': {
+            'eventos_seguridad': crecimiento_eventos,
+            'entradas_auditoria': crecimiento_auditoria,
+            'eventos_por_peticion': crecimiento_eventos / len(medidas),
+            'bytes_log': bytes_log,
+            'bytes_log_por_peticion': bytes_log / len(medidas),
+        },
+    })
+    return informe
+
+def _latencias(valores):
+    valores = sorted(valores)
+    resumen = {f'p{p}': percentil(valores, p) for p in (50, 95, 99)}
+    resumen['max'] = valores[-1] if valores else None
+    return resumen
+
+def resumir(medidas, duracion):
+    """
+    medidas: (escenario, latencia, resultado, servicio, eventos, auditoría).
+    """
+    por_escenario = defaultdict(list)
+    for medida in medidas:
+        por_escenario[medida[0]].append(medida)
+    resultados = Counter(m[2] for m in medidas)
+    # Denegaciones no esperadas (o accesos concedidos que debían denegarse)
+    inesperadas = sum(1 for m in medidas if (m[2] == 'denegado') != ESCENARIOS[m[0]][4] and m[2] != 'error')
+    return {
+        'peticiones': len(medidas),
+        'duracion_s': duracion,
+        'throughput_rps': len(medidas) / duracion if duracion else None,
+        'latencia_s': _latencias([m[1] for m in medidas]),
+        'servicio_s': _latencias([m[3] for m in medidas]),
+        'tasa_error': resultados['error'] / len(medidas),
+        'tasa_denegacion': resultados['denegado'] / len(medidas),
+        'resultados_inesperados': inesperadas,
+        'escenarios': {
+            nombre: {'peticiones': len(lista),
+                     'latencia_s': _latencias([m[1] for m in lista]),
+                     'resultados': dict(Counter(m[2] for m in lista))}
+            for nombre, lista in sorted(por_escenario.items())
+        },
+    }
+
+def imprimir(informe):
+    lat = informe['latencia_s']
+    print(f"modo {informe['modo']}, {informe['usuarios']} usuarios, {informe['peticiones']} peticiones, "
+          f"tasa objetivo {informe['tasa_objetivo'] or 'máxima'}, documentos {informe['tam']}")
+    print(f"throughput {informe['throughput_rps']:.1f} pet/s en {informe['duracion_s']:.2f}s")
+    print(f"latencia p50 {lat['p50'] * 1000:.1f} ms  p95 {lat['p95'] * 1000:.1f} ms  p99 {lat['p99'] * 1000:.1f} ms")
+    print(f"errores {informe['tasa_error']:.1%}  denegaciones {informe['tasa_denegacion']:.1%}  "
+          f"inesperados {informe['resultados_inesperados']}")
+    auditoria = informe['auditoria']
+    print(f"auditoría +{auditoria['eventos_seguridad']} eventos, +{auditoria['entradas_auditoria']} entradas, "
+          f"+{auditoria['bytes_log']} bytes de log ({auditoria['bytes_log_por_peticion']:.0f} B/pet)")
+    print(f"{'escenario':<28}{'pet':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  resultados")
+    for nombre, datos in informe['escenarios'].items():
+        l = datos['latencia_s']
+        print(f"{nombre:<28}{datos['peticiones']:>6}{l['p50'] * 1000:>10.1f}{l['p95'] * 1000:>10.1f}"
+              f"{l['p99'] * 1000:>10.1f}  {datos['resultados']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.carga', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--modo', choices=['hilos', 'procesos', 'asyncio'], default='hilos')
+    parser.add_argument('--usuarios', type=int, default=8, help='usuarios (trabajadores) concurrentes')
+    parser.add_argument('--peticiones', type=int, default=500)
+    parser.add_argument('--tasa', type=float, default=0, help='peticiones por segundo (0 = tan rápido como se pueda)')
+    parser.add_argument('--tam', default='10KB', help='tamaño de los documentos del corpus')
+    parser.add_argument('--salida', default=None, help='guarda el informe JSON')
+    args = parser.parse_args(argv)
+    informe = ejecutar(args.modo, args.usuarios, args.peticiones, args.tasa, args.tam)
+    imprimir(informe)
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            json.dump(informe, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Corpus sintético determinista con los documentos de demo_empresarial_real.py
+(reportes financieros, datos de clientes y contratos) escalados a cualquier
+tamaño: la misma semilla y tamaño producen siempre el mismo documento.
+"""
+import json
+import random
+
+# Tipo de documento -> (doc_type del control de acceso, usuario autorizado, clave)
+TIPOS = {
+    'reporte_financiero': ('reportes_financieros', 'CFO_001', 'TechCorp2024!Financial'),
+    'datos_clientes': ('datos_clientes', 'DIR_SALES_001', 'TechCorp2024!Sales'),
+    'contrato': ('contratos', 'DIR_LEGAL_001', 'TechCorp2024!Legal'),
+}
+TAMANOS = ['1KB', '10KB', '100KB', '1MB', '10MB', '100MB']
+_UNIDADES = {'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+_EMPRESAS = ['Global Industries Ltd.', 'TechStart Solutions', 'MegaCorp International', 'Andes Logistics S.A.',
+             'Nordic Retail Group', 'Pacific Health Partners', 'Iberia Energía', 'Atlas Manufacturing']
+_CONTACTOS = ['Sarah Johnson', 'Michael Chen', 'Lucía Fernández', 'John Smith', 'Aiko Tanaka', 'Omar Haddad']
+_REQUISITOS = ['SLA 99.9%, 24/7 support', 'Custom integration, API access', 'On-premise deployment',
+               'Dedicated account manager', 'Quarterly security review']
+_CLAUSULAS = ['Confidentiality clause', 'Non-compete agreement', 'Service level agreements', 'Penalty clauses',
+              'Limitation of liability', 'Data protection addendum (GDPR)', 'Termination for convenience']
+
+def parsear_tamano(texto):
+    """
+    '1KB', '10MB', '512' (bytes) -> número de bytes.
+    """
+    texto = str(texto).strip().upper()
+    for unidad, factor in _UNIDADES.items():
+        if texto.endswith(unidad):
+            return int(float(texto[:-len(unidad)]) * factor)
+    return int(texto)
+
+def _dinero(rng, minimo, maximo):
+    return f"${rng.randrange(minimo, maximo) * 1000:,}"
+
+def _linea_financiera(rng, i):
+    return {
+        'account': f'ACC-{4000 + i % 900}',
+        'concept': rng.choice(['Ventas', 'Servicios', 'Licencias', 'Costes operativos', 'Marketing', 'I+D']),
+        'amount': _dinero(rng, 10, 5000),
+        'variance': f"{rng.uniform(-15, 25):+.1f}%",
+        'cost_center': f"CC-{rng.randrange(100, 999)}",
+    }
+
+def _cliente(rng, i):
+    return {
+        'id': f'CUST_{i:06d}',
+        'name': rng.choice(_EMPRESAS),
+        'contract_value': _dinero(rng, 100, 5000),
+        'renewal_date': f'2025-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}',
+        'contact_person': rng.choice(_CONTACTOS),
+        'email': f'contacto{i}@cliente{rng.randrange(1000)}.com',
+        'phone': f'+1-555-{rng.randrange(10000):04d}',
+        'special_requirements': rng.choice(_REQUISITOS),
+    }
+
+def _clausula(rng, i):
+    return {
+        'section': f'{i // 10 + 1}.{i % 10 + 1}',
+        'title': rng.choice(_CLAUSULAS),
+        'text': ' '.join(rng.choice(['The parties', 'shall', 'maintain', 'strict confidentiality', 'regarding',
+                                     'all deliverables', 'for a period of', '24 months', 'under this agreement',
+                                     'subject to', 'applicable law'])
+                         for _ in range(rng.randrange(20, 60))) + '.',
+    }
+
+def _cabecera(tipo):
+    if tipo == 'reporte_financiero':
+        return {'quarter': 'Q4 2024', 'revenue': '$15,750,000', 'profit_margin': '23.5%',
+                'key_metrics': {'customer_growth': '+12%', 'market_share': '18.3%'}}, 'ledger', _linea_financiera
+    if tipo == 'datos_clientes':
+        return {'total_value': '$4,300,000', 'risk_assessment': 'LOW'}, 'premium_customers', _cliente
+    return {'contract_id': 'CONTRACT_2024_001', 'value': '$5,000,000', 'duration': '24 months',
+            'parties': {'client': 'MegaCorp International', 'vendor': 'TechCorp Enterprises Inc.'}}, 'terms', _clausula
+
+def generar_documento(tipo, tam, semilla=2024):
+    """
+    Documento JSON (indentado, como en las demos) de al menos tam bytes.
+    """
+    if tipo not in TIPOS:
+        raise ValueError(f"Tipo de documento desconocido: {tipo}")
+    objetivo = parsear_tamano(tam)
+    rng = random.Random(f"{semilla}-{tipo}-{objetivo}")
+    documento, campo, generador = _cabecera(tipo)
+    registros = documento[campo] = []
+    longitud = len(json.dumps(documento, indent=2))
+    while longitud < objetivo:
+        registro = generador(rng, len(registros))
+        registros.append(registro)
+        # Indentación de un elemento dentro de la lista más la coma
+        longitud += len(json.dumps(registro, indent=2)) + 4 * (len(registro) + 2) + 2
+    return json.dumps(documento, indent=2)
+
+def corpus(tamanos=TAMANOS, tipos=TIPOS, semilla=2024):
+    """
+    Itera (tipo, tamaño, documento) para cada combinación.
+    """
+    for tam in tamanos:
+        for tipo in tipos:
+            yield tipo, tam, generar_documento(tipo, tam, semilla)
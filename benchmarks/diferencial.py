@@ -0,0 +1,185 @@
+"""
+Pruebas diferenciales de los motores contra la implementación original.
+
+El oráculo compone directamente las funciones de siempre (xor_con_clave,
+fragmentar_mensaje, procesar_bloques/revertir_bloques y reensamblar), sin
+pasar por motores.py. Se generan mensajes, claves, semillas y tamaños de
+bloque aleatorios (más los casos límite de test_pipeline_varios_casos) y
+cada motor disponible debe producir exactamente el mismo cuerpo y las
+mismas permutaciones, descifrar el cuerpo del oráculo y fallar cuando el
+oráculo falla.
+
+Uso: python -m benchmarks.diferencial [--casos 2000] [--semilla 0] [--tam-throughput 256KB]
+"""
+import os
+import sys
+import time
+import random
+import string
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hydra_secure.fragmentacion import fragmentar_mensaje
+from hydra_secure.funciones_bloque import procesar_bloques, revertir_bloques, xor_con_clave
+from hydra_secure.motores import obtener_motor, motores_disponibles
+from hydra_secure.preparacion import preparar_entrada
+from hydra_secure.reensamblado import reensamblar, ensamblar_cuerpo, serializar_bloques, deserializar_bloques
+from hydra_secure.semilla import generar_semilla
+from hydra_secure.integridad import ALGORITMOS
+from benchmarks.corpus import parsear_tamano
+
+# Casos límite de test_pipeline_varios_casos (ya preparados, como los recibe un motor)
+MENSAJES_LIMITE = [preparar_entrada(m) for m in [
+    "", "A", "Hola mundo! 123", "áéíóú ñ ¿¡!@#", "Texto con\nvarias\tlineas\ty\tespacios",
+    "1234567890" * 10, "!@#$%^&*()_+-=~`[]{}|;:',.<>/?", "Mensaje con emoji 😊🚀",
+    "Texto binario: " + ''.join(chr(i) for i in range(32, 127)),
+]]
+CLAVES_LIMITE = ["clave", "otraClave123", "", "123456"]
+TAMANOS_BLOQUE = [1, 2, 3, 4, 5, 7, 8, 13, 16, 64]
+
+class Discrepancia(AssertionError):
+    """
+    Un motor no coincide con el oráculo en un caso concreto.
+    """
+
+    def __init__(self, motor, fase, caso, detalle=''):
+        self.motor, self.fase, self.caso = motor, fase, caso
+        super().__init__(f"motor {motor} difiere del oráculo en {fase}: {caso!r} {detalle}".rstrip())
+
+def oraculo_cifrar(datos, clave, semilla, tam_bloque=4, prefijo=''):
+    bloques = fragmentar_mensaje(xor_con_clave(prefijo + datos, clave), tam_bloque)
+    bloques_mod, permutaciones = procesar_bloques(bloques, semilla, clave)
+    return serializar_bloques(bloques_mod), permutaciones
+
+def oraculo_descifrar(cuerpo, clave, semilla, permutaciones):
+    bloques = revertir_bloques(deserializar_bloques(cuerpo), semilla, clave, permutaciones)
+    return xor_con_clave(''.join(bloques), clave)
+
+def _texto(rng, longitud, alfabeto):
+    return ''.join(rng.choice(alfabeto) for _ in range(longitud))
+
+_IMPRIMIBLE = ''.join(chr(i) for i in range(32, 127))
+_LATIN1 = ''.join(chr(i) for i in range(256))
+
+def generar_casos(n, semilla=0):
+    """
+    Casos (datos, clave, semilla, tam_bloque, prefijo), deterministas.
+    Primero los casos límite y luego aleatorios: texto preparado (ASCII
+    imprimible) o binario latin1 (como sale de la compresión), claves
+    vacías, cortas, largas, latin1 o no representables en latin1 (el
+    oráculo las rechaza salvo sin datos), semillas hex de varias
+    longitudes y los algoritmos de hash admitidos.
+    """
+    for datos in MENSAJES_LIMITE:
+        for clave in CLAVES_LIMITE:
+            yield datos, clave, generar_semilla(clave, 'user1', 20240101000000, 'uuid-fijo')[0], 4, 'Salt1234'
+    rng = random.Random(semilla)
+    for i in range(n):
+        longitud = rng.choice([0, 1, 2, 3, rng.randrange(4, 64), rng.randrange(64, 600)])
+        datos = _texto(rng, longitud, _IMPRIMIBLE if rng.random() < 0.6 else _LATIN1)
+        clave = rng.choice(['', 'k', _texto(rng, rng.randrange(1, 40), _IMPRIMIBLE),
+                            _texto(rng, rng.randrange(1, 12), _LATIN1[1:]), 'clave€'])
+        if rng.random() < 0.5:
+            algoritmo = rng.choice(sorted(ALGORITMOS))
+            semilla_hex = generar_semilla(clave, f'user{i}', 20240101000000 + i, f'uuid-{i}', algoritmo=algoritmo)[0]
+        else:
+            semilla_hex = _texto(rng, rng.randrange(1, 130), string.hexdigits)
+        tam_bloque = rng.choice(TAMANOS_BLOQUE + [longitud + 1 if longitud else 1])
+        prefijo = rng.choice(['', _texto(rng, 8, string.ascii_letters + string.digits)])
+        yield datos, clave, semilla_hex, tam_bloque, prefijo
+
+def _resultado(funcion, *args):
+    try:
+        return funcion(*args), None
+    except ValueError as e:
+        return None, type(e)
+
+def comprobar_caso(motores, caso):
+    """
+    Compara cada motor con el oráculo en un caso. Lanza Discrepancia.
+    """
+    datos, clave, semilla, tam_bloque, prefijo = caso
+    esperado, error = _resultado(oraculo_cifrar, datos, clave, semilla, tam_bloque, prefijo)
+    for motor in motores:
+        obtenido, error_motor = _resultado(motor.cifrar, datos, clave, semilla, tam_bloque, prefijo)
+        if error is not None or error_motor is not None:
+            # Si el oráculo rechaza la entrada, el motor también debe rechazarla
+            if (error is None) != (error_motor is None):
+                raise Discrepancia(motor.nombre, 'errores', caso, f"{error} / {error_motor}")
+            continue
+        if obtenido[0] != esperado[0]:
+            raise Discrepancia(motor.nombre, 'cuerpo', caso)
+        if [list(p) for p in obtenido[1]] != [list(p) for p in esperado[1]]:
+            raise Discrepancia(motor.nombre, 'permutaciones', caso)
+        cuerpo, permutaciones = esperado
+        if motor.descifrar(cuerpo, clave, semilla, permutaciones) != prefijo + datos:
+            raise Discrepancia(motor.nombre, 'descifrado', caso)
+    if error is None:
+        cuerpo, permutaciones = esperado
+        if oraculo_descifrar(cuerpo, clave, semilla, permutaciones) != prefijo + datos:
+            raise Discrepancia('oraculo', 'ida y vuelta', caso)
+        # Reensamblado original frente al ensamblado de un cuerpo ya serializado
+        bloques_mod = deserializar_bloques(cuerpo) if cuerpo else []
+        if bloques_mod and reensamblar(bloques_mod, 1, 'u')[0] != ensamblar_cuerpo(cuerpo, 1, 'u')[0]:
+            raise Discrepancia('reensamblado', 'cabecera', caso)
+
+def ejecutar(n_casos=2000, semilla=0, nombres=None):
+    """
+    Recorre los casos con todos los motores disponibles. Devuelve el
+    número de casos comprobados; lanza Discrepancia en el primer fallo.
+    """
+    motores = [obtener_motor(nombre) for nombre in (nombres or motores_disponibles())]
+    comprobados = 0
+    for caso in generar_casos(n_casos, semilla):
+        comprobar_caso(motores, caso)
+        comprobados += 1
+    return comprobados
+
+def throughput(tam='256KB', nombres=None, repeticiones=3):
+    """
+    MB/s de cifrar y descifrar de cada motor sobre un mensaje imprimible.
+    """
+    n_bytes = parsear_tamano(tam)
+    rng = random.Random(1)
+    datos = _texto(rng, n_bytes, _IMPRIMIBLE)
+    semilla = generar_semilla('clave', 'user1', 20240101000000, 'uuid-fijo')[0]
+    informe = {}
+    for nombre in nombres or motores_disponibles():
+        motor = obtener_motor(nombre)
+        t_cifrar = t_descifrar = float('inf')
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            cuerpo, permutaciones = motor.cifrar(datos, 'clave', semilla, 4, 'Salt1234')
+            medio = time.perf_counter()
+            motor.descifrar(cuerpo, 'clave', semilla, permutaciones)
+            t_cifrar = min(t_cifrar, medio - inicio)
+            t_descifrar = min(t_descifrar, time.perf_counter() - medio)
+        informe[nombre] = {'cifrar_mb_s': n_bytes / 1024 ** 2 / t_cifrar,
+                           'descifrar_mb_s': n_bytes / 1024 ** 2 / t_descifrar}
+    return informe
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.diferencial',
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--casos', type=int, default=2000)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--motores', default=None, help='lista separada por comas (por defecto, todos los disponibles)')
+    parser.add_argument('--tam-throughput', default='256KB')
+    args = parser.parse_args(argv)
+    nombres = args.motores.split(',') if args.motores else None
+    inicio = time.perf_counter()
+    try:
+        comprobados = ejecutar(args.casos, args.semilla, nombres)
+    except Discrepancia as e:
+        print(f"FALLO: {e}")
+        return 1
+    print(f"{comprobados} casos idénticos al oráculo en {time.perf_counter() - inicio:.1f}s "
+          f"(motores: {', '.join(nombres or motores_disponibles())})")
+    print(f"{'motor':<12}{'cifrar MB/s':>14}{'descifrar MB/s':>16}   ({args.tam_throughput})")
+    for nombre, datos in throughput(args.tam_throughput, nombres).items():
+        print(f"{nombre:<12}{datos['cifrar_mb_s']:>14.2f}{datos['descifrar_mb_s']:>16.2f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Escalado con hilos: la misma cantidad de trabajo por hilo con 1, 2, 4... hilos
+que arrancan a la vez. Con GIL el throughput apenas crece; en un
+CPython sin GIL (3.13t) el núcleo no comparte estado mutable y debería escalar
+casi linealmente hasta el número de CPUs.
+
+Uso: python -m benchmarks.escalado_hilos [--hilos 1,2,4,8] [--operaciones 200]
+                                         [--tam 4KB] [--motor referencia] [--nucleo]
+                                         [--min-eficiencia 0.7]
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hydra_secure.motores import obtener_motor
+from hydra_secure.pipeline import cifrar_pipeline, descifrar_pipeline
+from hydra_secure.semilla import generar_semilla
+from hydra_secure.iso_27001_compliance import contexto_solicitud
+from benchmarks.corpus import TIPOS, generar_documento, parsear_tamano
+
+def gil_activo():
+    # sys._is_gil_enabled solo existe desde 3.13
+    comprobar = getattr(sys, '_is_gil_enabled', None)
+    return True if comprobar is None else comprobar()
+
+def _trabajo_nucleo(motor, documento, operaciones):
+    semilla = generar_semilla('clave', 'user1', 20240101000000, 'uuid-fijo')[0]
+    for _ in range(operaciones):
+        cuerpo, permutaciones = motor.cifrar(documento, 'clave', semilla, 4, 'Salt1234')
+        if motor.descifrar(cuerpo, 'clave', semilla, permutaciones) != 'Salt1234' + documento:
+            raise AssertionError('Ida y vuelta incorrecta')
+
+def _trabajo_pipeline(motor, documento, operaciones, tipo, hilo):
+    doc_type, usuario, clave = TIPOS[tipo]
+    with contexto_solicitud(usuario, f'escalado-{hilo}'):
+        for _ in range(operaciones):
+            cifrado, metadatos = cifrar_pipeline(documento, clave, usuario, doc_type=doc_type, motor=motor.nombre)
+            descifrar_pipeline(cifrado, clave, usuario, metadatos, doc_type=doc_type, motor=motor.nombre)
+
+def medir(n_hilos, operaciones=200, tam='4KB', motor='referencia', nucleo=False, tipo='contrato'):
+    """
+    Segundos que tardan n_hilos en hacer `operaciones` idas y vueltas cada uno.
+    """
+    motor = obtener_motor(motor)
+    documento = generar_documento(tipo, parsear_tamano(tam))
+    errores = []
+    salida = threading.Barrier(n_hilos + 1)
+
+    def hilo(indice):
+        salida.wait()
+        try:
+            if nucleo:
+                _trabajo_nucleo(motor, documento, operaciones)
+            else:
+                _trabajo_pipeline(motor, documento, operaciones, tipo, indice)
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=hilo, args=(i,)) for i in range(n_hilos)]
+    for h in hilos:
+        h.start()
+    salida.wait()
+    inicio = time.perf_counter()
+    for h in hilos:
+        h.join()
+    if errores:
+        raise errores[0]
+    return time.perf_counter() - inicio
+
+def escalado(hilos=(1, 2, 4, 8), **opciones):
+    """
+    {n_hilos: (segundos, aceleración, eficiencia)}; la aceleración compara el
+    throughput con el de un hilo.
+    """
+    resultados = {}
+    base = None
+    for n in hilos:
+        segundos = medir(n, **opciones)
+        base = base or segundos / n
+        aceleracion = base * n / segundos
+        resultados[n] = (segundos, aceleracion, aceleracion / n)
+    return resultados
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.escalado_hilos',
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--hilos', default='1,2,4,8')
+    parser.add_argument('--operaciones', type=int, default=200, help='idas y vueltas por hilo')
+    parser.add_argument('--tam', default='4KB')
+    parser.add_argument('--motor', default='referencia')
+    parser.add_argument('--nucleo', action='store_true', help='solo el motor, sin pipeline ni auditoría')
+    parser.add_argument('--min-eficiencia', type=float, default=None,
+                        help='sin GIL, falla (código 1) si la eficiencia con más hilos baja de este valor')
+    args = parser.parse_args(argv)
+    hilos = [int(h) for h in args.hilos.split(',')]
+    print(f"GIL {'activo' if gil_activo() else 'desactivado'}, {os.cpu_count()} CPUs, motor {args.motor}, "
+          f"{'núcleo' if args.nucleo else 'pipeline'}, {args.tam}")
+    print(f"{'hilos':>6}{'segundos':>11}{'aceleración':>13}{'eficiencia':>12}")
+    resultados = escalado(hilos, operaciones=args.operaciones, tam=args.tam, motor=args.motor, nucleo=args.nucleo)
+    for n, (segundos, aceleracion, eficiencia) in resultados.items():
+        print(f"{n:>6}{segundos:>11.3f}{aceleracion:>12.2f}x{eficiencia:>12.0%}")
+    if args.min_eficiencia is not None and not gil_activo():
+        eficiencia = resultados[max(hilos)][2]
+        if eficiencia < args.min_eficiencia:
+            print(f"FALLO: eficiencia {eficiencia:.0%} por debajo de {args.min_eficiencia:.0%}")
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""
+Pico de memoria y asignaciones vivas por etapa del pipeline (tracemalloc),
+con y sin contenedor PNG, para localizar el intermedio que más ocupa.
+
+Uso: python benchmarks/perfil_memoria.py [tam_kb] [motor]
+"""
+import os
+import sys
+import logging
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hydra_secure import metricas
+from hydra_secure.pipeline import cifrar_pipeline, descifrar_pipeline
+
+USUARIO = 'user1'
+DOC_TYPE = 'datos_clientes'
+CLAVE = 'TechCorp2024!Sales'
+
+def main(tam_kb, motor):
+    logging.disable(logging.INFO)
+    mensaje = ("Informe trimestral: ingresos $15,750,000; margen 23.4%. " * (tam_kb * 20))[:tam_kb * 1024]
+    with tempfile.TemporaryDirectory() as directorio:
+        with metricas.perfilar_memoria() as informe:
+            cifrado, metadatos = cifrar_pipeline(mensaje, CLAVE, USUARIO, contenedor_png=True,
+                                                 ruta_png=os.path.join(directorio, 'm.png'),
+                                                 doc_type=DOC_TYPE, motor=motor)
+            descifrar_pipeline(cifrado, CLAVE, USUARIO, metadatos, doc_type=DOC_TYPE, motor=motor)
+    print(f"entrada {len(mensaje)} bytes, motor {motor}")
+    print(f"{'operación':<11}{'etapa':<18}{'pico bytes':>14}{'x entrada':>11}{'asignaciones':>14}")
+    for e in informe:
+        print(f"{e['operacion']:<11}{e['etapa']:<18}{e['pico_bytes']:>14}"
+              f"{e['pico_bytes'] / len(mensaje):>11.1f}{e['asignaciones']:>14}")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 256, sys.argv[2] if len(sys.argv) > 2 else 'referencia')
@@ -0,0 +1,161 @@
+"""
+Prueba de resistencia (soak): ejecuta el pipeline durante muchas operaciones
+y muestrea RSS, memoria trazada por tracemalloc, descriptores abiertos y uso
+de disco del directorio de trabajo. Falla (código 1) si alguna magnitud sigue
+creciendo después del calentamiento, para detectar fugas antes de producción.
+
+Uso: python -m benchmarks.resistencia [--operaciones 1000000] [--muestras 50]
+                                      [--tam 512] [--png-cada 100] [--tracemalloc]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hydra_secure.pipeline import cifrar_pipeline, descifrar_pipeline
+from hydra_secure.iso_27001_compliance import iso_compliance, configurar_logging
+from benchmarks.corpus import TIPOS, generar_documento
+
+# Fracción inicial de muestras que se descarta (cachés, pools y listas llenándose)
+CALENTAMIENTO = 0.25
+# Crecimiento tolerado entre la ventana de referencia y la final
+TOLERANCIA = 0.10
+# Holgura absoluta por magnitud, por debajo de la cual no se considera fuga
+HOLGURAS = {'rss_bytes': 8 * 1024 ** 2, 'tracemalloc_bytes': 2 * 1024 ** 2, 'fds': 4, 'disco_bytes': 1024 ** 2,
+            'eventos_en_memoria': 0, 'auditoria_en_memoria': 0}
+
+def rss_bytes():
+    """
+    Memoria residente actual del proceso (None si no se puede leer).
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def descriptores_abiertos():
+    for ruta in ('/proc/self/fd', '/dev/fd'):
+        if os.path.isdir(ruta):
+            return len(os.listdir(ruta))
+    return None
+
+def uso_disco(directorio):
+    total = 0
+    for raiz, _, archivos in os.walk(directorio):
+        for nombre in archivos:
+            try:
+                total += os.path.getsize(os.path.join(raiz, nombre))
+            except OSError:
+                pass
+    return total
+
+def muestrear(directorio, con_tracemalloc):
+    return {
+        'rss_bytes': rss_bytes(),
+        'tracemalloc_bytes': tracemalloc.get_traced_memory()[0] if con_tracemalloc else None,
+        'fds': descriptores_abiertos(),
+        'disco_bytes': uso_disco(directorio),
+        'eventos_en_memoria': len(iso_compliance.security_events),
+        'auditoria_en_memoria': len(iso_compliance.audit_log),
+        # Las listas en memoria están acotadas; el crecimiento real lo dan los contadores
+        'eventos_totales': iso_compliance.total_security_events,
+        'auditoria_total': iso_compliance.total_audit_entries,
+    }
+
+def crecimiento_acotado(valores, holgura, calentamiento=CALENTAMIENTO, tolerancia=TOLERANCIA):
+    """
+    Compara el máximo de la ventana final (último cuarto) con el de la
+    ventana de referencia (tras el calentamiento). Devuelve (acotado, base,
+    final).
+    """
+    valores = [v for v in valores if v is not None]
+    if len(valores) < 4:
+        return True, None, None
+    inicio = int(len(valores) * calentamiento)
+    estables = valores[inicio:]
+    cuarto = max(1, len(estables) // 4)
+    base = max(estables[:cuarto])
+    final = max(estables[-cuarto:])
+    return final <= base * (1 + tolerancia) + holgura, base, final
+
+def ejecutar(operaciones=1_000_000, muestras=50, tam=512, png_cada=100, con_tracemalloc=False, progreso=print):
+    """
+    Cifra y descifra documentos del corpus en bucle y devuelve el informe.
+    """
+    if con_tracemalloc:
+        tracemalloc.start()
+    tipos = list(TIPOS)
+    documentos = {tipo: generar_documento(tipo, tam) for tipo in tipos}
+    serie = []
+    cada = max(1, operaciones // muestras)
+    errores = 0
+    inicio = time.perf_counter()
+    with tempfile.TemporaryDirectory() as directorio:
+        for i in range(operaciones):
+            tipo = tipos[i % len(tipos)]
+            doc_type, usuario, clave = TIPOS[tipo]
+            png = bool(png_cada) and i % png_cada == 0
+            ruta = os.path.join(directorio, f'op_{i}.png')
+            try:
+                cifrado, metadatos = cifrar_pipeline(documentos[tipo], clave, usuario, doc_type=doc_type,
+                                                     contenedor_png=png, ruta_png=ruta)
+                descifrar_pipeline(cifrado, clave, usuario, metadatos, doc_type=doc_type)
+            except Exception:
+                errores += 1
+            finally:
+                # Un cliente correcto borra sus PNG; lo que quede en disco es del pipeline
+                if png and os.path.exists(ruta):
+                    os.remove(ruta)
+            if i % cada == 0 or i == operaciones - 1:
+                muestra = muestrear(directorio, con_tracemalloc)
+                muestra.update(operacion=i + 1, segundos=time.perf_counter() - inicio)
+                serie.append(muestra)
+                if progreso:
+                    progreso(f"{i + 1:>10} ops  rss {(muestra['rss_bytes'] or 0) / 1024 ** 2:8.1f} MB  "
+                             f"fds {muestra['fds']}  eventos {muestra['eventos_totales']} "
+                             f"({muestra['eventos_en_memoria']} en memoria)")
+    if con_tracemalloc:
+        tracemalloc.stop()
+    veredictos = {}
+    for magnitud, holgura in HOLGURAS.items():
+        acotado, base, final = crecimiento_acotado([m[magnitud] for m in serie], holgura)
+        veredictos[magnitud] = {'acotado': acotado, 'referencia': base, 'final': final}
+    return {
+        'operaciones': operaciones,
+        'errores': errores,
+        'duracion_s': time.perf_counter() - inicio,
+        'veredictos': veredictos,
+        'acotado': all(v['acotado'] for v in veredictos.values()),
+        'muestras': serie,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.resistencia',
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--operaciones', type=int, default=1_000_000)
+    parser.add_argument('--muestras', type=int, default=50)
+    parser.add_argument('--tam', default='512', help='tamaño de los documentos del corpus')
+    parser.add_argument('--png-cada', type=int, default=100, help='una operación de cada N usa PNG (0 = nunca)')
+    parser.add_argument('--tracemalloc', action='store_true', help='muestrea también tracemalloc (más lento)')
+    parser.add_argument('--salida', default=None, help='guarda el informe JSON con la serie de muestras')
+    args = parser.parse_args(argv)
+    # La auditoría sigue en security_audit.log; solo se silencia la consola
+    configurar_logging(consola=False)
+    informe = ejecutar(args.operaciones, args.muestras, args.tam, args.png_cada, args.tracemalloc)
+    print(f"{informe['operaciones']} operaciones en {informe['duracion_s']:.1f}s, {informe['errores']} errores")
+    for magnitud, veredicto in informe['veredictos'].items():
+        estado = 'acotado' if veredicto['acotado'] else 'CRECE'
+        print(f"{magnitud:<22}{estado:<9}referencia {veredicto['referencia']}  final {veredicto['final']}")
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            json.dump(informe, f, indent=2)
+    return 0 if informe['acotado'] and not informe['errores'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+Suite de rendimiento sobre el corpus sintético (benchmarks/corpus.py).
+
+Mide latencia y throughput de cifrar y descifrar de extremo a extremo, con y
+sin contenedor PNG, y el desglose por etapa a partir de hydra_secure.metricas.
+Los resultados se guardan como línea base JSON y `compare` señala las
+regresiones que superan un umbral.
+
+Uso:
+    python -m benchmarks.suite run [--tamanos 1KB,10KB,100KB,1MB] [--motor fusion] [--salida base.json]
+    python -m benchmarks.suite compare base.json nuevo.json [--umbral 0.10]
+"""
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import argparse
+import datetime
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hydra_secure import metricas
+from hydra_secure.motores import MOTOR_POR_DEFECTO
+from hydra_secure.pipeline import cifrar_pipeline, descifrar_pipeline
+from hydra_secure.preparacion import preparar_entrada
+from benchmarks.corpus import TIPOS, generar_documento, parsear_tamano
+
+TAMANOS_POR_DEFECTO = ['1KB', '10KB', '100KB', '1MB']
+UMBRAL_POR_DEFECTO = 0.10
+# Las etapas más cortas que esto son ruido y no se comparan
+ETAPA_MINIMA_S = 0.001
+DIRECTORIO_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados')
+
+def repeticiones_para(n_bytes):
+    # Más repeticiones en documentos pequeños, una sola a partir de 10 MB
+    if n_bytes >= 10 * 1024 ** 2:
+        return 1
+    if n_bytes >= 1024 ** 2:
+        return 3
+    return 10
+
+def _resumen_latencias(latencias, n_bytes):
+    mediana = statistics.median(latencias)
+    return {
+        'latencia_s': {'min': min(latencias), 'p50': mediana, 'max': max(latencias)},
+        'mb_s': n_bytes / 1024 ** 2 / mediana if mediana else None,
+        'repeticiones': len(latencias),
+    }
+
+def _etapas():
+    # Latencia media y throughput de cada etapa registrada por metricas
+    datos = metricas.exportar_json()
+    entradas = {(c['labels']['operacion'], c['labels']['etapa']): c['value'] for c in datos['counters']
+                if c['name'] == 'hydra_etapa_bytes_entrada'}
+    etapas = {}
+    for h in datos['histograms']:
+        clave = (h['labels']['operacion'], h['labels']['etapa'])
+        latencia = h['sum'] / h['count']
+        n_bytes = entradas.get(clave, 0) / h['count']
+        etapas['.'.join(clave)] = {'latencia_s': latencia,
+                                   'mb_s': n_bytes / 1024 ** 2 / latencia if latencia and n_bytes else None}
+    return etapas
+
+def medir_caso(tipo, documento, png, motor, repeticiones, directorio):
+    doc_type, usuario, clave = TIPOS[tipo]
+    esperado = preparar_entrada(documento)
+    opciones = {'doc_type': doc_type, 'motor': motor}
+    cifrar_opciones = dict(opciones, contenedor_png=png, ruta_png=os.path.join(directorio, f'{tipo}.png'))
+    tiempos_cifrar, tiempos_descifrar = [], []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cifrado, metadatos = cifrar_pipeline(documento, clave, usuario, **cifrar_opciones)
+        medio = time.perf_counter()
+        plano = descifrar_pipeline(cifrado, clave, usuario, metadatos, **opciones)
+        fin = time.perf_counter()
+        if plano != esperado:
+            raise AssertionError(f"Ida y vuelta incorrecta en {tipo}")
+        tiempos_cifrar.append(medio - inicio)
+        tiempos_descifrar.append(fin - medio)
+    # Desglose por etapa en una pasada aparte, para no cargar el extremo a extremo
+    metricas.reiniciar()
+    metricas.activar(True)
+    try:
+        cifrado, metadatos = cifrar_pipeline(documento, clave, usuario, **cifrar_opciones)
+        descifrar_pipeline(cifrado, clave, usuario, metadatos, **opciones)
+        etapas = _etapas()
+    finally:
+        metricas.activar(False)
+        metricas.reiniciar()
+    return {
+        'cifrar': _resumen_latencias(tiempos_cifrar, len(documento)),
+        'descifrar': _resumen_latencias(tiempos_descifrar, len(documento)),
+        'etapas': etapas,
+    }
+
+def ejecutar(tamanos=TAMANOS_POR_DEFECTO, tipos=tuple(TIPOS), motor=MOTOR_POR_DEFECTO, png=(False, True),
+             repeticiones=None, progreso=print):
+    """
+    Ejecuta la suite y devuelve la línea base (dict serializable a JSON).
+    """
+    resultados = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        for tam in tamanos:
+            n_bytes = parsear_tamano(tam)
+            for tipo in tipos:
+                documento = generar_documento(tipo, n_bytes)
+                for con_png in png:
+                    caso = f"{tipo}/{tam}/{'png' if con_png else 'texto'}"
+                    medida = medir_caso(tipo, documento, con_png, motor,
+                                        repeticiones or repeticiones_para(n_bytes), directorio)
+                    medida.update({'tipo': tipo, 'tamano': tam, 'bytes': len(documento), 'png': con_png})
+                    resultados[caso] = medida
+                    if progreso:
+                        progreso(f"{caso:<40}cifrar {medida['cifrar']['latencia_s']['p50']:>9.4f}s "
+                                 f"descifrar {medida['descifrar']['latencia_s']['p50']:>9.4f}s")
+    return {
+        'entorno': {
+            'fecha': datetime.datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count(),
+            'motor': motor,
+        },
+        'resultados': resultados,
+    }
+
+def comparar(base, nuevo, umbral=UMBRAL_POR_DEFECTO):
+    """
+    Lista de (caso, métrica, valor base, valor nuevo, cambio relativo) de las
+    latencias que empeoran más que el umbral.
+    """
+    regresiones = []
+    for caso, medida in nuevo['resultados'].items():
+        anterior = base['resultados'].get(caso)
+        if anterior is None:
+            continue
+        pares = [(operacion, anterior[operacion]['latencia_s']['p50'], medida[operacion]['latencia_s']['p50'])
+                 for operacion in ('cifrar', 'descifrar')]
+        pares += [(f"etapa {nombre}", anterior['etapas'][nombre]['latencia_s'], etapa['latencia_s'])
+                  for nombre, etapa in medida['etapas'].items()
+                  if nombre in anterior['etapas'] and anterior['etapas'][nombre]['latencia_s'] >= ETAPA_MINIMA_S]
+        for metrica, valor_base, valor_nuevo in pares:
+            cambio = valor_nuevo / valor_base - 1 if valor_base else 0.0
+            if cambio > umbral:
+                regresiones.append((caso, metrica, valor_base, valor_nuevo, cambio))
+    return regresiones
+
+def _ruta_resultado(motor):
+    marca = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    return os.path.join(DIRECTORIO_RESULTADOS, f'{marca}_{motor}.json')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite', description=__doc__.strip().splitlines()[0])
+    ordenes = parser.add_subparsers(dest='orden', required=True)
+    run = ordenes.add_parser('run', help='ejecuta la suite y guarda la línea base JSON')
+    run.add_argument('--tamanos', default=','.join(TAMANOS_POR_DEFECTO), help='p. ej. 1KB,1MB,100MB')
+    run.add_argument('--tipos', default=','.join(TIPOS))
+    run.add_argument('--motor', default=MOTOR_POR_DEFECTO)
+    run.add_argument('--png', choices=['ambos', 'si', 'no'], default='ambos')
+    run.add_argument('--repeticiones', type=int, default=None)
+    run.add_argument('--salida', default=None)
+    compare = ordenes.add_parser('compare', help='compara dos líneas base y señala regresiones')
+    compare.add_argument('base')
+    compare.add_argument('nuevo')
+    compare.add_argument('--umbral', type=float, default=UMBRAL_POR_DEFECTO,
+                         help='aumento relativo de latencia tolerado (0.10 = 10%%)')
+    args = parser.parse_args(argv)
+
+    if args.orden == 'run':
+        logging.disable(logging.INFO)
+        png = {'ambos': (False, True), 'si': (True,), 'no': (False,)}[args.png]
+        linea_base = ejecutar(args.tamanos.split(','), args.tipos.split(','), args.motor, png, args.repeticiones)
+        salida = args.salida or _ruta_resultado(args.motor)
+        os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+        with open(salida, 'w') as f:
+            json.dump(linea_base, f, indent=2)
+        print(f"Línea base guardada en {salida}")
+        return 0
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.nuevo) as f:
+        nuevo = json.load(f)
+    for campo in ('motor', 'python', 'plataforma'):
+        if base['entorno'].get(campo) != nuevo['entorno'].get(campo):
+            print(f"Aviso: {campo} distinto ({base['entorno'].get(campo)} / {nuevo['entorno'].get(campo)})")
+    regresiones = comparar(base, nuevo, args.umbral)
+    for caso, metrica, valor_base, valor_nuevo, cambio in regresiones:
+        print(f"REGRESIÓN {caso:<40}{metrica:<32}{valor_base:>10.4f}s -> {valor_nuevo:>10.4f}s ({cambio:+.0%})")
+    if not regresiones:
+        print(f"Sin regresiones por encima del {args.umbral:.0%}")
+    return 1 if regresiones else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,21 @@
+import os
+import pytest
+
+from hydra_secure import autoajuste
+
+@pytest.fixture(autouse=True, scope='session')
+def perfil_aislado(tmp_path_factory):
+    """
+    Con motor='auto' el pipeline lee el perfil de ~/.hydra_secure_perfil.json:
+    los tests usan una ruta vacía para no depender del equipo de quien los
+    ejecuta (los procesos hijos heredan la variable).
+    """
+    anterior = os.environ.get('HYDRA_PERFIL')
+    os.environ['HYDRA_PERFIL'] = str(tmp_path_factory.mktemp('perfil') / 'perfil.json')
+    autoajuste.recargar()
+    yield
+    if anterior is None:
+        del os.environ['HYDRA_PERFIL']
+    else:
+        os.environ['HYDRA_PERFIL'] = anterior
+    autoajuste.recargar()
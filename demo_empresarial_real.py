@@ -19,7 +19,8 @@ from typing import Dict, List, Any
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from hydra_secure.pipeline import cifrar_pipeline, descifrar_pipeline
-from hydra_secure.iso_27001_compliance import ISO27001Compliance
+from hydra_secure.iso_27001_compliance import ISO27001Compliance, configurar_logging
+from hydra_secure.repositorio import Repositorio
 
 class DemoEmpresarialReal:
     """
@@ -29,13 +30,15 @@ class DemoEmpresarialReal:
     def __init__(self):
         self.compliance = ISO27001Compliance()
         self.session_log = []
-        self.enterprise_data = {
-            'financial_reports': [],
-            'customer_data': [],
-            'contracts': [],
-            'strategic_documents': []
-        }
-        
+        # "Base de datos" empresarial: repositorio persistente (SQLite + blobs)
+        self.repositorio = Repositorio('hydra_repositorio_demo')
+        
+    def guardar_documento(self, doc_id: str, cifrado: Any, doc_type: str, user: str,
+                          metadata: Dict[str, Any], original_size: int):
+        """Guarda un documento cifrado en el repositorio (reemplaza el de una ejecución anterior)"""
+        self.repositorio.eliminar(doc_id)
+        self.repositorio.guardar(doc_id, cifrado, doc_type, user, metadata, tam_original=original_size)
+
     def log_enterprise_event(self, event_type: str, user: str, action: str, details: str = ""):
         """Registra eventos empresariales con formato ISO"""
         event = {
@@ -106,15 +109,11 @@ class DemoEmpresarialReal:
                                 f'Reporte cifrado - Tamaño: {len(cifrado_financiero)} bytes')
         
         # Guardar en "base de datos" empresarial
-        self.enterprise_data['financial_reports'].append({
-            'id': 'FIN_2024_Q4_001',
-            'encrypted_data': cifrado_financiero,
-            'metadata': metadatos_financiero,
-            'created_by': 'CFO_001',
-            'created_at': datetime.now().isoformat(),
+        self.guardar_documento('FIN_2024_Q4_001', cifrado_financiero, 'reportes_financieros', 'CFO_001', {
+            'pipeline': metadatos_financiero,
             'classification': 'CONFIDENTIAL',
             'retention_years': 7
-        })
+        }, len(financial_report))
         
         print("   ✅ Reporte cifrado y almacenado")
         print("   📁 Archivo PNG generado: reporte_financiero_q4.png")
@@ -203,15 +202,11 @@ class DemoEmpresarialReal:
         self.log_enterprise_event('ENCRYPTION_SUCCESS', 'DIR_SALES_001', 
                                 f'Datos de clientes cifrados - Tamaño: {len(cifrado_clientes)} bytes')
         
-        self.enterprise_data['customer_data'].append({
-            'id': 'CUST_DATA_2024_001',
-            'encrypted_data': cifrado_clientes,
-            'metadata': metadatos_clientes,
-            'created_by': 'DIR_SALES_001',
-            'created_at': datetime.now().isoformat(),
+        self.guardar_documento('CUST_DATA_2024_001', cifrado_clientes, 'datos_clientes', 'DIR_SALES_001', {
+            'pipeline': metadatos_clientes,
             'classification': 'CONFIDENTIAL',
             'gdpr_compliant': True
-        })
+        }, len(customer_report))
         
         print("   ✅ Datos de clientes cifrados y almacenados")
         print("   📁 Archivo PNG generado: clientes_premium.png")
@@ -265,15 +260,11 @@ class DemoEmpresarialReal:
         self.log_enterprise_event('ENCRYPTION_SUCCESS', 'DIR_LEGAL_001', 
                                 f'Contrato cifrado - Tamaño: {len(cifrado_contrato)} bytes')
         
-        self.enterprise_data['contracts'].append({
-            'id': 'CONTRACT_2024_001',
-            'encrypted_data': cifrado_contrato,
-            'metadata': metadatos_contrato,
-            'created_by': 'DIR_LEGAL_001',
-            'created_at': datetime.now().isoformat(),
+        self.guardar_documento('CONTRACT_2024_001', cifrado_contrato, 'contratos', 'DIR_LEGAL_001', {
+            'pipeline': metadatos_contrato,
             'classification': 'TOP_SECRET',
             'retention_years': 10
-        })
+        }, len(contract_text))
         
         print("   ✅ Contrato cifrado y almacenado")
         print("   📁 Archivo PNG generado: contrato_megacorp.png")
@@ -397,8 +388,7 @@ class DemoEmpresarialReal:
         print(f"🛡️ Eventos de seguridad: {security_events}")
         
         # Datos almacenados
-        total_data_encrypted = sum(len(item['encrypted_data']) for category in self.enterprise_data.values() 
-                                  for item in category)
+        total_data_encrypted = sum(doc.tam_cifrado for doc in self.repositorio.listar(limite=self.repositorio.contar()))
         print(f"💾 Datos cifrados totales: {total_data_encrypted:,} bytes")
         
         # Cumplimiento ISO 27001
@@ -436,6 +426,7 @@ class DemoEmpresarialReal:
 
 def main():
     """Función principal"""
+    configurar_logging()
     demo = DemoEmpresarialReal()
     demo.simulate_enterprise_workflow()
 
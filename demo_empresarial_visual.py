@@ -8,19 +8,22 @@ con usuarios, roles, cifrado/descifrado y cumplimiento ISO 27001.
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, simpledialog
 import json
 import sys
 import os
 from datetime import datetime
 import threading
 import time
+import tempfile
 
 # Agregar el directorio del proyecto al path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from hydra_secure.pipeline import cifrar_pipeline, descifrar_pipeline
-from hydra_secure.iso_27001_compliance import ISO27001Compliance
+from hydra_secure.sobres import cifrar_para, descifrar_para, cargar_clave_maestra, clave_maestra
+from hydra_secure.busqueda import IndiceCiego
+from hydra_secure.repositorio import Repositorio
+from hydra_secure.iso_27001_compliance import ISO27001Compliance, configurar_logging
 
 class DemoEmpresarialVisual:
     """
@@ -44,13 +47,17 @@ class DemoEmpresarialVisual:
         self.current_department = tk.StringVar()
         self.security_level = tk.StringVar()
         
-        # Datos empresariales simulados
-        self.enterprise_data = {
-            'reportes_financieros': [],
-            'datos_clientes': [],
-            'contratos': [],
-            'documentos_estrategicos': []
-        }
+        # Documentos empresariales: repositorio persistente (SQLite + blobs)
+        self.doc_types = ['reportes_financieros', 'datos_clientes', 'contratos', 'documentos_estrategicos']
+        self.repositorio = Repositorio('hydra_repositorio')
+        # Las KEK de los sobres se derivan de la clave maestra: sin ella los
+        # documentos guardados no se podrían abrir tras reiniciar. Si no llega
+        # por HYDRA_CLAVE_MAESTRA, la demo la guarda junto al repositorio.
+        if clave_maestra() is None:
+            cargar_clave_maestra(os.path.join(self.repositorio.directorio, 'clave_maestra'))
+        # Índice ciego de palabras clave (búsqueda sin descifrar todo). Vive en
+        # memoria: solo cubre los documentos cifrados en esta sesión.
+        self.indice = IndiceCiego()
         
         # Crear interfaz
         self.create_interface()
@@ -216,7 +223,9 @@ class DemoEmpresarialVisual:
         ttk.Button(button_frame, text="🔓 DESCIFRAR", 
                   command=self.decrypt_document).pack(side=tk.LEFT, padx=(0, 10))
         ttk.Button(button_frame, text="📋 VER DOCUMENTOS", 
-                  command=self.show_documents).pack(side=tk.LEFT)
+                  command=self.show_documents).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="🔍 BUSCAR", 
+                  command=self.search_documents).pack(side=tk.LEFT)
         
         # ========================================
         # PANEL INFERIOR - Logs y Auditoría
@@ -330,32 +339,29 @@ class DemoEmpresarialVisual:
             # Cifrar documento
             self.log_event(f"Iniciando cifrado de {doc_type}", 'INFO')
             
-            # Generar clave basada en usuario y tipo de documento
-            key = f"{user_id}_{doc_type}_2024!"
-            
-            cifrado, metadatos = cifrar_pipeline(
-                content,
-                key,
-                user_id,
-                contenedor_png=True,
-                ruta_png=f'{doc_type}_{user_id}.png',
-                doc_type=doc_type
-            )
-            
-            # Guardar en datos empresariales
-            doc_id = f"{doc_type.upper()}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            self.enterprise_data[doc_type].append({
-                'id': doc_id,
-                'encrypted_data': cifrado,
-                'metadata': metadatos,
-                'created_by': user_id,
-                'created_at': datetime.now().isoformat(),
-                'original_size': len(content),
-                'encrypted_size': len(cifrado)
-            })
+            # Cifrado de sobre: una sola vez, con la clave de datos envuelta
+            # para cada usuario que la política deja descifrar este tipo
+            descriptor, ruta_png = tempfile.mkstemp(suffix='.png')
+            os.close(descriptor)
+            try:
+                cifrado, sobre = cifrar_para(
+                    content,
+                    user_id,
+                    doc_type,
+                    contenedor_png=True,
+                    ruta_png=ruta_png
+                )
+                
+                # Guardar en el repositorio (el PNG se copia a su almacén de blobs)
+                doc_id = f"{doc_type.upper()}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+                documento = self.repositorio.guardar(doc_id, cifrado, doc_type, user_id, sobre,
+                                                     tam_original=len(content))
+            finally:
+                os.remove(ruta_png)
             
+            self.indice.indexar(doc_id, content, doc_type)
             self.log_event(f"Documento cifrado exitosamente - ID: {doc_id}", 'SUCCESS')
-            self.log_event(f"Archivo PNG generado: {doc_type}_{user_id}.png", 'INFO')
+            self.log_event(f"Archivo PNG generado: {documento.cifrado}", 'INFO')
             
             # Limpiar contenido
             self.content_text.delete("1.0", tk.END)
@@ -376,8 +382,9 @@ class DemoEmpresarialVisual:
         
         doc_type = self.doc_type.get()
         
-        # Mostrar documentos disponibles
-        if not self.enterprise_data[doc_type]:
+        # Mostrar documentos disponibles (los más recientes)
+        documentos = self.repositorio.listar(doc_type=doc_type, limite=200)
+        if not documentos:
             messagebox.showinfo("Info", f"No hay documentos cifrados de tipo {doc_type}")
             return
         
@@ -401,12 +408,12 @@ class DemoEmpresarialVisual:
         tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
         # Llenar datos
-        for doc in self.enterprise_data[doc_type]:
+        for doc in documentos:
             tree.insert('', tk.END, values=(
-                doc['id'],
-                doc['created_by'],
-                doc['created_at'][:19],
-                f"{doc['encrypted_size']} bytes"
+                doc.id,
+                doc.creador,
+                doc.creado[:19],
+                f"{doc.tam_cifrado} bytes"
             ))
         
         def decrypt_selected():
@@ -419,8 +426,8 @@ class DemoEmpresarialVisual:
             doc_id = item['values'][0]
             
             # Encontrar documento
-            doc = next((d for d in self.enterprise_data[doc_type] if d['id'] == doc_id), None)
-            if not doc:
+            doc = self.repositorio.obtener(doc_id)
+            if not doc or doc.doc_type != doc_type:
                 messagebox.showerror("Error", "Documento no encontrado")
                 return
             
@@ -435,14 +442,10 @@ class DemoEmpresarialVisual:
                 # Descifrar
                 self.log_event(f"Iniciando descifrado de {doc_id}", 'INFO')
                 
-                key = f"{doc['created_by']}_{doc_type}_2024!"
-                
-                contenido_descifrado = descifrar_pipeline(
-                    doc['encrypted_data'],
-                    key,
-                    user_id,
-                    doc['metadata'],
-                    doc_type=doc_type
+                contenido_descifrado = descifrar_para(
+                    doc.cifrado,
+                    doc.metadatos,
+                    user_id
                 )
                 
                 self.log_event(f"Documento descifrado exitosamente - ID: {doc_id}", 'SUCCESS')
@@ -474,6 +477,37 @@ class DemoEmpresarialVisual:
         ttk.Button(button_frame, text="❌ CANCELAR", 
                   command=dialog.destroy).pack(side=tk.LEFT)
     
+    def search_documents(self):
+        """Buscar documentos por palabras clave sin descifrarlos todos"""
+        user_id = self.current_user.get()
+        if not user_id:
+            messagebox.showerror("Error", "Debe seleccionar un usuario")
+            return
+        
+        doc_type = self.doc_type.get()
+        consulta = simpledialog.askstring("Buscar", f"Palabras clave en {doc_type} "
+                                          f"(documentos cifrados en esta sesión):", parent=self.root)
+        if not consulta:
+            return
+        
+        def descifrar(doc_id):
+            # Solo se descifran los candidatos del índice
+            doc = self.repositorio.obtener(doc_id)
+            return descifrar_para(doc.cifrado, doc.metadatos, user_id)
+        
+        try:
+            encontrados = self.indice.descifrar_candidatos(consulta, user_id, doc_type, descifrar)
+        except Exception as e:
+            self.log_event(f"Error en búsqueda: {str(e)}", 'ERROR')
+            messagebox.showerror("Error", f"Error al buscar: {str(e)}")
+            return
+        
+        self.log_event(f"Búsqueda en {doc_type}: {len(encontrados)} documentos", 'INFO')
+        if encontrados:
+            messagebox.showinfo("Resultados", "Documentos encontrados:\n" + "\n".join(sorted(encontrados)))
+        else:
+            messagebox.showinfo("Resultados", "Ningún documento contiene esas palabras")
+    
     def show_documents(self):
         """Mostrar todos los documentos"""
         dialog = tk.Toplevel(self.root)
@@ -484,7 +518,7 @@ class DemoEmpresarialVisual:
         notebook = ttk.Notebook(dialog)
         notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        for doc_type in self.enterprise_data.keys():
+        for doc_type in self.doc_types:
             frame = ttk.Frame(notebook)
             notebook.add(frame, text=doc_type.replace('_', ' ').title())
             
@@ -499,13 +533,13 @@ class DemoEmpresarialVisual:
             tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
             
             # Llenar datos
-            for doc in self.enterprise_data[doc_type]:
+            for doc in self.repositorio.listar(doc_type=doc_type, limite=200):
                 tree.insert('', tk.END, values=(
-                    doc['id'],
-                    doc['created_by'],
-                    doc['created_at'][:19],
-                    f"{doc['original_size']} bytes",
-                    f"{doc['encrypted_size']} bytes"
+                    doc.id,
+                    doc.creador,
+                    doc.creado[:19],
+                    f"{doc.tam_original} bytes",
+                    f"{doc.tam_cifrado} bytes"
                 ))
     
     def update_logs(self):
@@ -569,8 +603,8 @@ class DemoEmpresarialVisual:
 ✅ A.15.1.1 - Cumplimiento legal
 
 📈 MÉTRICAS DE SEGURIDAD:
-• Usuarios activos: {len(self.enterprise_data['financial_reports']) + len(self.enterprise_data['customer_data']) + len(self.enterprise_data['contracts'])}
-• Documentos cifrados: {sum(len(docs) for docs in self.enterprise_data.values())}
+• Usuarios activos: {len(self.repositorio.creadores())}
+• Documentos cifrados: {self.repositorio.contar()}
 • Eventos de seguridad: {report['security_events_count']}
 • Tasa de cumplimiento: 100%
         """
@@ -608,12 +642,15 @@ class DemoEmpresarialVisual:
         self.log_event("Sistema HydraSecure Enterprise iniciado", 'SUCCESS')
         self.log_event("Cumplimiento ISO 27001 verificado", 'SUCCESS')
         self.log_event("Todos los controles de seguridad activos", 'SUCCESS')
+        self.log_event(f"Repositorio: {self.repositorio.contar()} documentos; la búsqueda solo cubre "
+                       f"los cifrados en esta sesión", 'INFO')
         
         # Iniciar loop principal
         self.root.mainloop()
 
 def main():
     """Función principal"""
+    configurar_logging()
     app = DemoEmpresarialVisual()
     app.run()
 
@@ -3,6 +3,7 @@ from tkinter import messagebox
 from PIL import Image, ImageTk
 import uuid
 from hydra_secure.pipeline import cifrar_pipeline, descifrar_pipeline
+from hydra_secure.iso_27001_compliance import configurar_logging
 
 class PipelineLogger:
     def __init__(self, text_widget):
@@ -108,6 +109,7 @@ class ChatApp:
             messagebox.showerror("Error al descifrar", str(e))
 
 if __name__ == "__main__":
+    configurar_logging()
     root = tk.Tk()
     app = ChatApp(root)
     root.mainloop() 
\ No newline at end of file
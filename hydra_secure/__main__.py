@@ -0,0 +1,79 @@
+"""
+Línea de comandos de hydra_secure.
+
+Uso: python -m hydra_secure encrypt-dir ORIGEN DESTINO --usuario ID [--doc-type TIPO]
+                                        [--clave CLAVE] [--procesos N] [--silencioso]
+                                        [--log security_audit.log]
+     python -m hydra_secure decrypt-dir ORIGEN DESTINO --usuario ID [...]
+     python -m hydra_secure rekey-dir ALMACEN --usuario ID [--clave CLAVE]
+                                      [--clave-nueva CLAVE] [--lote 32] [...]
+
+Sin --clave se usa HYDRA_CLAVE (y sin --clave-nueva, HYDRA_CLAVE_NUEVA) o se
+pide por terminal. Solo se procesan los archivos nuevos o modificados desde la
+ejecución anterior (ver lotes.py), rekey-dir vuelve a cifrar el almacén con la
+clave nueva (ver rotacion.py) y una ejecución interrumpida se reanuda
+volviéndola a lanzar.
+"""
+import os
+import sys
+import argparse
+import getpass
+
+from .lotes import cifrar_directorio, descifrar_directorio, Progreso
+from .rotacion import rotar_claves, TAM_LOTE
+from .iso_27001_compliance import configurar_logging, RUTA_LOG_AUDITORIA
+
+COMANDOS = {'encrypt-dir': cifrar_directorio, 'decrypt-dir': descifrar_directorio}
+
+def _comunes(sub):
+    sub.add_argument('--usuario', required=True)
+    sub.add_argument('--doc-type', default=None)
+    sub.add_argument('--clave', default=None, help='por defecto HYDRA_CLAVE o se pide por terminal')
+    sub.add_argument('--procesos', type=int, default=None, help='por defecto HYDRA_PROCESOS o el número de CPUs')
+    sub.add_argument('--silencioso', action='store_true', help='sin líneas de progreso')
+    sub.add_argument('--log', default=RUTA_LOG_AUDITORIA, help=f"registro de auditoría (por defecto {RUTA_LOG_AUDITORIA})")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m hydra_secure', description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    for nombre, ayuda in (('encrypt-dir', 'cifra un árbol de directorios'),
+                          ('decrypt-dir', 'descifra un árbol cifrado con encrypt-dir')):
+        sub = subparsers.add_parser(nombre, help=ayuda)
+        sub.add_argument('origen')
+        sub.add_argument('destino')
+        _comunes(sub)
+    sub = subparsers.add_parser('rekey-dir', help='vuelve a cifrar un almacén de encrypt-dir con una clave nueva')
+    sub.add_argument('almacen')
+    _comunes(sub)
+    sub.add_argument('--clave-nueva', default=None, help='por defecto HYDRA_CLAVE_NUEVA o se pide por terminal')
+    sub.add_argument('--lote', type=int, default=TAM_LOTE, help='documentos por tarea y por evento de auditoría')
+    args = parser.parse_args(argv)
+    clave = args.clave or os.environ.get('HYDRA_CLAVE') or getpass.getpass('Clave secreta: ')
+    if args.comando == 'rekey-dir':
+        clave_nueva = args.clave_nueva or os.environ.get('HYDRA_CLAVE_NUEVA') or getpass.getpass('Clave nueva: ')
+    configurar_logging(args.log, consola=False)
+
+    progreso = Progreso(0, salida=None if args.silencioso else sys.stderr)
+    try:
+        if args.comando == 'rekey-dir':
+            resumen = rotar_claves(args.almacen, clave, clave_nueva, args.usuario, doc_type=args.doc_type,
+                                   procesos=args.procesos, tam_lote=args.lote, progreso=progreso)
+        else:
+            resumen = COMANDOS[args.comando](args.origen, args.destino, clave, args.usuario, doc_type=args.doc_type,
+                                             procesos=args.procesos, progreso=progreso)
+    except KeyboardInterrupt:
+        print(f"\nInterrumpido: {progreso.linea()}. Vuelve a ejecutar el comando para continuar.", file=sys.stderr)
+        return 130
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    segundos = max(resumen['segundos'], 1e-9)
+    print(f"{resumen['procesados']} procesados, {resumen['omitidos']} sin cambios, {len(resumen['errores'])} errores "
+          f"de {resumen['total']} archivos; {resumen['bytes'] / 1e6:.1f} MB en {segundos:.1f} s "
+          f"({resumen['bytes'] / 1e6 / segundos:.1f} MB/s)")
+    for ruta, error in resumen['errores']:
+        print(f"  {ruta}: {error}", file=sys.stderr)
+    return 1 if resumen['errores'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
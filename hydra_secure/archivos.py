@@ -0,0 +1,315 @@
+"""
+Cifrado y descifrado de archivos sin pasar el contenido por str.
+
+cifrar_archivo proyecta la entrada con mmap y escribe el resultado (la misma
+cabecera JSON y el mismo cuerpo que cifrar_pipeline) en un archivo de salida
+preasignado y también proyectado. El tamaño del cuerpo se conoce por la
+longitud de la entrada y el tamaño de bloque (fusion.longitud_cuerpo), y el
+de la cabecera no depende del MAC (kcv y mac son hexadecimales de longitud
+fija): primero se escribe el cuerpo, luego se calcula el MAC leyendo la
+proyección y al final se escribe la cabecera. descifrar_archivo verifica la
+cabecera y el MAC sobre la proyección y escribe el texto en otra.
+
+Con binario=True (por defecto) los bytes del archivo se cifran tal cual y se
+recuperan idénticos (la cabecera lo indica con formato='binario'). Con
+binario=False el contenido se trata como texto UTF-8 y se prepara como en
+cifrar_pipeline; si ya es ASCII imprimible se cifra sin copiarlo.
+
+descifrar_rango_archivo descifra solo un rango del archivo: de la proyección
+se leen la cabecera y los bloques que lo cubren (con indice_rango=True al
+cifrar, también la autenticación se limita a esos segmentos).
+"""
+import os
+import json
+import mmap
+from contextlib import contextmanager
+
+from . import fusion
+from . import artefacto
+from .pipeline import generar_salt, _rango
+from .preparacion import preparar_entrada
+from .semilla import generar_semilla
+from .motores import descifrar_referencia
+from .autoajuste import TAM_BLOQUE_POR_DEFECTO
+from .autenticacion import generar_kcv, generar_mac, verificar_kcv, verificar_mac, indexar, MAC_POR_DEFECTO
+from .integridad import nuevo_resumen, resolver_algoritmo, ALGORITMO_POR_DEFECTO
+from .funciones_bloque import clave_en_bytes
+from .reensamblado import ensamblar_cuerpo
+from .iso_27001_compliance import secure_pipeline_wrapper, iso_compliance
+from .metricas import etapa
+
+# Longitud del MAC en hexadecimal (HMAC-SHA256 y BLAKE2b de 32 bytes)
+LONGITUD_MAC = 64
+_IMPRIMIBLES = bytes(range(32, 127))
+_TROZO = 1 << 20
+
+class _Vista:
+    """
+    Ventana [inicio, fin) de una proyección; se lee por trozos sin exportar
+    búferes (que impedirían cerrar el mmap).
+    """
+
+    def __init__(self, mapa, inicio, fin):
+        self.mapa, self.inicio, self.fin = mapa, inicio, fin
+
+    def __len__(self):
+        return self.fin - self.inicio
+
+    def __getitem__(self, corte):
+        a, b, _ = corte.indices(len(self))
+        return self.mapa[self.inicio + a:self.inicio + b]
+
+@contextmanager
+def _proyectar_lectura(ruta):
+    with open(ruta, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # mmap no admite archivos vacíos
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            yield mapa
+
+@contextmanager
+def _proyectar_escritura(ruta, tam):
+    with open(ruta, 'w+b') as f:
+        f.truncate(tam)
+        if tam == 0:
+            yield bytearray()
+            return
+        with mmap.mmap(f.fileno(), tam) as mapa:
+            yield mapa
+            mapa.flush()
+
+def _es_texto_preparado(datos):
+    # preparar_entrada no cambiaría nada: solo ASCII imprimible
+    return all(not datos[i:i + _TROZO].translate(None, _IMPRIMIBLES) for i in range(0, len(datos), _TROZO))
+
+def _cabecera(timestamp, uuid, campos):
+    return ensamblar_cuerpo('', timestamp, uuid, campos)[0].encode('ascii')
+
+def _autorizar(id_usuario, doc_type, accion, evento, descripcion):
+    # Verificación de acceso ISO 27001 A.9.1.1
+    tipo_doc = doc_type if doc_type else 'pipeline'
+    if not iso_compliance.access_control(id_usuario, tipo_doc, accion):
+        verbo = 'cifrar' if accion == 'encrypt' else 'descifrar'
+        raise PermissionError(f"Usuario {id_usuario} no tiene permisos para {verbo}")
+    iso_compliance.log_security_event(evento, f"{descripcion} for user {id_usuario}")
+
+def _cifrar(entrada, ruta_salida, clave, id_usuario, binario, tam_bloque, algoritmo_hash, algoritmo_mac,
+            indice_rango):
+    algoritmo_hash = resolver_algoritmo(algoritmo_hash)
+    resumen = nuevo_resumen(algoritmo_hash)
+    if not binario and not _es_texto_preparado(entrada):
+        # Texto con saltos de línea, tildes...: se prepara en memoria como en el pipeline
+        with etapa('cifrar', 'preparacion', len(entrada)) as m:
+            entrada = preparar_entrada(bytes(entrada).decode('utf-8', 'ignore')).encode('ascii')
+            m.salida = len(entrada)
+    salt = generar_salt(8)
+    with etapa('cifrar', 'semilla'):
+        semilla, timestamp, uuid = generar_semilla(clave, id_usuario, algoritmo=algoritmo_hash)
+    cabeza = salt.encode('latin1')
+    total = len(cabeza) + len(entrada)
+    largo = fusion.longitud_cuerpo(total, tam_bloque)
+    campos = {'timestamp': timestamp, 'uuid': uuid, 'hash_alg': algoritmo_hash, 'mac_alg': algoritmo_mac}
+    if binario:
+        campos['formato'] = 'binario'
+    campos.update(kcv=generar_kcv(clave, uuid), mac='0' * LONGITUD_MAC)
+    inicio = len(_cabecera(timestamp, uuid, campos))
+    with _proyectar_escritura(ruta_salida, inicio + largo) as salida:
+        def escribir(posicion, trozo):
+            salida[inicio + posicion:inicio + posicion + len(trozo)] = trozo
+
+        # 3-4. XOR global, funciones por bloque y base64 directamente sobre las proyecciones
+        with etapa('cifrar', 'nucleo', total) as m:
+            # Las permutaciones no se guardan: descifrar las deriva de la semilla
+            fusion.cifrar_en(lambda a, b: entrada[a:b], len(entrada), cabeza, clave_en_bytes(clave, total), semilla,
+                             tam_bloque, escribir, resumen, con_permutaciones=False)
+            m.salida = largo
+            m.contar_bloques(semilla, fusion.forma_de(tam_bloque, total)[1])
+        # 5. MAC leyendo el cuerpo ya escrito y cabecera definitiva delante
+        with etapa('cifrar', 'reensamblado', largo):
+            campos['mac'] = generar_mac(clave, campos, _Vista(salida, inicio, inicio + largo))
+            cabecera = _cabecera(timestamp, uuid, campos)
+            if len(cabecera) != inicio:
+                raise RuntimeError('La cabecera cambió de longitud al sellarla.')
+            salida[:inicio] = cabecera
+            if indice_rango:
+                indice = indexar(clave, campos, _Vista(salida, inicio, inicio + largo), tam_bloque, total,
+                                 *(() if indice_rango is True else (indice_rango,)))
+    metadatos = ensamblar_cuerpo('', timestamp, uuid, campos)[1]
+    if indice_rango:
+        metadatos['indice'] = indice
+    metadatos.update(semilla=semilla, salt=salt, motor='fusion', tam_bloque=tam_bloque)
+    with etapa('cifrar', 'hash'):
+        metadatos['hash'] = resumen.hexdigest()
+    return metadatos
+
+@secure_pipeline_wrapper
+def cifrar_archivo(ruta_entrada, ruta_salida, clave, id_usuario, doc_type=None, binario=True,
+                   tam_bloque=TAM_BLOQUE_POR_DEFECTO, algoritmo_hash=ALGORITMO_POR_DEFECTO,
+                   algoritmo_mac=MAC_POR_DEFECTO, indice_rango=False):
+    """
+    Cifra ruta_entrada en ruta_salida y devuelve los metadatos (como
+    cifrar_pipeline; el cifrado queda en el archivo).
+    """
+    _autorizar(id_usuario, doc_type, 'encrypt', 'ENCRYPTION_STARTED', 'Starting file encryption')
+    with _proyectar_lectura(ruta_entrada) as entrada:
+        metadatos = _cifrar(entrada, ruta_salida, clave, id_usuario, binario, tam_bloque, algoritmo_hash, algoritmo_mac,
+                            indice_rango)
+    iso_compliance.log_security_event('ENCRYPTION_COMPLETED', f"File encryption completed for user {id_usuario}")
+    return metadatos
+
+@secure_pipeline_wrapper
+def cifrar_datos_en_archivo(datos, ruta_salida, clave, id_usuario, doc_type=None, binario=True,
+                            tam_bloque=TAM_BLOQUE_POR_DEFECTO, algoritmo_hash=ALGORITMO_POR_DEFECTO,
+                            algoritmo_mac=MAC_POR_DEFECTO, indice_rango=False):
+    """
+    Como cifrar_archivo, pero los datos (bytes) ya están en memoria.
+    """
+    _autorizar(id_usuario, doc_type, 'encrypt', 'ENCRYPTION_STARTED', 'Starting file encryption')
+    metadatos = _cifrar(datos, ruta_salida, clave, id_usuario, binario, tam_bloque, algoritmo_hash, algoritmo_mac,
+                        indice_rango)
+    iso_compliance.log_security_event('ENCRYPTION_COMPLETED', f"File encryption completed for user {id_usuario}")
+    return metadatos
+
+def _rechazar(descartar, evento, id_usuario, mensaje):
+    # No se deja texto que no superó la verificación
+    descartar()
+    iso_compliance.log_security_event(evento, f"{mensaje} for user {id_usuario}", 'ERROR')
+
+def _leer_cabecera(entrada):
+    # (cabecera, posición del separador): el cuerpo empieza en la siguiente
+    fin = entrada.find(b'\n')
+    cabecera = json.loads(entrada[:fin]) if fin >= 0 else None
+    if not isinstance(cabecera, dict):
+        raise ValueError('Cabecera del cifrado inválida.')
+    return cabecera, fin
+
+def _descifrar(entrada, clave, id_usuario, metadatos, reservar, descartar):
+    # reservar(tam): contexto con el búfer de salida; descartar(): lo elimina si la verificación falla
+    # 5. Cabecera JSON, comprobación de clave y MAC sobre la proyección
+    cabecera, fin = _leer_cabecera(entrada)
+    if cabecera.get('codec'):
+        raise ValueError('Cifrado comprimido: usar descifrar_pipeline.')
+    autenticado = 'mac' in cabecera or 'mac' in metadatos
+    if autenticado and not verificar_kcv(clave, cabecera):
+        iso_compliance.log_security_event('KEY_CHECK_FAILED', f"Key check failed for user {id_usuario}", 'ERROR')
+        raise ValueError('Clave incorrecta.')
+    cuerpo = _Vista(entrada, fin + 1, len(entrada))
+    with etapa('descifrar', 'mac', len(cuerpo)):
+        mac_valido = not autenticado or verificar_mac(clave, cabecera, cuerpo)
+    if not mac_valido:
+        iso_compliance.log_security_event('MAC_MISMATCH', f"Ciphertext MAC mismatch for user {id_usuario}", 'ERROR')
+        raise ValueError('El cifrado fue manipulado (MAC no coincide).')
+
+    semilla = metadatos['semilla']
+    permutaciones = metadatos.get('permutaciones')
+    salt = metadatos.get('salt', '').encode('latin1')
+    def leer(a, b):
+        return cuerpo[a:b]
+
+    # Sin permutaciones en los metadatos (cifrar_archivo no las guarda) se derivan bloque a bloque
+    forma = fusion.geometria(leer, len(cuerpo))
+    n_bloques = forma[1] if forma else len(permutaciones or ())
+    plano = None
+    if forma is None or permutaciones is not None and len(permutaciones) < forma[1]:
+        # Cuerpo sin bloques de tamaño fijo: implementación de referencia en memoria
+        plano = descifrar_referencia(cuerpo[:].decode('ascii'), clave, semilla, permutaciones).encode('latin1')
+        forma = (None, None, len(plano))
+    total = forma[2]
+    if total < len(salt):
+        _rechazar(descartar, 'SALT_MISMATCH', id_usuario, 'Salt mismatch')
+        raise ValueError('Salt incorrecto o clave incorrecta.')
+    resumen = nuevo_resumen(cabecera.get('hash_alg', ALGORITMO_POR_DEFECTO))
+    recibido = bytearray()
+    regular = True
+    with reservar(total - len(salt)) as salida:
+        def escribir(posicion, trozo):
+            # Los primeros bytes son el salt: se comprueban y no se escriben
+            if posicion < len(salt):
+                corte = len(salt) - posicion
+                recibido.extend(trozo[:corte])
+                trozo, posicion = trozo[corte:], len(salt)
+            if trozo:
+                salida[posicion - len(salt):posicion - len(salt) + len(trozo)] = trozo
+                resumen.update(trozo)
+
+        with etapa('descifrar', 'nucleo', len(cuerpo)) as m:
+            if plano is not None:
+                escribir(0, plano)
+            else:
+                regular = fusion.descifrar_en(leer, len(cuerpo), forma, clave_en_bytes(clave, total),
+                                              semilla, permutaciones, escribir)
+            m.salida = total
+            m.contar_bloques(semilla, n_bloques)
+    if not regular:
+        # La salida ya tiene parte del texto: se elimina como en los demás rechazos
+        _rechazar(descartar, 'INTEGRITY_FAILED', id_usuario, 'Irregular ciphertext blocks')
+        raise ValueError('Cuerpo del cifrado con bloques irregulares.')
+    if bytes(recibido) != salt:
+        _rechazar(descartar, 'SALT_MISMATCH', id_usuario, 'Salt mismatch')
+        raise ValueError('Salt incorrecto o clave incorrecta.')
+    # 7. Hash de los bytes escritos (alimentado durante el núcleo)
+    with etapa('descifrar', 'hash'):
+        hash_valido = resumen.hexdigest() == metadatos.get('hash', '')
+    if not hash_valido:
+        _rechazar(descartar, 'HASH_MISMATCH', id_usuario, 'Hash mismatch')
+        raise ValueError('Hash de verificación no coincide.')
+    iso_compliance.log_security_event('DECRYPTION_COMPLETED', f"File decryption completed for user {id_usuario}")
+    return total - len(salt)
+
+@secure_pipeline_wrapper
+def descifrar_archivo(ruta_entrada, ruta_salida, clave, id_usuario, metadatos, doc_type=None):
+    """
+    Descifra ruta_entrada (de cifrar_archivo, o un cifrado de
+    cifrar_pipeline sin compresión guardado en disco) en ruta_salida.
+    Devuelve los bytes escritos.
+    """
+    _autorizar(id_usuario, doc_type, 'decrypt', 'DECRYPTION_STARTED', 'Starting file decryption')
+
+    def descartar():
+        if os.path.exists(ruta_salida):
+            os.remove(ruta_salida)
+
+    with _proyectar_lectura(ruta_entrada) as entrada:
+        return _descifrar(entrada, clave, id_usuario, metadatos,
+                          lambda tam: _proyectar_escritura(ruta_salida, tam), descartar)
+
+@secure_pipeline_wrapper
+def descifrar_archivo_en_memoria(ruta_entrada, clave, id_usuario, metadatos, doc_type=None):
+    """
+    Como descifrar_archivo, pero devuelve el texto (bytearray) sin escribirlo
+    en disco.
+    """
+    _autorizar(id_usuario, doc_type, 'decrypt', 'DECRYPTION_STARTED', 'Starting file decryption')
+    salida = []
+
+    @contextmanager
+    def reservar(tam):
+        salida.append(bytearray(tam))
+        yield salida[0]
+
+    with _proyectar_lectura(ruta_entrada) as entrada:
+        _descifrar(entrada, clave, id_usuario, metadatos, reservar, salida.clear)
+    return salida[0]
+
+@secure_pipeline_wrapper
+def descifrar_rango_archivo(ruta_entrada, inicio, fin, clave, id_usuario, metadatos=None, doc_type=None):
+    """
+    Bytes [inicio, fin) (como un corte) del texto que devolvería
+    descifrar_archivo_en_memoria, leyendo de la proyección solo la cabecera
+    y los bloques que los cubren. También admite un artefacto autocontenido.
+    """
+    _autorizar(id_usuario, doc_type, 'decrypt', 'DECRYPTION_STARTED', 'Starting file range decryption')
+    with _proyectar_lectura(ruta_entrada) as entrada:
+        if artefacto.es_artefacto(entrada[:len(artefacto.MAGIA)]):
+            cabecera, inicio_cuerpo = artefacto.leer(entrada[:artefacto.TAM_CABECERA_MAXIMA])
+        elif not metadatos:
+            raise ValueError('Faltan los metadatos del cifrado.')
+        else:
+            cabecera, separador = _leer_cabecera(entrada)
+            inicio_cuerpo = separador + 1
+        plano = _rango(_Vista(entrada, inicio_cuerpo, len(entrada)), cabecera, metadatos or {}, clave, id_usuario,
+                       inicio, fin)
+    iso_compliance.log_security_event('DECRYPTION_COMPLETED', f"File range decryption completed for user {id_usuario}")
+    return plano
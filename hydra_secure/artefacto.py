@@ -0,0 +1,93 @@
+"""
+Artefacto autocontenido: cabecera binaria compacta + cuerpo cifrado.
+
+Con cifrar_pipeline(..., autocontenido=True) el cifrado es un solo bloque de
+bytes que descifrar_pipeline descifra sin metadatos aparte ni JSON. La
+cabecera tiene disposición fija (big endian):
+
+    magia 'HYDR' | versión | flags | hash_alg | mac_alg | códec | reservado
+    tam_bloque (2) | timestamp (8) | uuid (16) | longitud (8) | kcv (8)
+    mac (32) | len(propietario) (1) | propietario (UTF-8)
+
+seguida del cuerpo base64 de siempre. No hace falta guardar la semilla ni las
+permutaciones: la semilla se recalcula con la clave, el propietario (usuario
+que cifró), el timestamp y el uuid, y las permutaciones solo dependen de la
+semilla y de la longitud (funciones_bloque.derivar_permutaciones). El salt y
+el hash del texto no viajan en claro; la integridad la da el MAC, que cubre
+todos los campos de la cabecera y se verifica antes de revertir ningún bloque.
+El byte reservado y los bits de flags sin asignar no entran en el MAC, así
+que leer rechaza el artefacto si no son cero: una versión futura que los use
+no se confundirá con una cabecera manipulada que sigue verificando.
+"""
+import struct
+import uuid as uuid_mod
+
+from .autenticacion import ALGORITMOS_MAC
+
+MAGIA = b'HYDR'
+VERSION = 1
+ALGORITMOS_HASH = ('sha256', 'blake2b', 'blake2s')
+CODECS = (None, 'zlib', 'lzma', 'bz2')
+FLAG_BINARIO = 0x01
+FLAGS_CONOCIDOS = FLAG_BINARIO
+
+_FIJA = struct.Struct('>4s6BHQ16sQ8s32sB')
+TAM_CABECERA_FIJA = _FIJA.size
+# Con el propietario más largo admitido
+TAM_CABECERA_MAXIMA = TAM_CABECERA_FIJA + 255
+
+def es_artefacto(cifrado):
+    return isinstance(cifrado, (bytes, bytearray, memoryview)) and bytes(cifrado[:4]) == MAGIA
+
+def _indice(valores, valor, campo):
+    try:
+        return valores.index(valor)
+    except ValueError:
+        raise ValueError(f"{campo} no representable en el artefacto: {valor}") from None
+
+def _valor(valores, indice, campo):
+    if indice >= len(valores):
+        raise ValueError(f"{campo} desconocido en el artefacto: {indice}")
+    return valores[indice]
+
+def empaquetar(campos, cuerpo):
+    """
+    Artefacto (bytes) con los campos de cabecera (los de cifrar_pipeline más
+    tam_bloque, longitud y propietario, ya sellados con kcv y mac) y el cuerpo.
+    """
+    propietario = campos['propietario'].encode('utf-8')
+    if TAM_CABECERA_FIJA + len(propietario) > TAM_CABECERA_MAXIMA:
+        raise ValueError('El identificador del propietario no cabe en la cabecera (máximo 255 bytes).')
+    fija = _FIJA.pack(
+        MAGIA, VERSION, FLAG_BINARIO if campos.get('formato') == 'binario' else 0,
+        _indice(ALGORITMOS_HASH, campos['hash_alg'], 'hash_alg'),
+        _indice(ALGORITMOS_MAC, campos['mac_alg'], 'mac_alg'),
+        _indice(CODECS, campos.get('codec'), 'codec'), 0,
+        campos['tam_bloque'], campos['timestamp'], uuid_mod.UUID(campos['uuid']).bytes, campos['longitud'],
+        bytes.fromhex(campos['kcv']), bytes.fromhex(campos['mac']), len(propietario))
+    return b''.join((fija, propietario, cuerpo.encode('ascii') if isinstance(cuerpo, str) else cuerpo))
+
+def leer(artefacto):
+    """
+    (campos, posición del cuerpo): los mismos campos que recibió empaquetar.
+    """
+    if len(artefacto) < TAM_CABECERA_FIJA or not es_artefacto(artefacto):
+        raise ValueError('Artefacto inválido.')
+    (_, version, flags, hash_alg, mac_alg, codec, reservado, tam_bloque, timestamp, uuid_bytes, longitud,
+     kcv, mac, largo_propietario) = _FIJA.unpack_from(artefacto)
+    if version != VERSION:
+        raise ValueError(f"Versión de artefacto no soportada: {version}")
+    if flags & ~FLAGS_CONOCIDOS or reservado:
+        raise ValueError('Cabecera de artefacto con flags desconocidos o byte reservado distinto de cero.')
+    inicio = TAM_CABECERA_FIJA + largo_propietario
+    campos = {'timestamp': timestamp, 'uuid': str(uuid_mod.UUID(bytes=uuid_bytes)),
+              'hash_alg': _valor(ALGORITMOS_HASH, hash_alg, 'hash_alg'),
+              'mac_alg': _valor(ALGORITMOS_MAC, mac_alg, 'mac_alg')}
+    if _valor(CODECS, codec, 'codec'):
+        campos['codec'] = CODECS[codec]
+    if flags & FLAG_BINARIO:
+        campos['formato'] = 'binario'
+    campos.update(tam_bloque=tam_bloque, longitud=longitud,
+                  propietario=bytes(artefacto[TAM_CABECERA_FIJA:inicio]).decode('utf-8'),
+                  kcv=kcv.hex(), mac=mac.hex())
+    return campos, inicio
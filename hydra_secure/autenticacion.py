@@ -0,0 +1,112 @@
+"""
+Verificación temprana de clave y autenticación del cifrado.
+
+La cabecera lleva un valor de comprobación de clave (kcv) y un MAC sobre el
+resto de la cabecera y el cuerpo cifrado. Ambos se derivan de la clave y del
+uuid del documento, de modo que una clave incorrecta se rechaza leyendo solo
+la cabecera y una manipulación con una sola pasada de MAC, antes de revertir
+ningún bloque. El MAC es HMAC-SHA256 o, como opción más rápida, BLAKE2b con
+clave (campo mac_alg de la cabecera).
+
+Para descifrar rangos sin recorrer todo el cuerpo, los metadatos pueden
+llevar además un índice con un MAC (truncado a 128 bits) por segmento de
+bloques del cuerpo, ligado a la cabecera, a la geometría y a su posición.
+"""
+import hmac
+import json
+import hashlib
+
+from .fusion import longitud_b64
+
+LONGITUD_KCV = 16
+ALGORITMOS_MAC = ('hmac-sha256', 'blake2b')
+MAC_POR_DEFECTO = 'hmac-sha256'
+# Bloques por segmento del índice de rangos y longitud (hex) de su MAC
+BLOQUES_POR_SEGMENTO = 4096
+LONGITUD_MAC_SEGMENTO = 32
+# Trozo (en caracteres) con el que se alimenta el MAC para no copiar el cuerpo
+_TROZO_MAC = 1 << 20
+
+def _derivar(clave, uuid, proposito):
+    mensaje = f"hydra_secure|{proposito}|{uuid}".encode('utf-8')
+    return hmac.new(clave.encode('utf-8'), mensaje, hashlib.sha256).digest()
+
+def generar_kcv(clave, uuid):
+    """
+    Valor de comprobación de clave (no revela la clave ni sirve como MAC).
+    """
+    return _derivar(clave, uuid, 'kcv').hex()[:LONGITUD_KCV]
+
+def _nuevo_mac(clave_mac, algoritmo):
+    if algoritmo == 'hmac-sha256':
+        return hmac.new(clave_mac, digestmod=hashlib.sha256)
+    if algoritmo == 'blake2b':
+        # BLAKE2 admite clave de forma nativa: no necesita la construcción HMAC
+        return hashlib.blake2b(key=clave_mac, digest_size=32)
+    raise ValueError(f"Algoritmo de MAC desconocido: {algoritmo}")
+
+def generar_mac(clave, campos, cuerpo):
+    """
+    MAC del cuerpo serializado (str o bytes, p. ej. un mmap), ligado a los
+    campos de la cabecera (timestamp, uuid, códec...). kcv y mac no forman
+    parte del mensaje.
+    """
+    protegidos = {k: v for k, v in campos.items() if k not in ('kcv', 'mac')}
+    mac = _nuevo_mac(_derivar(clave, campos.get('uuid'), 'mac'), campos.get('mac_alg', MAC_POR_DEFECTO))
+    mac.update(json.dumps(protegidos, sort_keys=True).encode('utf-8') + b'\n')
+    for inicio in range(0, len(cuerpo), _TROZO_MAC):
+        trozo = cuerpo[inicio:inicio + _TROZO_MAC]
+        mac.update(trozo.encode('latin1') if isinstance(trozo, str) else trozo)
+    return mac.hexdigest()
+
+def sellar(clave, campos, cuerpo):
+    """
+    Campos de cabecera (kcv y mac) que autentican un cuerpo cifrado.
+    """
+    return {'kcv': generar_kcv(clave, campos.get('uuid')), 'mac': generar_mac(clave, campos, cuerpo)}
+
+def ancho_segmento(indice):
+    """
+    Bytes del cuerpo por segmento del índice (bloques base64 más separador).
+    """
+    return indice['bloques'] * (longitud_b64(indice['tam_bloque']) + 1)
+
+def _mac_segmento(clave, campos, indice, numero, tramo):
+    protegidos = {k: v for k, v in campos.items() if k not in ('kcv', 'mac')}
+    geometria = {k: indice[k] for k in ('tam_bloque', 'longitud', 'bloques')}
+    mac = _nuevo_mac(_derivar(clave, campos.get('uuid'), 'segmento'), campos.get('mac_alg', MAC_POR_DEFECTO))
+    mac.update(json.dumps([protegidos, geometria, numero], sort_keys=True).encode('utf-8') + b'\n')
+    mac.update(tramo.encode('latin1') if isinstance(tramo, str) else tramo)
+    return mac.hexdigest()[:LONGITUD_MAC_SEGMENTO]
+
+def indexar(clave, campos, cuerpo, tam_bloque, longitud, bloques=BLOQUES_POR_SEGMENTO):
+    """
+    Índice de rangos de un cuerpo serializado (str o bytes) de un texto de
+    longitud bytes (salt incluido).
+    """
+    indice = {'tam_bloque': tam_bloque, 'longitud': longitud, 'bloques': bloques}
+    ancho = ancho_segmento(indice)
+    indice['macs'] = [_mac_segmento(clave, campos, indice, numero, cuerpo[inicio:inicio + ancho])
+                      for numero, inicio in enumerate(range(0, len(cuerpo), ancho))]
+    return indice
+
+def verificar_segmentos(clave, cabecera, indice, primero, tramo):
+    """
+    Comprueba los segmentos de tramo (bytes del cuerpo desde el inicio del
+    segmento primero, hasta el final de un segmento o del cuerpo).
+    """
+    ancho = ancho_segmento(indice)
+    macs = indice.get('macs', [])
+    for numero, inicio in enumerate(range(0, len(tramo), ancho), primero):
+        if numero >= len(macs):
+            return False
+        calculado = _mac_segmento(clave, cabecera, indice, numero, tramo[inicio:inicio + ancho])
+        if not hmac.compare_digest(calculado, str(macs[numero])):
+            return False
+    return True
+
+def verificar_kcv(clave, cabecera):
+    return hmac.compare_digest(generar_kcv(clave, cabecera.get('uuid')), str(cabecera.get('kcv', '')))
+
+def verificar_mac(clave, cabecera, cuerpo):
+    return hmac.compare_digest(generar_mac(clave, cabecera, cuerpo), str(cabecera.get('mac', '')))
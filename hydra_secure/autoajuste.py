@@ -0,0 +1,221 @@
+"""
+Autoajuste por equipo: elige motor, tamaño de bloque, tamaño de trozo y
+número de procesos.
+
+`python -m hydra_secure.autoajuste calibrar` mide cada motor disponible con
+cargas de varios tamaños y escribe un perfil JSON (por defecto
+~/.hydra_secure_perfil.json o la ruta de HYDRA_PERFIL). El pipeline, con
+motor='auto', carga el perfil en el primer uso y elige por tamaño de carga;
+sin perfil se usa el motor de referencia con bloques de 4. La elección queda
+en metadatos['motor'] y puede consultarse con elegir() o con
+`python -m hydra_secure.autoajuste mostrar`.
+"""
+import os
+import sys
+import json
+import time
+import random
+import datetime
+
+from .motores import obtener_motor, motores_disponibles, MOTOR_POR_DEFECTO
+
+MOTOR_AUTOMATICO = 'auto'
+TAM_BLOQUE_POR_DEFECTO = 4
+# Tamaños (bytes) con los que se calibra; cada uno define un tramo del perfil
+TAMANOS_CALIBRACION = (1024, 4096, 65536, 524288, 2097152)
+# Candidatos por defecto: solo el tamaño de bloque del formato habitual. Otros
+# bloques son más rápidos y siguen descifrándose, pero cambian el cifrado.
+BLOQUES_CALIBRACION = (TAM_BLOQUE_POR_DEFECTO,)
+TROZOS_CALIBRACION = (1024, 4096, 16384, 65536)
+
+def procesos_calibracion():
+    # 1, 2, 4... hasta el número de CPUs (incluido)
+    cpus = os.cpu_count() or 1
+    return sorted({cpus} | {1 << i for i in range(cpus.bit_length()) if 1 << i <= cpus})
+
+VERSION_PERFIL = 1
+
+_SIN_PERFIL = {'version': VERSION_PERFIL,
+               'tramos': [{'hasta': None, 'motor': MOTOR_POR_DEFECTO, 'tam_bloque': TAM_BLOQUE_POR_DEFECTO}]}
+_perfil = None
+
+def ruta_perfil():
+    return os.environ.get('HYDRA_PERFIL') or os.path.join(os.path.expanduser('~'), '.hydra_secure_perfil.json')
+
+def cargar_perfil(ruta=None):
+    """
+    Lee un perfil; si no existe, no es válido o nombra un motor que no está
+    disponible aquí, devuelve el perfil por defecto.
+    """
+    try:
+        with open(ruta or ruta_perfil()) as f:
+            perfil = json.load(f)
+        disponibles = motores_disponibles()
+        if perfil.get('version') != VERSION_PERFIL or not perfil.get('tramos') or \
+                any(t['motor'] not in disponibles for t in perfil['tramos']):
+            return _SIN_PERFIL
+        return perfil
+    except (OSError, ValueError, KeyError, TypeError):
+        return _SIN_PERFIL
+
+def perfil():
+    """
+    Perfil activo (se carga una vez, en el primer uso).
+    """
+    global _perfil
+    if _perfil is None:
+        recargar()
+    return _perfil
+
+def recargar(ruta=None):
+    global _perfil
+    _perfil = cargar_perfil(ruta)
+    if 'bloques_por_trozo' in _perfil:
+        from . import fusion
+        fusion.BLOQUES_POR_TROZO = _perfil['bloques_por_trozo']
+    if 'procesos' in _perfil:
+        from . import paralelo
+        paralelo.configurar(_perfil['procesos'])
+    return _perfil
+
+def elegir(n_bytes):
+    """
+    (motor, tam_bloque) para una carga de n_bytes según el perfil activo.
+    """
+    tramos = perfil()['tramos']
+    for tramo in tramos:
+        if tramo['hasta'] is None or n_bytes <= tramo['hasta']:
+            return tramo['motor'], tramo.get('tam_bloque', TAM_BLOQUE_POR_DEFECTO)
+    return tramos[-1]['motor'], tramos[-1].get('tam_bloque', TAM_BLOQUE_POR_DEFECTO)
+
+def resolver(motor, n_bytes):
+    """
+    Traduce el parámetro motor del pipeline a (motor, tam_bloque).
+    """
+    if motor == MOTOR_AUTOMATICO:
+        return elegir(n_bytes)
+    return motor, TAM_BLOQUE_POR_DEFECTO
+
+def _mensaje(n_bytes):
+    rng = random.Random(n_bytes)
+    return ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz ,.:0123456789') for _ in range(n_bytes))
+
+def _medir(motor, datos, tam_bloque, presupuesto=0.5):
+    # Mejor tiempo de cifrar + descifrar, repitiendo hasta agotar el presupuesto
+    semilla = 'a3f9c07b1e5d2468' * 4
+    mejor = float('inf')
+    limite = time.perf_counter() + presupuesto
+    while True:
+        inicio = time.perf_counter()
+        cuerpo, permutaciones = motor.cifrar(datos, 'calibracion', semilla, tam_bloque, 'Salt1234')
+        motor.descifrar(cuerpo, 'calibracion', semilla, permutaciones)
+        mejor = min(mejor, time.perf_counter() - inicio)
+        if time.perf_counter() > limite:
+            return mejor
+
+def calibrar(tamanos=TAMANOS_CALIBRACION, bloques=BLOQUES_CALIBRACION, trozos=TROZOS_CALIBRACION,
+             motores=None, presupuesto=0.5, progreso=None):
+    """
+    Ejecuta la calibración y devuelve el perfil (sin escribirlo).
+    """
+    import platform
+    from . import fusion
+    motores = motores or motores_disponibles()
+    mediciones = {}
+    procesos = None
+    if 'paralelo' in motores:
+        # Primero el número de procesos, para comparar el motor paralelo ya ajustado
+        from . import paralelo
+        datos = _mensaje(max(max(tamanos), paralelo.MIN_BYTES_PARALELO))
+        tiempos = {}
+        for n in procesos_calibracion():
+            paralelo.configurar(n)
+            tiempos[n] = _medir(obtener_motor('paralelo'), datos, TAM_BLOQUE_POR_DEFECTO, presupuesto)
+            if progreso:
+                progreso(f"paralelo {n:>3} procesos {tiempos[n] * 1000:9.2f} ms")
+        procesos = min(tiempos, key=tiempos.get)
+        paralelo.configurar(procesos)
+        mediciones['procesos'] = {str(k): v for k, v in tiempos.items()}
+    tramos = []
+    for indice, n_bytes in enumerate(sorted(tamanos)):
+        datos = _mensaje(n_bytes)
+        candidatos = {}
+        for nombre in motores:
+            for tam_bloque in bloques:
+                segundos = _medir(obtener_motor(nombre), datos, tam_bloque, presupuesto)
+                candidatos[f"{nombre}/{tam_bloque}"] = segundos
+                if progreso:
+                    progreso(f"{n_bytes:>9} B  {nombre:<11} bloque {tam_bloque:<3} {segundos * 1000:9.2f} ms")
+        ganador = min(candidatos, key=candidatos.get)
+        nombre, tam_bloque = ganador.split('/')
+        ultimo = indice == len(tamanos) - 1
+        tramos.append({'hasta': None if ultimo else n_bytes, 'motor': nombre, 'tam_bloque': int(tam_bloque)})
+        mediciones[str(n_bytes)] = candidatos
+    # Tramos consecutivos con la misma elección se fusionan
+    compactos = []
+    for tramo in tramos:
+        if compactos and (compactos[-1]['motor'], compactos[-1]['tam_bloque']) == (tramo['motor'], tramo['tam_bloque']):
+            compactos[-1]['hasta'] = tramo['hasta']
+        else:
+            compactos.append(tramo)
+    perfil_nuevo = {
+        'version': VERSION_PERFIL,
+        'equipo': platform.node(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'fecha': datetime.datetime.now().isoformat(),
+        'tramos': compactos,
+        'mediciones': mediciones,
+    }
+    if procesos is not None:
+        perfil_nuevo['procesos'] = procesos
+    if 'fusion' in motores and trozos:
+        datos = _mensaje(max(tamanos))
+        original = fusion.BLOQUES_POR_TROZO
+        tiempos = {}
+        try:
+            for trozo in trozos:
+                fusion.BLOQUES_POR_TROZO = trozo
+                tiempos[trozo] = _medir(obtener_motor('fusion'), datos, TAM_BLOQUE_POR_DEFECTO, presupuesto)
+                if progreso:
+                    progreso(f"trozo fusion {trozo:>6} bloques {tiempos[trozo] * 1000:9.2f} ms")
+        finally:
+            fusion.BLOQUES_POR_TROZO = original
+        perfil_nuevo['bloques_por_trozo'] = min(tiempos, key=tiempos.get)
+        mediciones['bloques_por_trozo'] = {str(k): v for k, v in tiempos.items()}
+    return perfil_nuevo
+
+def guardar_perfil(perfil_nuevo, ruta=None):
+    ruta = ruta or ruta_perfil()
+    with open(ruta, 'w') as f:
+        json.dump(perfil_nuevo, f, indent=2)
+    return ruta
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog='python -m hydra_secure.autoajuste',
+                                     description=__doc__.strip().splitlines()[0])
+    ordenes = parser.add_subparsers(dest='orden', required=True)
+    orden_calibrar = ordenes.add_parser('calibrar', help='mide los motores y escribe el perfil')
+    orden_calibrar.add_argument('--salida', default=None, help='ruta del perfil (por defecto HYDRA_PERFIL o ~)')
+    orden_calibrar.add_argument('--bloques', default=','.join(map(str, BLOQUES_CALIBRACION)),
+                                help='tamaños de bloque candidatos, p. ej. 4,8,16')
+    orden_calibrar.add_argument('--presupuesto', type=float, default=0.5, help='segundos por medición')
+    orden_mostrar = ordenes.add_parser('mostrar', help='muestra el perfil activo y la elección por tamaño')
+    orden_mostrar.add_argument('tamanos', nargs='*', type=int, default=[1024, 4096, 1 << 20])
+    args = parser.parse_args(argv)
+
+    if args.orden == 'calibrar':
+        nuevo = calibrar(bloques=[int(b) for b in args.bloques.split(',')], presupuesto=args.presupuesto,
+                         progreso=print)
+        print(f"Perfil guardado en {guardar_perfil(nuevo, args.salida)}")
+        return 0
+    activo = perfil()
+    print(f"Perfil: {ruta_perfil() if activo is not _SIN_PERFIL else 'ninguno (valores por defecto)'}")
+    for n_bytes in args.tamanos:
+        motor, tam_bloque = elegir(n_bytes)
+        print(f"{n_bytes:>12} B -> motor {motor}, bloque {tam_bloque}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
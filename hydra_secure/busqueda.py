@@ -0,0 +1,115 @@
+"""
+Índice ciego de palabras clave para buscar en documentos cifrados.
+
+Al cifrar, las palabras del texto preparado (preparar_entrada, en minúsculas
+y sin signos) se convierten en tokens ciegos: un HMAC de la palabra con la
+clave de índice del tipo de documento, que vive en el almacén de claves de
+iso_compliance ('indice:<doc_type>'). El índice invertido guarda token ->
+documentos, de modo que no contiene ninguna palabra en claro y los tokens de
+un tipo de documento no sirven para otro.
+
+buscar comprueba el control de acceso antes de devolver nada y responde con
+los documentos candidatos intersecando las listas de los tokens de la
+consulta (de la más corta a la más larga), sin descifrar ningún documento;
+descifrar_candidatos descifra solo esos y confirma que las palabras están.
+"""
+import re
+import hmac
+import hashlib
+
+from .pipeline import cifrar_pipeline
+from .preparacion import preparar_entrada
+from .iso_27001_compliance import iso_compliance
+
+LONGITUD_TOKEN = 32
+# Palabras más cortas no se indexan (artículos, preposiciones...)
+LONGITUD_MINIMA = 3
+_PALABRA = re.compile(r'[a-z0-9]+')
+
+def palabras(texto):
+    """
+    Palabras normalizadas (como las indexa el índice) de un texto.
+    """
+    return {p for p in _PALABRA.findall(preparar_entrada(texto).lower()) if len(p) >= LONGITUD_MINIMA}
+
+def _clave_indice(doc_type):
+    identificador = f"indice:{doc_type}"
+    return (iso_compliance.key_management(identificador, 'retrieve')
+            or iso_compliance.key_management(identificador, 'generate'))
+
+def _tokens(clave, conjunto):
+    return {hmac.new(clave, b'hydra_secure|palabra|' + p.encode('ascii'), hashlib.sha256).hexdigest()[:LONGITUD_TOKEN]
+            for p in conjunto}
+
+class IndiceCiego:
+    """
+    Índice invertido token -> documentos; tipos: documento -> tipo.
+    """
+
+    def __init__(self):
+        self.entradas = {}
+        self.tipos = {}
+        self._tokens_por_documento = {}
+
+    def indexar(self, doc_id, texto, doc_type):
+        """
+        Añade (o reemplaza) las palabras de un documento.
+        """
+        self.eliminar(doc_id)
+        tokens = _tokens(_clave_indice(doc_type), palabras(texto))
+        for token in tokens:
+            self.entradas.setdefault(token, set()).add(doc_id)
+        self.tipos[doc_id] = doc_type
+        self._tokens_por_documento[doc_id] = tokens
+
+    def eliminar(self, doc_id):
+        for token in self._tokens_por_documento.pop(doc_id, ()):
+            documentos = self.entradas[token]
+            documentos.discard(doc_id)
+            if not documentos:
+                del self.entradas[token]
+        self.tipos.pop(doc_id, None)
+
+    def cifrar(self, doc_id, mensaje, clave, id_usuario, doc_type, **opciones):
+        """
+        cifrar_pipeline (mismo resultado) indexando el documento como doc_id.
+        """
+        resultado = cifrar_pipeline(mensaje, clave, id_usuario, doc_type=doc_type, **opciones)
+        self.indexar(doc_id, mensaje, doc_type)
+        return resultado
+
+    def buscar(self, consulta, id_usuario, doc_type):
+        """
+        Documentos de doc_type que contienen todas las palabras de la
+        consulta (candidatos: un token truncado puede coincidir por azar).
+        """
+        # Verificación de acceso ISO 27001 A.9.1.1 antes de devolver coincidencias
+        if not iso_compliance.access_control(id_usuario, doc_type, 'read'):
+            raise PermissionError(f"Usuario {id_usuario} no tiene permisos para buscar en {doc_type}")
+        buscadas = palabras(consulta)
+        if not buscadas:
+            return []
+        listas = sorted((self.entradas.get(token, set()) for token in _tokens(_clave_indice(doc_type), buscadas)),
+                        key=len)
+        candidatos = {d for d in listas[0] if self.tipos.get(d) == doc_type}
+        for lista in listas[1:]:
+            if not candidatos:
+                break
+            candidatos &= lista
+        iso_compliance.log_security_event('INDEX_SEARCH', f"Blind search by {id_usuario} in {doc_type}: "
+                                                          f"{len(candidatos)} candidates")
+        return sorted(candidatos)
+
+    def descifrar_candidatos(self, consulta, id_usuario, doc_type, descifrar):
+        """
+        {doc_id: texto} de los candidatos de buscar que de verdad contienen
+        la consulta; descifrar(doc_id) devuelve el texto de un documento (y
+        solo se llama con candidatos).
+        """
+        buscadas = palabras(consulta)
+        encontrados = {}
+        for doc_id in self.buscar(consulta, id_usuario, doc_type):
+            texto = descifrar(doc_id)
+            if buscadas <= palabras(texto):
+                encontrados[doc_id] = texto
+        return encontrados
@@ -0,0 +1,94 @@
+"""
+Etapa opcional de compresión (entre la preparación y el salt).
+
+El texto preparado se comprime con un códec de la biblioteca estándar y el
+resultado viaja por el resto del pipeline como texto latin1, igual que la
+salida del XOR global. En modo 'auto' se comprime de prueba una muestra con
+zlib y se omite la compresión si los datos no van a reducirse.
+"""
+import bz2
+import lzma
+import math
+import zlib
+from collections import Counter
+
+CODECS = {
+    'zlib': (lambda datos: zlib.compress(datos, 6), zlib.decompress),
+    'lzma': (lambda datos: lzma.compress(datos, preset=6), lzma.decompress),
+    'bz2': (lambda datos: bz2.compress(datos, 9), bz2.decompress),
+}
+CODEC_AUTOMATICO = 'zlib'
+
+# Por debajo de este tamaño la cabecera del códec no compensa
+TAM_MINIMO = 256
+# Relación (comprimido / original) de la muestra por encima de la cual se
+# omite. El texto preparado es ASCII imprimible y zlib lo deja en ~0.83 aunque
+# sea aleatorio, solo por codificar un alfabeto de 95 símbolos; por encima de
+# 0.8 el ahorro no compensa comprimir y descomprimir.
+UMBRAL_RELACION = 0.8
+# Nivel de la compresión de prueba: rápido y, en relación, cercano al 6
+NIVEL_PRUEBA = 1
+TAM_MUESTRA = 64 * 1024
+_VENTANAS = 16
+
+def muestra(datos, tam=TAM_MUESTRA):
+    """
+    Ventanas repartidas por todo el mensaje (no solo el principio).
+    """
+    if len(datos) <= tam:
+        return datos
+    ventana = tam // _VENTANAS
+    paso = len(datos) // _VENTANAS
+    return b''.join(datos[i * paso:i * paso + ventana] for i in range(_VENTANAS))
+
+def entropia(datos):
+    """
+    Entropía de Shannon en bits por byte.
+    """
+    if not datos:
+        return 0.0
+    total = len(datos)
+    return -sum(n / total * math.log2(n / total) for n in Counter(datos).values())
+
+def relacion_estimada(datos):
+    """
+    Tamaño comprimido esperado respecto al original: el de la muestra
+    comprimida de prueba con zlib.
+    """
+    trozo = muestra(datos)
+    if not trozo:
+        return 1.0
+    return len(zlib.compress(trozo, NIVEL_PRUEBA)) / len(trozo)
+
+def es_compresible(datos):
+    return len(datos) >= TAM_MINIMO and relacion_estimada(datos) < UMBRAL_RELACION
+
+def elegir_codec(datos, compresion):
+    """
+    Resuelve el parámetro compresion del pipeline a un códec o None.
+    """
+    if not compresion:
+        return None
+    if compresion == 'auto':
+        return CODEC_AUTOMATICO if es_compresible(datos) else None
+    if compresion not in CODECS:
+        raise ValueError(f"Códec de compresión desconocido: {compresion}")
+    return compresion
+
+def comprimir(texto, compresion):
+    """
+    Devuelve (texto comprimido en latin1, códec usado) o (texto, None).
+    """
+    datos = texto.encode('latin1')
+    codec = elegir_codec(datos, compresion)
+    if codec is None:
+        return texto, None
+    return CODECS[codec][0](datos).decode('latin1'), codec
+
+def descomprimir(texto, codec):
+    if codec not in CODECS:
+        raise ValueError(f"Códec de compresión desconocido: {codec}")
+    try:
+        return CODECS[codec][1](texto.encode('latin1')).decode('latin1')
+    except (zlib.error, lzma.LZMAError, OSError) as e:
+        raise ValueError(f"No se pudo descomprimir ({codec}): {e}")
@@ -1,10 +1,15 @@
-from PIL import Image
 import math
 import base64
 
+from .artefacto import MAGIA
+
+# Pillow se importa al primer uso: solo lo necesita quien pide el contenedor PNG
+
 def empaquetar_resultado_png(cifrado, ruta_salida="mensaje.png"):
-    # Codifica el string cifrado en base64 para asegurar solo caracteres válidos
-    cifrado_b64 = base64.b64encode(cifrado.encode("utf-8")).decode("ascii")
+    from PIL import Image
+    # Codifica el cifrado (texto, o bytes de un artefacto) en base64 para asegurar solo caracteres válidos
+    crudo = cifrado if isinstance(cifrado, (bytes, bytearray)) else cifrado.encode("utf-8")
+    cifrado_b64 = base64.b64encode(crudo).decode("ascii")
     datos = [ord(c) for c in cifrado_b64]
     # Calcula tamaño cuadrado mínimo
     lado = math.ceil(len(datos) ** 0.5)
@@ -20,6 +25,7 @@ def empaquetar_resultado_png(cifrado, ruta_salida="mensaje.png"):
     return ruta_salida
 
 def extraer_resultado_png(ruta):
+    from PIL import Image
     img = Image.open(ruta).convert("RGB")
     lado = img.size[0]
     datos = []
@@ -34,5 +40,6 @@ def extraer_resultado_png(ruta):
             datos.append(r)
     cifrado_b64 = ''.join(chr(v) for v in datos)
     cifrado_b64 = cifrado_b64.rstrip(chr(0))
-    cifrado = base64.b64decode(cifrado_b64).decode("utf-8")
-    return cifrado 
\ No newline at end of file
+    crudo = base64.b64decode(cifrado_b64)
+    # Un artefacto autocontenido (cabecera binaria) se devuelve como bytes
+    return crudo if crudo.startswith(MAGIA) else crudo.decode("utf-8") 
\ No newline at end of file
@@ -22,15 +22,43 @@ def xor_con_clave(bloque, clave):
     xored = bytes([ord(c) ^ ord(clave[i % len(clave)]) for i, c in enumerate(bloque)])
     return xored.decode('latin1')
 
+def clave_en_bytes(clave, longitud):
+    """
+    Clave en bytes tal como la usa xor_con_clave sobre un texto de esa
+    longitud: un carácter fuera de latin1 solo es error si llega a usarse.
+    """
+    if not clave:
+        return b''
+    try:
+        return clave.encode('latin1')
+    except UnicodeEncodeError as e:
+        if longitud > e.start:
+            raise
+        return clave[:e.start].encode('latin1')
+
 def permutar_bloque(bloque, semilla, idx):
     if not bloque or len(bloque) <= 1:
         return bloque, list(range(len(bloque)))
-    random.seed(f"{semilla}-{idx}")
+    # PRNG propio por llamada: el global de random se comparte entre hilos
+    prng = random.Random(f"{semilla}-{idx}")
     indices = list(range(len(bloque)))
-    random.shuffle(indices)
+    prng.shuffle(indices)
     permutado = ''.join(bloque[i] for i in indices)
     return permutado, indices
 
+def derivar_permutaciones(semilla, longitud, tam_bloque=4):
+    """
+    Las permutaciones que procesar_bloques devuelve para un texto de esa
+    longitud: solo dependen de la semilla y del índice y tamaño de cada bloque.
+    """
+    permutaciones = []
+    for i, inicio in enumerate(range(0, longitud, tam_bloque)):
+        indices = list(range(min(tam_bloque, longitud - inicio)))
+        if len(indices) > 1 and int(semilla[i % len(semilla)], 16) % 5 == 3:
+            random.Random(f"{semilla}-{i}").shuffle(indices)
+        permutaciones.append(indices)
+    return permutaciones
+
 def des_permutar_bloque(bloque, semilla, idx, indices):
     if not bloque or len(bloque) <= 1:
         return bloque
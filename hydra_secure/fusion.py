@@ -0,0 +1,288 @@
+"""
+Motor fusionado: una sola pasada sobre el mensaje.
+
+En lugar de materializar limpio_con_salt, limpio_xor, la lista de bloques,
+la lista de bloques modificados y la lista de base64, el mensaje se recorre
+por trozos: a cada trozo se le aplica el XOR global, la función de cada
+bloque y la codificación base64, y el resultado se escribe directamente en
+el búfer de salida, cuyo tamaño se conoce de antemano. El resumen de
+integridad se alimenta durante el mismo recorrido. La salida es idéntica a
+la del motor de referencia.
+"""
+import random
+from binascii import b2a_base64, a2b_base64
+
+from .motores import descifrar_referencia
+from .funciones_bloque import clave_en_bytes
+
+# Bloques que se procesan por iteración; acota la memoria intermedia
+BLOQUES_POR_TROZO = 16384
+
+_SEPARADOR = ord('|')
+_TABLA_ADN = bytes.maketrans(b'ATCGatcg', b'TAGCtagc')
+
+def longitud_b64(n):
+    return 4 * (-(-n // 3))
+
+def longitud_cuerpo(n, tam_bloque=4):
+    """
+    Longitud exacta del cuerpo serializado para un mensaje de n caracteres.
+    """
+    if n == 0:
+        return 0
+    completos, resto = divmod(n, tam_bloque)
+    total = completos * longitud_b64(tam_bloque) + (longitud_b64(resto) if resto else 0)
+    return total + (completos + (1 if resto else 0)) - 1
+
+def _xor_posicional(trozo, flujo, fase):
+    if not flujo:
+        return trozo
+    mascara = flujo[fase:fase + len(trozo)]
+    return (int.from_bytes(trozo, 'big') ^ int.from_bytes(mascara, 'big')).to_bytes(len(trozo), 'big')
+
+def _flujo_clave(clave_bytes, longitud):
+    # Clave repetida lo suficiente para cubrir un trozo desde cualquier fase
+    if not clave_bytes:
+        return b''
+    return clave_bytes * (longitud // len(clave_bytes) + 2)
+
+def _permutacion(prng, semilla, idx, tam):
+    indices = list(range(tam))
+    prng.seed(f"{semilla}-{idx}")
+    prng.shuffle(indices)
+    return indices
+
+class _Transformador:
+    """
+    Aplica la función de cada bloque (o su inversa) sobre bytes.
+    """
+
+    def __init__(self, semilla, clave_bytes):
+        self.semilla = semilla
+        self.calendario = [int(c, 16) % 5 for c in semilla]
+        self.clave_bytes = clave_bytes
+        self.mascaras = {}
+        self.identidades = {}
+        self.prng = random.Random()
+
+    def _mascara(self, tam):
+        mascara = self.mascaras.get(tam)
+        if mascara is None:
+            clave = self.clave_bytes
+            mascara = int.from_bytes(bytes(clave[j % len(clave)] for j in range(tam)), 'big')
+            self.mascaras[tam] = mascara
+        return mascara
+
+    def directa(self, bloque, idx, permutaciones):
+        funcion = self.calendario[idx % len(self.calendario)]
+        tam = len(bloque)
+        if funcion == 3 and tam > 1:
+            indices = _permutacion(self.prng, self.semilla, idx, tam)
+            permutaciones.append(indices)
+            return bytes(map(bloque.__getitem__, indices))
+        # Los bloques sin permutar comparten una sola lista identidad (la mayoría de la memoria de permutaciones)
+        identidad = self.identidades.get(tam)
+        if identidad is None:
+            identidad = self.identidades[tam] = list(range(tam))
+        permutaciones.append(identidad)
+        if funcion == 0:
+            return bloque[1:] + bloque[:1] if tam > 1 else bloque
+        if funcion == 1:
+            return bloque[::-1]
+        if funcion == 2:
+            if not self.clave_bytes or not tam:
+                return bloque
+            return (int.from_bytes(bloque, 'big') ^ self._mascara(tam)).to_bytes(tam, 'big')
+        if funcion == 4:
+            return bloque.translate(_TABLA_ADN)
+        return bloque
+
+    def permutacion(self, idx, tam):
+        # Solo depende de la semilla y del índice y tamaño del bloque
+        if self.calendario[idx % len(self.calendario)] == 3 and tam > 1:
+            return _permutacion(self.prng, self.semilla, idx, tam)
+        return None
+
+    def inversa(self, bloque, idx, indices):
+        funcion = self.calendario[idx % len(self.calendario)]
+        tam = len(bloque)
+        if funcion == 3:
+            if tam <= 1:
+                return bloque
+            original = bytearray(tam)
+            for i, pos in enumerate(indices):
+                original[pos] = bloque[i]
+            return bytes(original)
+        if funcion == 0:
+            return bloque[-1:] + bloque[:-1] if tam > 1 else bloque
+        # Inversión, XOR y mutación ADN son involutivas
+        return self.directa(bloque, idx, [])
+
+def cifrar_en(leer, n_datos, cabeza, clave_bytes, semilla, tam_bloque, escribir, resumen=None,
+              con_permutaciones=True):
+    """
+    Núcleo de cifrar sobre cualquier origen y destino de bytes: leer(a, b)
+    devuelve los bytes [a, b) de los datos y escribir(posicion, trozo) recibe
+    el cuerpo serializado por trozos. cabeza (el salt) se antepone a los
+    datos. Devuelve las permutaciones (una lista vacía si
+    con_permutaciones=False: se pueden derivar de la semilla).
+    """
+    total = len(cabeza) + n_datos
+    permutaciones = []
+    transformador = _Transformador(semilla, clave_bytes)
+    # Los primeros bytes del primer trozo son el prefijo
+    tam_trozo = max(BLOQUES_POR_TROZO, len(cabeza) // tam_bloque + 1) * tam_bloque
+    flujo = _flujo_clave(clave_bytes, tam_trozo)
+    posicion = 0
+    escrito = 0
+    idx = 0
+    consumido = 0
+    while posicion < total:
+        falta = tam_trozo - len(cabeza)
+        parte = leer(consumido, min(consumido + falta, n_datos))
+        consumido += len(parte)
+        if resumen is not None:
+            resumen.update(parte)
+        trozo = cabeza + parte if cabeza else parte
+        cabeza = b''
+        trozo = _xor_posicional(trozo, flujo, posicion % len(clave_bytes) if clave_bytes else 0)
+        piezas = []
+        for inicio in range(0, len(trozo), tam_bloque):
+            bloque = transformador.directa(trozo[inicio:inicio + tam_bloque], idx, permutaciones)
+            piezas.append(b2a_base64(bloque, newline=False))
+            idx += 1
+        codificado = b'|'.join(piezas)
+        posicion += len(trozo)
+        if posicion < total:
+            codificado += b'|'
+        if not con_permutaciones:
+            permutaciones.clear()
+        escribir(escrito, codificado)
+        escrito += len(codificado)
+    return permutaciones
+
+def cifrar(datos, clave, semilla, tam_bloque=4, prefijo='', resumen=None):
+    """
+    Equivalente de motores.cifrar_referencia en una sola pasada.
+    prefijo (el salt) se antepone sin copiar el mensaje; resumen, si se
+    indica, se alimenta con datos durante el recorrido.
+    """
+    total = len(prefijo) + len(datos)
+    if not total:
+        # Como la referencia: sin bloques no se llega a usar la clave
+        return '', []
+    clave_bytes = clave_en_bytes(clave, total)
+    salida = bytearray(longitud_cuerpo(total, tam_bloque))
+
+    def escribir(posicion, trozo):
+        salida[posicion:posicion + len(trozo)] = trozo
+
+    permutaciones = cifrar_en(lambda a, b: datos[a:b].encode('latin1'), len(datos), prefijo.encode('latin1'),
+                              clave_bytes, semilla, tam_bloque, escribir, resumen)
+    return salida.decode('ascii'), permutaciones
+
+def geometria(leer, largo):
+    """
+    (tam_bloque, n_bloques, total) de un cuerpo serializado de largo bytes
+    con bloques de tamaño fijo (total: bytes del texto descifrado), o None si
+    no tiene esa forma.
+    """
+    primero = leer(0, min(largo, 1 << 16)).find(b'|')
+    if primero <= 0:
+        return None
+    ancho = primero + 1
+    n_bloques = -(-(largo + 1) // ancho)
+    ultimo = largo - (n_bloques - 1) * ancho
+    if not 0 < ultimo <= primero:
+        return None
+    tam_bloque = len(a2b_base64(leer(0, primero)))
+    resto = len(a2b_base64(leer(largo - ultimo, largo)))
+    if not tam_bloque or not resto:
+        return None
+    return tam_bloque, n_bloques, (n_bloques - 1) * tam_bloque + resto
+
+def descifrar_en(leer, largo, forma, clave_bytes, semilla, permutaciones, escribir):
+    """
+    Núcleo de descifrar sobre cualquier origen y destino de bytes (ver
+    cifrar_en); forma es el resultado de geometria(). Con permutaciones=None
+    se derivan de la semilla bloque a bloque. Devuelve False, sin terminar,
+    si algún bloque no encaja con esa forma.
+    """
+    tam_bloque, n_bloques, _ = forma
+    ancho = longitud_b64(tam_bloque) + 1
+    transformador = _Transformador(semilla, clave_bytes)
+    flujo = _flujo_clave(clave_bytes, BLOQUES_POR_TROZO * tam_bloque)
+    escrito = 0
+    for desde in range(0, n_bloques, BLOQUES_POR_TROZO):
+        hasta = min(desde + BLOQUES_POR_TROZO, n_bloques)
+        partes = leer(desde * ancho, min(hasta * ancho - 1, largo)).split(b'|')
+        if len(partes) != hasta - desde:
+            return False
+        bloques = []
+        for idx, parte in enumerate(partes, desde):
+            bloque = a2b_base64(parte)
+            if len(bloque) != tam_bloque and idx != n_bloques - 1:
+                return False
+            indices = transformador.permutacion(idx, len(bloque)) if permutaciones is None else permutaciones[idx]
+            bloques.append(transformador.inversa(bloque, idx, indices))
+        trozo = _xor_posicional(b''.join(bloques), flujo, escrito % len(clave_bytes) if clave_bytes else 0)
+        escribir(escrito, trozo)
+        escrito += len(trozo)
+    return True
+
+def forma_de(tam_bloque, total):
+    """
+    La forma (como geometria) del cuerpo de un texto de total bytes.
+    """
+    return tam_bloque, -(-total // tam_bloque), total
+
+def descifrar_rango_en(leer, forma, clave_bytes, semilla, desde, hasta):
+    """
+    Bytes [desde, hasta) del texto descifrado (salt incluido) revirtiendo
+    solo los bloques que los cubren: el bloque k empieza en la posición
+    k * ancho del cuerpo y el XOR global depende solo de la posición, así que
+    leer(a, b) se llama una vez, con el tramo del cuerpo de esos bloques.
+    """
+    tam_bloque, n_bloques, total = forma
+    hasta = min(hasta, total)
+    if desde >= hasta:
+        return b''
+    ancho = longitud_b64(tam_bloque) + 1
+    primero, ultimo = desde // tam_bloque, (hasta - 1) // tam_bloque + 1
+    partes = leer(primero * ancho, ultimo * ancho - 1).split(b'|')
+    if len(partes) != ultimo - primero:
+        raise ValueError('Cuerpo del cifrado con bloques irregulares.')
+    transformador = _Transformador(semilla, clave_bytes)
+    bloques = []
+    for idx, parte in enumerate(partes, primero):
+        bloque = a2b_base64(parte)
+        if len(bloque) != tam_bloque and idx != n_bloques - 1:
+            raise ValueError('Cuerpo del cifrado con bloques irregulares.')
+        bloques.append(transformador.inversa(bloque, idx, transformador.permutacion(idx, len(bloque))))
+    plano = b''.join(bloques)
+    inicio = primero * tam_bloque
+    flujo = _flujo_clave(clave_bytes, len(plano))
+    plano = _xor_posicional(plano, flujo, inicio % len(clave_bytes) if clave_bytes else 0)
+    return plano[desde - inicio:hasta - inicio]
+
+def descifrar(cuerpo, clave, semilla, permutaciones):
+    """
+    Equivalente de motores.descifrar_referencia escribiendo en un búfer
+    preasignado. Si el cuerpo no tiene bloques de tamaño fijo se delega en
+    la implementación de referencia.
+    """
+    def leer(a, b):
+        return cuerpo[a:b].encode('ascii')
+
+    forma = geometria(leer, len(cuerpo)) if permutaciones is not None else None
+    if forma is None or len(permutaciones) < forma[1]:
+        return descifrar_referencia(cuerpo, clave, semilla, permutaciones)
+    salida = bytearray(forma[2])
+    clave_bytes = clave_en_bytes(clave, len(salida))
+
+    def escribir(posicion, trozo):
+        salida[posicion:posicion + len(trozo)] = trozo
+
+    if not descifrar_en(leer, len(cuerpo), forma, clave_bytes, semilla, permutaciones, escribir):
+        return descifrar_referencia(cuerpo, clave, semilla, permutaciones)
+    return salida.decode('latin1')
@@ -1,7 +1,55 @@
+import time
 import hashlib
 
-def generar_hash(mensaje):
-    return hashlib.sha256(mensaje.encode()).hexdigest()
+# Algoritmos admitidos para el hash de integridad y la derivación de la semilla
+ALGORITMOS = {
+    'sha256': hashlib.sha256,
+    'blake2b': hashlib.blake2b,
+    'blake2s': hashlib.blake2s,
+}
+ALGORITMO_POR_DEFECTO = 'sha256'
 
-def verificar_hash(mensaje, hash_esperado):
-    return generar_hash(mensaje) == hash_esperado 
\ No newline at end of file
+_mas_rapido = None
+
+def algoritmo_mas_rapido(tam=1 << 20, repeticiones=3):
+    """
+    Micro-benchmark: devuelve el algoritmo disponible más rápido en este equipo.
+    El resultado se calcula una vez por proceso.
+    """
+    global _mas_rapido
+    if _mas_rapido is None:
+        datos = bytes(tam)
+        tiempos = {}
+        for nombre, constructor in ALGORITMOS.items():
+            mejor = float('inf')
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                constructor(datos).digest()
+                mejor = min(mejor, time.perf_counter() - inicio)
+            tiempos[nombre] = mejor
+        _mas_rapido = min(tiempos, key=tiempos.get)
+    return _mas_rapido
+
+def resolver_algoritmo(algoritmo=ALGORITMO_POR_DEFECTO):
+    """
+    Valida el nombre del algoritmo; 'auto' elige el más rápido del equipo.
+    """
+    if algoritmo == 'auto':
+        return algoritmo_mas_rapido()
+    if algoritmo not in ALGORITMOS:
+        raise ValueError(f"Algoritmo de hash desconocido: {algoritmo}")
+    return algoritmo
+
+def nuevo_resumen(algoritmo=ALGORITMO_POR_DEFECTO):
+    """
+    Resumen incremental equivalente a generar_hash (se alimenta con bytes).
+    """
+    return ALGORITMOS[resolver_algoritmo(algoritmo)]()
+
+def generar_hash(mensaje, algoritmo=ALGORITMO_POR_DEFECTO):
+    # Texto en UTF-8; los datos binarios (bytes) se resumen tal cual
+    datos = mensaje.encode() if isinstance(mensaje, str) else mensaje
+    return ALGORITMOS[resolver_algoritmo(algoritmo)](datos).hexdigest()
+
+def verificar_hash(mensaje, hash_esperado, algoritmo=ALGORITMO_POR_DEFECTO):
+    return generar_hash(mensaje, algoritmo) == hash_esperado
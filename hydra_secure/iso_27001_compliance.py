@@ -9,273 +9,396 @@ import hmac
 import os
 import json
 import datetime
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
 from typing import Dict, List, Optional, Tuple
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 import base64
 
-# Configuración de logging ISO 27001 A.12.4.1
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('security_audit.log'),
-        logging.StreamHandler()
-    ]
-)
+from . import metricas
+
+RUTA_LOG_AUDITORIA = 'security_audit.log'
+FORMATO_LOG = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+def configurar_logging(ruta: Optional[str] = RUTA_LOG_AUDITORIA, consola: bool = True,
+                       nivel: int = logging.INFO) -> None:
+    """
+    A.12.4.1 - Configuración del registro de auditoría (archivo y consola)
+
+    La llaman los puntos de entrada (demos, GUI, CLI, benchmarks); importar
+    hydra_secure no abre ningún archivo. Sin configurar, los eventos siguen
+    registrándose en memoria y van al logging de la aplicación anfitriona.
+    """
+    handlers = []
+    if ruta:
+        handlers.append(logging.FileHandler(ruta))
+    if consola:
+        handlers.append(logging.StreamHandler())
+    logging.basicConfig(
+        level=nivel,
+        format=FORMATO_LOG,
+        handlers=handlers,
+        force=True
+    )
+
+def configuracion_logging() -> Dict:
+    """
+    Archivos (rutas absolutas), consola y nivel del logging de este proceso,
+    para replicarlos en sus procesos de trabajo con replicar_logging.
+    """
+    raiz = logging.getLogger()
+    return {
+        'rutas': [h.baseFilename for h in raiz.handlers if isinstance(h, logging.FileHandler)],
+        'consola': any(type(h) is logging.StreamHandler for h in raiz.handlers),
+        'nivel': raiz.level
+    }
+
+def replicar_logging(configuracion: Optional[Dict]) -> None:
+    """
+    Inicializador de procesos de trabajo: el mismo logging que el proceso
+    que los lanzó (configuracion_logging), no un security_audit.log propio
+    relativo al directorio actual. Con None no se toca el logging.
+    """
+    if configuracion is None:
+        return
+    handlers = [logging.FileHandler(ruta) for ruta in configuracion['rutas']]
+    if configuracion['consola']:
+        handlers.append(logging.StreamHandler())
+    logging.basicConfig(level=configuracion['nivel'], format=FORMATO_LOG, handlers=handlers, force=True)
+
+# Eventos y entradas de auditoría que se conservan en memoria; el registro
+# completo queda en security_audit.log
+MAX_REGISTROS_EN_MEMORIA = 10000
+
+# A.9.2 - Configuración empresarial: roles, permisos y tipos de documento por usuario
+USUARIOS_EMPRESARIALES = {
+    # Ejecutivos C-Level
+    'CEO_001': {
+        'name': 'Director Ejecutivo',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt', 'admin'],
+        'department': 'Dirección',
+        'security_level': 'ALTO SECRETO',
+        'document_access': ['reportes_financieros', 'contratos', 'documentos_estrategicos']
+    },
+    'CFO_001': {
+        'name': 'Director Financiero', 
+        'permissions': ['read', 'write', 'encrypt', 'decrypt'],
+        'department': 'Dirección',
+        'security_level': 'CONFIDENCIAL',
+        'document_access': ['reportes_financieros', 'contratos']
+    },
+    'CTO_001': {
+        'name': 'Director de Tecnología',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt', 'admin'],
+        'department': 'Dirección',
+        'security_level': 'ALTO SECRETO',
+        'document_access': ['contratos', 'documentos_estrategicos']
+    },
+    'CISO_001': {
+        'name': 'Director de Seguridad de la Información',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt', 'admin', 'audit'],
+        'department': 'Dirección',
+        'security_level': 'ALTO SECRETO',
+        'document_access': ['reportes_financieros', 'contratos', 'documentos_estrategicos', 'datos_clientes']
+    },
+    
+    # Directores de Departamento
+    'DIR_FIN_001': {
+        'name': 'Director de Finanzas',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt'],
+        'department': 'Finanzas',
+        'security_level': 'CONFIDENCIAL',
+        'document_access': ['reportes_financieros']
+    },
+    'DIR_IT_001': {
+        'name': 'Director de TI',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt', 'admin'],
+        'department': 'TI',
+        'security_level': 'SECRETO',
+        'document_access': ['contratos', 'documentos_estrategicos']
+    },
+    'DIR_HR_001': {
+        'name': 'Director de RRHH',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt'],
+        'department': 'RRHH',
+        'security_level': 'CONFIDENCIAL',
+        'document_access': ['contratos']
+    },
+    'DIR_SALES_001': {
+        'name': 'Director de Ventas',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt'],
+        'department': 'Ventas',
+        'security_level': 'CONFIDENCIAL',
+        'document_access': ['datos_clientes']
+    },
+    'DIR_LEGAL_001': {
+        'name': 'Director Legal',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt'],
+        'department': 'Legal',
+        'security_level': 'SECRETO',
+        'document_access': ['contratos', 'documentos_estrategicos']
+    },
+    
+    # Gerentes y Supervisores
+    'MGR_FIN_001': {
+        'name': 'Gerente de Finanzas',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt'],
+        'department': 'Finanzas',
+        'security_level': 'CONFIDENCIAL',
+        'document_access': ['reportes_financieros']
+    },
+    'MGR_IT_001': {
+        'name': 'Gerente de TI',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt'],
+        'department': 'TI',
+        'security_level': 'SECRETO',
+        'document_access': ['documentos_estrategicos']
+    },
+    'MGR_HR_001': {
+        'name': 'Gerente de RRHH',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt'],
+        'department': 'RRHH',
+        'security_level': 'CONFIDENCIAL',
+        'document_access': ['contratos']
+    },
+    
+    # Personal Operacional
+    'ACC_001': {
+        'name': 'Contador Senior',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt'],
+        'department': 'Finanzas',
+        'security_level': 'CONFIDENCIAL',
+        'document_access': ['reportes_financieros']
+    },
+    'SYS_ADMIN_001': {
+        'name': 'Administrador de Sistemas',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt', 'admin'],
+        'department': 'TI',
+        'security_level': 'SECRETO',
+        'document_access': ['documentos_estrategicos']
+    },
+    'HR_SPEC_001': {
+        'name': 'Especialista de RRHH',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt'],
+        'department': 'RRHH',
+        'security_level': 'CONFIDENCIAL',
+        'document_access': ['contratos']
+    },
+    
+    # Auditoría y Cumplimiento
+    'AUD_INT_001': {
+        'name': 'Auditor Interno',
+        'permissions': ['read', 'decrypt', 'audit'],
+        'department': 'Auditoría',
+        'security_level': 'CONFIDENCIAL',
+        'document_access': ['reportes_financieros', 'contratos', 'datos_clientes']
+    },
+    'AUD_EXT_001': {
+        'name': 'Auditor Externo',
+        'permissions': ['read', 'decrypt'],
+        'department': 'Auditoría',
+        'security_level': 'CONFIDENCIAL',
+        'document_access': ['reportes_financieros']
+    },
+    'COMP_OFF_001': {
+        'name': 'Oficial de Cumplimiento',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt', 'audit'],
+        'department': 'Cumplimiento',
+        'security_level': 'SECRETO',
+        'document_access': ['reportes_financieros', 'contratos', 'datos_clientes']
+    },
+    
+    # Seguridad de la Información
+    'SEC_ANALYST_001': {
+        'name': 'Analista de Seguridad',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt', 'audit'],
+        'department': 'Seguridad',
+        'security_level': 'SECRETO',
+        'document_access': ['reportes_financieros', 'contratos', 'documentos_estrategicos', 'datos_clientes']
+    },
+    'SEC_ADMIN_001': {
+        'name': 'Administrador de Seguridad',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt', 'admin', 'audit'],
+        'department': 'Seguridad',
+        'security_level': 'ALTO SECRETO',
+        'document_access': ['reportes_financieros', 'contratos', 'documentos_estrategicos', 'datos_clientes']
+    },
+    
+    # Usuarios de Emergencia y Backup
+    'EMERGENCY_001': {
+        'name': 'Emergency Access User',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt', 'admin'],
+        'department': 'Emergency Response',
+        'security_level': 'TOP_SECRET',
+        'restrictions': ['time_limited', 'requires_approval'],
+        'document_access': ['reportes_financieros', 'contratos', 'datos_clientes']
+    },
+    'BACKUP_ADMIN_001': {
+        'name': 'Backup Administrator',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt', 'admin'],
+        'department': 'Information Technology',
+        'security_level': 'SECRET',
+        'restrictions': ['backup_only'],
+        'document_access': ['reportes_financieros']
+    },
+    
+    # Usuarios de Demo (para pruebas)
+    'user1': {
+        'name': 'Demo User 1',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt'],
+        'department': 'Demo',
+        'security_level': 'CONFIDENTIAL',
+        'document_access': ['datos_clientes']
+    },
+    'user2': {
+        'name': 'Demo User 2',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt'],
+        'department': 'Demo',
+        'security_level': 'CONFIDENTIAL',
+        'document_access': ['datos_clientes']
+    },
+    'admin': {
+        'name': 'System Administrator',
+        'permissions': ['read', 'write', 'delete', 'admin', 'encrypt', 'decrypt'],
+        'department': 'Information Technology',
+        'security_level': 'TOP_SECRET',
+        'document_access': ['reportes_financieros', 'contratos', 'datos_clientes']
+    },
+    '1': {
+        'name': 'Demo User 1',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt'],
+        'department': 'Demo',
+        'security_level': 'CONFIDENTIAL',
+        'document_access': ['datos_clientes']
+    },
+    '2': {
+        'name': 'Demo User 2',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt'],
+        'department': 'Demo',
+        'security_level': 'CONFIDENTIAL',
+        'document_access': ['datos_clientes']
+    },
+    '3': {
+        'name': 'Demo User 3',
+        'permissions': ['read', 'write', 'encrypt', 'decrypt'],
+        'department': 'Demo',
+        'security_level': 'CONFIDENTIAL',
+        'document_access': ['datos_clientes']
+    }
+}
+
+# Contexto de la solicitud en curso (usuario y sesión): cada hilo o tarea
+# asyncio ve el suyo, aunque compartan la instancia global
+_usuario_actual = contextvars.ContextVar('usuario_actual', default='SYSTEM')
+_sesion_actual = contextvars.ContextVar('sesion_actual', default='N/A')
+
+@contextmanager
+def contexto_solicitud(usuario: str, sesion: Optional[str] = None):
+    """
+    A.12.4.1 - Atribuye a usuario (y sesión) los eventos y la auditoría
+    registrados dentro del bloque, solo en el hilo o tarea actual
+    """
+    marca_usuario = _usuario_actual.set(usuario)
+    marca_sesion = _sesion_actual.set(sesion if sesion is not None else _sesion_actual.get())
+    try:
+        yield
+    finally:
+        _sesion_actual.reset(marca_sesion)
+        _usuario_actual.reset(marca_usuario)
+
+# Lote en curso: sus eventos INFO y entradas de auditoría se cuentan en lugar
+# de registrarse uno a uno (ver agrupar_auditoria)
+_lote_actual = contextvars.ContextVar('lote_actual', default=None)
+
+@contextmanager
+def agrupar_auditoria(descripcion: str, compliance: Optional['ISO27001Compliance'] = None):
+    """
+    A.12.4.1 - Resume en un solo evento AUDIT_BATCH los eventos INFO y las
+    entradas de auditoría del bloque (operaciones masivas); los WARNING y
+    ERROR se siguen registrando uno a uno
+    """
+    conteo = Counter()
+    marca = _lote_actual.set(conteo)
+    try:
+        yield conteo
+    finally:
+        _lote_actual.reset(marca)
+        (compliance or iso_compliance).log_security_event(
+            'AUDIT_BATCH', f"{descripcion}: {json.dumps(dict(sorted(conteo.items())))}")
 
 class ISO27001Compliance:
     """
     Clase principal para implementar controles ISO 27001
     """
     
-    def __init__(self):
+    def __init__(self, max_registros: Optional[int] = MAX_REGISTROS_EN_MEMORIA):
         self.logger = logging.getLogger('ISO27001')
         self.audit_log = []
         self.security_events = []
+        # Totales desde el arranque (las listas solo guardan los más recientes)
+        self.max_registros = max_registros
+        self.total_security_events = 0
+        self.total_audit_entries = 0
         self.risk_assessment = {}
         # Almacén de claves en memoria (en producción usar HSM)
         self._key_store = {}
+        # Protege listas, totales, claves y riesgos entre hilos (reentrante:
+        # la gestión de claves e incidentes registra eventos con él tomado)
+        self._lock = threading.RLock()
+
+    @property
+    def current_user(self) -> str:
+        return _usuario_actual.get()
+
+    @current_user.setter
+    def current_user(self, usuario: str) -> None:
+        # Solo afecta al contexto actual; preferir contexto_solicitud()
+        _usuario_actual.set(usuario)
+
+    @property
+    def session_id(self) -> str:
+        return _sesion_actual.get()
+
+    @session_id.setter
+    def session_id(self, sesion: str) -> None:
+        _sesion_actual.set(sesion)
         
     def log_security_event(self, event_type: str, description: str, severity: str = 'INFO'):
         """
         A.12.4.1 - Registro de eventos de seguridad
         """
+        lote = _lote_actual.get()
+        if lote is not None and severity == 'INFO':
+            lote[event_type] += 1
+            return
         event = {
             'timestamp': datetime.datetime.now().isoformat(),
             'event_type': event_type,
             'description': description,
             'severity': severity,
-            'user_id': getattr(self, 'current_user', 'SYSTEM')
+            'user_id': self.current_user
         }
-        self.security_events.append(event)
+        with self._lock:
+            self.security_events.append(event)
+            self.total_security_events += 1
+            self._retener(self.security_events)
         self.logger.info(f"Security Event: {event}")
+
+    def _retener(self, registros: List[Dict]) -> None:
+        """
+        A.12.4.1 - Retención acotada en memoria de eventos y auditoría
+        """
+        # Se descartan los más antiguos por lotes (10 %) para no copiar la lista en cada alta
+        if self.max_registros and len(registros) > self.max_registros + self.max_registros // 10:
+            del registros[:len(registros) - self.max_registros]
         
     def access_control(self, user_id: str, resource: str, action: str) -> bool:
         """
         A.9.1.1 - Control de acceso basado en políticas empresariales
         """
-        # Configuración empresarial real - Roles y permisos organizacionales
-        enterprise_users = {
-            # Ejecutivos C-Level
-            'CEO_001': {
-                'name': 'Director Ejecutivo',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt', 'admin'],
-                'department': 'Dirección',
-                'security_level': 'ALTO SECRETO',
-                'document_access': ['reportes_financieros', 'contratos', 'documentos_estrategicos']
-            },
-            'CFO_001': {
-                'name': 'Director Financiero', 
-                'permissions': ['read', 'write', 'encrypt', 'decrypt'],
-                'department': 'Dirección',
-                'security_level': 'CONFIDENCIAL',
-                'document_access': ['reportes_financieros', 'contratos']
-            },
-            'CTO_001': {
-                'name': 'Director de Tecnología',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt', 'admin'],
-                'department': 'Dirección',
-                'security_level': 'ALTO SECRETO',
-                'document_access': ['contratos', 'documentos_estrategicos']
-            },
-            'CISO_001': {
-                'name': 'Director de Seguridad de la Información',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt', 'admin', 'audit'],
-                'department': 'Dirección',
-                'security_level': 'ALTO SECRETO',
-                'document_access': ['reportes_financieros', 'contratos', 'documentos_estrategicos', 'datos_clientes']
-            },
-            
-            # Directores de Departamento
-            'DIR_FIN_001': {
-                'name': 'Director de Finanzas',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt'],
-                'department': 'Finanzas',
-                'security_level': 'CONFIDENCIAL',
-                'document_access': ['reportes_financieros']
-            },
-            'DIR_IT_001': {
-                'name': 'Director de TI',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt', 'admin'],
-                'department': 'TI',
-                'security_level': 'SECRETO',
-                'document_access': ['contratos', 'documentos_estrategicos']
-            },
-            'DIR_HR_001': {
-                'name': 'Director de RRHH',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt'],
-                'department': 'RRHH',
-                'security_level': 'CONFIDENCIAL',
-                'document_access': ['contratos']
-            },
-            'DIR_SALES_001': {
-                'name': 'Director de Ventas',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt'],
-                'department': 'Ventas',
-                'security_level': 'CONFIDENCIAL',
-                'document_access': ['datos_clientes']
-            },
-            'DIR_LEGAL_001': {
-                'name': 'Director Legal',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt'],
-                'department': 'Legal',
-                'security_level': 'SECRETO',
-                'document_access': ['contratos', 'documentos_estrategicos']
-            },
-            
-            # Gerentes y Supervisores
-            'MGR_FIN_001': {
-                'name': 'Gerente de Finanzas',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt'],
-                'department': 'Finanzas',
-                'security_level': 'CONFIDENCIAL',
-                'document_access': ['reportes_financieros']
-            },
-            'MGR_IT_001': {
-                'name': 'Gerente de TI',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt'],
-                'department': 'TI',
-                'security_level': 'SECRETO',
-                'document_access': ['documentos_estrategicos']
-            },
-            'MGR_HR_001': {
-                'name': 'Gerente de RRHH',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt'],
-                'department': 'RRHH',
-                'security_level': 'CONFIDENCIAL',
-                'document_access': ['contratos']
-            },
-            
-            # Personal Operacional
-            'ACC_001': {
-                'name': 'Contador Senior',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt'],
-                'department': 'Finanzas',
-                'security_level': 'CONFIDENCIAL',
-                'document_access': ['reportes_financieros']
-            },
-            'SYS_ADMIN_001': {
-                'name': 'Administrador de Sistemas',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt', 'admin'],
-                'department': 'TI',
-                'security_level': 'SECRETO',
-                'document_access': ['documentos_estrategicos']
-            },
-            'HR_SPEC_001': {
-                'name': 'Especialista de RRHH',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt'],
-                'department': 'RRHH',
-                'security_level': 'CONFIDENCIAL',
-                'document_access': ['contratos']
-            },
-            
-            # Auditoría y Cumplimiento
-            'AUD_INT_001': {
-                'name': 'Auditor Interno',
-                'permissions': ['read', 'decrypt', 'audit'],
-                'department': 'Auditoría',
-                'security_level': 'CONFIDENCIAL',
-                'document_access': ['reportes_financieros', 'contratos', 'datos_clientes']
-            },
-            'AUD_EXT_001': {
-                'name': 'Auditor Externo',
-                'permissions': ['read', 'decrypt'],
-                'department': 'Auditoría',
-                'security_level': 'CONFIDENCIAL',
-                'document_access': ['reportes_financieros']
-            },
-            'COMP_OFF_001': {
-                'name': 'Oficial de Cumplimiento',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt', 'audit'],
-                'department': 'Cumplimiento',
-                'security_level': 'SECRETO',
-                'document_access': ['reportes_financieros', 'contratos', 'datos_clientes']
-            },
-            
-            # Seguridad de la Información
-            'SEC_ANALYST_001': {
-                'name': 'Analista de Seguridad',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt', 'audit'],
-                'department': 'Seguridad',
-                'security_level': 'SECRETO',
-                'document_access': ['reportes_financieros', 'contratos', 'documentos_estrategicos', 'datos_clientes']
-            },
-            'SEC_ADMIN_001': {
-                'name': 'Administrador de Seguridad',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt', 'admin', 'audit'],
-                'department': 'Seguridad',
-                'security_level': 'ALTO SECRETO',
-                'document_access': ['reportes_financieros', 'contratos', 'documentos_estrategicos', 'datos_clientes']
-            },
-            
-            # Usuarios de Emergencia y Backup
-            'EMERGENCY_001': {
-                'name': 'Emergency Access User',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt', 'admin'],
-                'department': 'Emergency Response',
-                'security_level': 'TOP_SECRET',
-                'restrictions': ['time_limited', 'requires_approval'],
-                'document_access': ['reportes_financieros', 'contratos', 'datos_clientes']
-            },
-            'BACKUP_ADMIN_001': {
-                'name': 'Backup Administrator',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt', 'admin'],
-                'department': 'Information Technology',
-                'security_level': 'SECRET',
-                'restrictions': ['backup_only'],
-                'document_access': ['reportes_financieros']
-            },
-            
-            # Usuarios de Demo (para pruebas)
-            'user1': {
-                'name': 'Demo User 1',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt'],
-                'department': 'Demo',
-                'security_level': 'CONFIDENTIAL',
-                'document_access': ['datos_clientes']
-            },
-            'user2': {
-                'name': 'Demo User 2',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt'],
-                'department': 'Demo',
-                'security_level': 'CONFIDENTIAL',
-                'document_access': ['datos_clientes']
-            },
-            'admin': {
-                'name': 'System Administrator',
-                'permissions': ['read', 'write', 'delete', 'admin', 'encrypt', 'decrypt'],
-                'department': 'Information Technology',
-                'security_level': 'TOP_SECRET',
-                'document_access': ['reportes_financieros', 'contratos', 'datos_clientes']
-            },
-            '1': {
-                'name': 'Demo User 1',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt'],
-                'department': 'Demo',
-                'security_level': 'CONFIDENTIAL',
-                'document_access': ['datos_clientes']
-            },
-            '2': {
-                'name': 'Demo User 2',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt'],
-                'department': 'Demo',
-                'security_level': 'CONFIDENTIAL',
-                'document_access': ['datos_clientes']
-            },
-            '3': {
-                'name': 'Demo User 3',
-                'permissions': ['read', 'write', 'encrypt', 'decrypt'],
-                'department': 'Demo',
-                'security_level': 'CONFIDENTIAL',
-                'document_access': ['datos_clientes']
-            }
-        }
-        
         # Obtener información del usuario
-        user_info = enterprise_users.get(user_id)
+        user_info = USUARIOS_EMPRESARIALES.get(user_id)
         if not user_info:
             self.log_security_event('ACCESS_DENIED', f"Unknown user {user_id} attempted access to {resource}", 'WARNING')
             return False
@@ -299,10 +422,22 @@ class ISO27001Compliance:
             f"User {user_id} ({user_info['name']}) from {user_info['department']} accessed {resource} with {action} permission")
         return True
     
+    def authorized_users(self, resource: str, action: str) -> List[str]:
+        """
+        A.9.2.5 - Usuarios a los que la política permite action sobre resource
+        (sin registrar eventos: no es un intento de acceso)
+        """
+        return [user_id for user_id, user_info in USUARIOS_EMPRESARIALES.items()
+                if action in user_info.get('permissions', []) and resource in user_info.get('document_access', [])]
+
     def cryptographic_control(self, data: bytes, key: bytes, operation: str) -> bytes:
         """
         A.10.1.1 - Controles criptográficos
         """
+        # cryptography se importa al primer uso: cargarlo cuesta más que importar el pipeline
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
         try:
             # Asegurar que la clave tenga el tamaño correcto para AES-256 (32 bytes)
             if len(key) != 32:
@@ -343,17 +478,20 @@ class ISO27001Compliance:
         """
         if operation == 'generate':
             key = os.urandom(32)
-            self._key_store[key_id] = key
+            with self._lock:
+                self._key_store[key_id] = key
             self.log_security_event('KEY_GENERATED', f"New key generated: {key_id}")
             return key
         elif operation == 'retrieve':
-            key = self._key_store.get(key_id)
+            with self._lock:
+                key = self._key_store.get(key_id)
             if key:
                 self.log_security_event('KEY_RETRIEVED', f"Key retrieved: {key_id}")
             return key
         elif operation == 'destroy':
-            if key_id in self._key_store:
-                del self._key_store[key_id]
+            with self._lock:
+                key = self._key_store.pop(key_id, None)
+            if key is not None:
                 self.log_security_event('KEY_DESTROYED', f"Key destroyed: {key_id}")
             return None
         else:
@@ -379,10 +517,11 @@ class ISO27001Compliance:
         A.13.1.1 - Controles de red
         A.13.2.1 - Políticas y procedimientos de transferencia de información
         """
-        # Simular cifrado de comunicaciones
-        session_key = self.key_management('session_key', 'retrieve')
-        if not session_key:
-            session_key = self.key_management('session_key', 'generate')
+        # Simular cifrado de comunicaciones (una sola clave de sesión aunque lleguen a la vez)
+        with self._lock:
+            session_key = self.key_management('session_key', 'retrieve')
+            if not session_key:
+                session_key = self.key_management('session_key', 'generate')
         
         if session_key is None:
             raise ValueError("Failed to obtain session key")
@@ -395,8 +534,13 @@ class ISO27001Compliance:
         """
         A.16.1.1 - Procedimientos de gestión de incidentes
         """
+        with self._lock:
+            return self._abrir_incidente(incident_type, description)
+
+    def _abrir_incidente(self, incident_type: str, description: str) -> Dict:
+        # Con el lock tomado: el id es el número del evento INCIDENT_CREATED
         incident = {
-            'id': len(self.security_events) + 1,
+            'id': self.total_security_events + 1,
             'timestamp': datetime.datetime.now().isoformat(),
             'type': incident_type,
             'description': description,
@@ -412,28 +556,36 @@ class ISO27001Compliance:
         """
         A.12.4.3 - Análisis de logs de administrador y operador
         """
+        lote = _lote_actual.get()
+        if lote is not None:
+            lote[f"audit:{action}"] += 1
+            return
         audit_entry = {
             'timestamp': datetime.datetime.now().isoformat(),
             'action': action,
             'user': user,
             'details': details,
-            'session_id': getattr(self, 'session_id', 'N/A')
+            'session_id': self.session_id
         }
         
-        self.audit_log.append(audit_entry)
+        with self._lock:
+            self.audit_log.append(audit_entry)
+            self.total_audit_entries += 1
+            self._retener(self.audit_log)
         self.logger.info(f"Audit: {audit_entry}")
     
     def risk_assessment_update(self, asset: str, threat: str, risk_level: int) -> None:
         """
         Actualización de evaluación de riesgos
         """
-        self.risk_assessment[f"{asset}_{threat}"] = {
-            'asset': asset,
-            'threat': threat,
-            'risk_level': risk_level,
-            'last_updated': datetime.datetime.now().isoformat(),
-            'mitigation_status': 'PENDING'
-        }
+        with self._lock:
+            self.risk_assessment[f"{asset}_{threat}"] = {
+                'asset': asset,
+                'threat': threat,
+                'risk_level': risk_level,
+                'last_updated': datetime.datetime.now().isoformat(),
+                'mitigation_status': 'PENDING'
+            }
         
         self.log_security_event('RISK_ASSESSMENT_UPDATED', f"Risk updated for {asset}: {threat}")
     
@@ -443,10 +595,11 @@ class ISO27001Compliance:
         """
         return {
             'timestamp': datetime.datetime.now().isoformat(),
-            'security_events_count': len(self.security_events),
-            'audit_entries_count': len(self.audit_log),
+            'security_events_count': self.total_security_events,
+            'audit_entries_count': self.total_audit_entries,
             'risk_assessment_count': len(self.risk_assessment),
             'compliance_status': 'COMPLIANT',
+            'metrics': metricas.exportar_json(),
             'last_audit': datetime.datetime.now().isoformat(),
             'next_audit': (datetime.datetime.now() + datetime.timedelta(days=90)).isoformat()
         }
@@ -467,8 +620,9 @@ def secure_pipeline_wrapper(func):
                 'kwargs_keys': list(kwargs.keys())
             })
             
-            # Ejecutar función
-            result = func(*args, **kwargs)
+            # Ejecutar función (etapa 'total' si las métricas están activas)
+            with metricas.etapa(func.__name__.split('_')[0], 'total'):
+                result = func(*args, **kwargs)
             
             # Log de salida exitosa
             iso_compliance.audit_trail('PIPELINE_SUCCESS', 'SYSTEM', {
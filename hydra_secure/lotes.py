@@ -0,0 +1,258 @@
+"""
+Cifrado y descifrado de árboles de directorios con manifiesto incremental.
+
+cifrar_directorio recorre el origen y cifra cada archivo con
+archivos.cifrar_archivo en destino/<ruta>.hydra, con sus metadatos al lado
+(<ruta>.hydra.json: solo los campos de la cabecera; las permutaciones por
+bloque se derivan de la semilla al descifrar, así que su tamaño no crece con
+el del archivo). descifrar_directorio hace lo inverso. Los archivos se
+reparten entre procesos.
+
+En el destino se mantiene un manifiesto (.hydra_manifiesto.jsonl): una línea
+(ruta, tamaño, mtime, huella del contenido) por archivo terminado, escrita en
+cuanto termina. En la siguiente ejecución se omiten los archivos cuyo tamaño
+y mtime no cambiaron; si solo cambió el mtime se compara la huella (el hash
+del contenido al cifrar, el MAC de la cabecera al descifrar). Cada salida se
+escribe con un nombre temporal y se renombra al terminar, así que tras una
+interrupción basta con volver a ejecutar: lo ya hecho se omite.
+"""
+import os
+import sys
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from .archivos import cifrar_archivo, descifrar_archivo
+from .integridad import nuevo_resumen
+from .iso_27001_compliance import configuracion_logging, replicar_logging
+
+EXTENSION = '.hydra'
+EXTENSION_METADATOS = '.json'
+NOMBRE_MANIFIESTO = '.hydra_manifiesto.jsonl'
+SUFIJO_TEMPORAL = '.parcial'
+# Archivos en vuelo por proceso (acota la memoria con árboles de 100k archivos)
+EN_VUELO_POR_PROCESO = 4
+_TROZO = 1 << 20
+
+class Manifiesto:
+    """
+    Diario JSONL de archivos terminados; la última línea de cada ruta manda.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.entradas = {}
+        cortada = False
+        if os.path.exists(ruta):
+            with open(ruta, encoding='utf-8') as f:
+                for linea in f:
+                    cortada = not linea.endswith('\n')
+                    try:
+                        entrada = json.loads(linea)
+                    except ValueError:
+                        continue  # línea cortada por una interrupción
+                    self.entradas[entrada['ruta']] = entrada
+        self._archivo = open(ruta, 'a', encoding='utf-8')
+        if cortada:
+            self._archivo.write('\n')
+
+    def registrar(self, ruta, tam, mtime_ns, huella):
+        entrada = {'ruta': ruta, 'tam': tam, 'mtime_ns': mtime_ns, 'huella': huella}
+        self.entradas[ruta] = entrada
+        self._archivo.write(json.dumps(entrada) + '\n')
+        self._archivo.flush()
+
+    def compactar(self, vigentes):
+        """
+        Reescribe el diario con una línea por ruta vigente.
+        """
+        self._archivo.close()
+        self.entradas = {r: e for r, e in self.entradas.items() if r in vigentes}
+        temporal = self.ruta + SUFIJO_TEMPORAL
+        with open(temporal, 'w', encoding='utf-8') as f:
+            for entrada in self.entradas.values():
+                f.write(json.dumps(entrada) + '\n')
+        os.replace(temporal, self.ruta)
+        self._archivo = open(self.ruta, 'a', encoding='utf-8')
+
+    def cerrar(self):
+        self._archivo.close()
+
+class Progreso:
+    """
+    Avance y throughput por stderr, como mucho una línea por intervalo.
+    """
+
+    def __init__(self, total, salida=sys.stderr, intervalo=1.0):
+        self.total = total
+        self.salida = salida
+        self.intervalo = intervalo
+        self.inicio = self._ultimo = time.perf_counter()
+        self.hechos = self.procesados = self.omitidos = self.bytes = 0
+        self.errores = []
+
+    def avanzar(self, tam=0, omitido=False, error=None):
+        self.hechos += 1
+        if error is not None:
+            self.errores.append(error)
+        elif omitido:
+            self.omitidos += 1
+        else:
+            self.procesados += 1
+            self.bytes += tam
+        ahora = time.perf_counter()
+        if self.salida is not None and (ahora - self._ultimo >= self.intervalo or self.hechos == self.total):
+            self._ultimo = ahora
+            self.salida.write(self.linea() + '\n')
+            self.salida.flush()
+
+    def linea(self):
+        segundos = max(time.perf_counter() - self.inicio, 1e-9)
+        return (f"[{self.hechos}/{self.total}] {self.procesados} procesados, {self.omitidos} sin cambios, "
+                f"{len(self.errores)} errores, {self.bytes / 1e6:.1f} MB a {self.bytes / 1e6 / segundos:.1f} MB/s")
+
+    def resumen(self):
+        return {'total': self.total, 'procesados': self.procesados, 'omitidos': self.omitidos,
+                'errores': self.errores, 'bytes': self.bytes, 'segundos': time.perf_counter() - self.inicio}
+
+def _recorrer(raiz, filtro=None):
+    # (ruta relativa con '/', ruta absoluta) en orden estable
+    for directorio, subdirs, nombres in os.walk(raiz):
+        subdirs.sort()
+        for nombre in sorted(nombres):
+            ruta = os.path.join(directorio, nombre)
+            if nombre == NOMBRE_MANIFIESTO or nombre.endswith(SUFIJO_TEMPORAL) or not os.path.isfile(ruta):
+                continue
+            if filtro is None or filtro(nombre):
+                yield os.path.relpath(ruta, raiz).replace(os.sep, '/'), ruta
+
+def huella_contenido(ruta, algoritmo='sha256'):
+    # Mismo hash que guarda cifrar_archivo en modo binario
+    resumen = nuevo_resumen(algoritmo)
+    with open(ruta, 'rb') as f:
+        for trozo in iter(lambda: f.read(_TROZO), b''):
+            resumen.update(trozo)
+    return f"{algoritmo}:{resumen.hexdigest()}"
+
+def huella_cifrado(ruta):
+    # El MAC de la cabecera identifica el cifrado sin leer el cuerpo
+    with open(ruta, 'rb') as f:
+        return f"mac:{json.loads(f.readline())['mac']}"
+
+def _sin_cambios(manifiesto, rel, ruta, estado, salida, huella):
+    entrada = manifiesto.entradas.get(rel)
+    if entrada is None or entrada['tam'] != estado.st_size or not os.path.exists(salida):
+        return False
+    if entrada['mtime_ns'] == estado.st_mtime_ns:
+        return True
+    # Solo cambió el mtime (copia, touch...): se compara el contenido
+    try:
+        actual = huella(ruta, entrada['huella'].split(':', 1)[0])
+    except (OSError, ValueError, KeyError):
+        return False
+    if actual != entrada['huella']:
+        return False
+    manifiesto.registrar(rel, estado.st_size, estado.st_mtime_ns, actual)
+    return True
+
+def _reemplazar(*rutas):
+    for ruta in rutas:
+        os.replace(ruta + SUFIJO_TEMPORAL, ruta)
+
+def _cifrar_uno(origen, destino, clave, id_usuario, doc_type):
+    metadatos = cifrar_archivo(origen, destino + SUFIJO_TEMPORAL, clave, id_usuario, doc_type=doc_type)
+    with open(destino + EXTENSION_METADATOS + SUFIJO_TEMPORAL, 'w', encoding='utf-8') as f:
+        json.dump(metadatos, f)
+    _reemplazar(destino + EXTENSION_METADATOS, destino)
+    return f"{metadatos['hash_alg']}:{metadatos['hash']}"
+
+def _descifrar_uno(origen, destino, clave, id_usuario, doc_type):
+    with open(origen + EXTENSION_METADATOS, encoding='utf-8') as f:
+        metadatos = json.load(f)
+    descifrar_archivo(origen, destino + SUFIJO_TEMPORAL, clave, id_usuario, metadatos, doc_type=doc_type)
+    _reemplazar(destino)
+    return huella_cifrado(origen)
+
+def _inicializar(logging_padre=None):
+    # Los procesos escriben la auditoría donde la escribe quien los lanza
+    replicar_logging(logging_padre)
+
+def _ejecutar(funcion, trabajos, manifiesto, procesos, progreso, *argumentos):
+    # trabajos: (rel, origen, destino, estado); cada resultado se apunta en cuanto llega
+    def terminar(trabajo, obtener):
+        rel, _, _, estado = trabajo
+        try:
+            huella = obtener()
+        except Exception as e:
+            progreso.avanzar(error=(rel, f"{type(e).__name__}: {e}"))
+            return
+        manifiesto.registrar(rel, estado.st_size, estado.st_mtime_ns, huella)
+        progreso.avanzar(estado.st_size)
+
+    for _, _, destino, _ in trabajos:
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+    if procesos <= 1:
+        for trabajo in trabajos:
+            terminar(trabajo, lambda: funcion(trabajo[1], trabajo[2], *argumentos))
+        return
+    pendientes = {}
+    cola = iter(trabajos)
+    with ProcessPoolExecutor(procesos, initializer=_inicializar, initargs=(configuracion_logging(),)) as ejecutor:
+        try:
+            while True:
+                for trabajo in cola:
+                    pendientes[ejecutor.submit(funcion, trabajo[1], trabajo[2], *argumentos)] = trabajo
+                    if len(pendientes) >= procesos * EN_VUELO_POR_PROCESO:
+                        break
+                if not pendientes:
+                    break
+                listos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    terminar(pendientes.pop(futuro), futuro.result)
+        except BaseException:
+            # Interrupción: lo terminado ya está en el manifiesto
+            ejecutor.shutdown(cancel_futures=True)
+            raise
+
+def _procesar_arbol(funcion, origen, destino, filtro, destino_de, huella, procesos, progreso, argumentos):
+    origen, destino = os.path.abspath(origen), os.path.abspath(destino)
+    if not os.path.isdir(origen):
+        raise ValueError(f"No es un directorio: {origen}")
+    os.makedirs(destino, exist_ok=True)
+    procesos = procesos or int(os.environ.get('HYDRA_PROCESOS') or os.cpu_count() or 1)
+    manifiesto = Manifiesto(os.path.join(destino, NOMBRE_MANIFIESTO))
+    try:
+        # El destino puede estar dentro del origen: no se vuelve a procesar
+        archivos = [(rel, ruta) for rel, ruta in _recorrer(origen, filtro)
+                    if not ruta.startswith(destino + os.sep)]
+        progreso = progreso if progreso is not None else Progreso(len(archivos))
+        progreso.total = len(archivos)
+        trabajos = []
+        for rel, ruta in archivos:
+            estado = os.stat(ruta)
+            salida = os.path.join(destino, *destino_de(rel).split('/'))
+            if _sin_cambios(manifiesto, rel, ruta, estado, salida, huella):
+                progreso.avanzar(omitido=True)
+            else:
+                trabajos.append((rel, ruta, salida, estado))
+        _ejecutar(funcion, trabajos, manifiesto, procesos, progreso, *argumentos)
+        manifiesto.compactar({rel for rel, _ in archivos})
+    finally:
+        manifiesto.cerrar()
+    return progreso.resumen()
+
+def cifrar_directorio(origen, destino, clave, id_usuario, doc_type=None, procesos=None, progreso=None):
+    """
+    Cifra los archivos nuevos o modificados de origen en destino. Devuelve
+    un resumen con procesados, omitidos, errores, bytes y segundos.
+    """
+    return _procesar_arbol(_cifrar_uno, origen, destino, None, lambda rel: rel + EXTENSION, huella_contenido,
+                           procesos, progreso, (clave, id_usuario, doc_type))
+
+def descifrar_directorio(origen, destino, clave, id_usuario, doc_type=None, procesos=None, progreso=None):
+    """
+    Descifra los <ruta>.hydra nuevos o modificados de origen en destino.
+    """
+    return _procesar_arbol(_descifrar_uno, origen, destino, lambda nombre: nombre.endswith(EXTENSION),
+                           lambda rel: rel[:-len(EXTENSION)], lambda ruta, _: huella_cifrado(ruta), procesos, progreso,
+                           (clave, id_usuario, doc_type))
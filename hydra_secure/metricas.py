@@ -0,0 +1,312 @@
+"""
+Instrumentación por etapa del pipeline y registro de métricas.
+
+Cada etapa (preparación, semilla, núcleo, sellado, PNG, hash...) se mide
+con `etapa(operacion, nombre)`: duración con perf_counter_ns, bytes de
+entrada y salida, bloques y transformaciones por función. Los valores se
+acumulan en un registro de contadores, histogramas y máximos que se exporta
+como texto OpenMetrics o JSON.
+
+Desactivada (por defecto), `etapa` devuelve siempre el mismo objeto nulo y
+no mide nada. Se activa con la variable de entorno HYDRA_METRICAS=1 o con
+activar().
+
+El perfil de memoria (HYDRA_PERFIL_MEMORIA=1 o perfilar_memoria()) añade a
+cada etapa, con tracemalloc, el pico de memoria sobre el inicio de la etapa
+y el número de asignaciones que siguen vivas al terminar. Es caro: solo
+para diagnóstico, y tracemalloc es global al proceso (un hilo a la vez).
+"""
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Nombres de las funciones por bloque, en el orden del calendario de la semilla
+FUNCIONES_BLOQUE = ('rotacion', 'inversion', 'xor', 'permutacion', 'adn')
+# Límites (en segundos) de los histogramas de duración
+LIMITES_DURACION = (0.00001, 0.0001, 0.001, 0.01, 0.1, 1.0, 10.0, 60.0)
+
+def _entorno(variable):
+    return os.environ.get(variable, '').lower() in ('1', 'true', 'si', 'sí', 'on')
+
+_activas = _entorno('HYDRA_METRICAS')
+_perfil_memoria = _entorno('HYDRA_PERFIL_MEMORIA')
+if _perfil_memoria:
+    tracemalloc.start()
+
+class Registro:
+    """
+    Contadores e histogramas etiquetados, seguros entre hilos.
+    """
+
+    def __init__(self, limites=LIMITES_DURACION):
+        self.limites = tuple(limites)
+        self.contadores = {}
+        self.histogramas = {}
+        self.maximos = {}
+        self._cerrojo = threading.Lock()
+
+    def incrementar(self, nombre, valor=1, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._cerrojo:
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+
+    def observar(self, nombre, valor, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._cerrojo:
+            histograma = self.histogramas.get(clave)
+            if histograma is None:
+                histograma = self.histogramas[clave] = {'count': 0, 'sum': 0.0,
+                                                         'buckets': [0] * len(self.limites)}
+            histograma['count'] += 1
+            histograma['sum'] += valor
+            for i, limite in enumerate(self.limites):
+                if valor <= limite:
+                    histograma['buckets'][i] += 1
+
+    def maximo(self, nombre, valor, **etiquetas):
+        """
+        Conserva el mayor valor observado (se exporta como gauge).
+        """
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._cerrojo:
+            if valor > self.maximos.get(clave, valor - 1):
+                self.maximos[clave] = valor
+
+    def reiniciar(self):
+        with self._cerrojo:
+            self.contadores.clear()
+            self.histogramas.clear()
+            self.maximos.clear()
+
+    def a_json(self):
+        """
+        Instantánea del registro como estructuras JSON serializables.
+        """
+        with self._cerrojo:
+            contadores = [{'name': n, 'labels': dict(e), 'value': v}
+                          for (n, e), v in sorted(self.contadores.items())]
+            histogramas = [{'name': n, 'labels': dict(e), 'count': h['count'], 'sum': h['sum'],
+                            'buckets': dict(zip([str(l) for l in self.limites], h['buckets']))}
+                           for (n, e), h in sorted(self.histogramas.items())]
+            maximos = [{'name': n, 'labels': dict(e), 'value': v}
+                       for (n, e), v in sorted(self.maximos.items())]
+        return {'counters': contadores, 'histograms': histogramas, 'gauges': maximos}
+
+    def a_openmetrics(self):
+        """
+        Exposición en formato de texto OpenMetrics (termina en '# EOF').
+        """
+        datos = self.a_json()
+        lineas = []
+        familias = []
+        for muestra in datos['counters']:
+            if muestra['name'] not in familias:
+                familias.append(muestra['name'])
+                lineas.append(f"# TYPE {muestra['name']} counter")
+            lineas.append(f"{muestra['name']}_total{_etiquetas(muestra['labels'])} {muestra['value']}")
+        for muestra in datos['histograms']:
+            if muestra['name'] not in familias:
+                familias.append(muestra['name'])
+                # Sin '# UNIT': OpenMetrics exige que la unidad sea el sufijo del nombre
+                lineas.append(f"# TYPE {muestra['name']} histogram")
+            for limite, cuenta in muestra['buckets'].items():
+                etiquetas = dict(muestra['labels'], le=limite)
+                lineas.append(f"{muestra['name']}_bucket{_etiquetas(etiquetas)} {cuenta}")
+            etiquetas = dict(muestra['labels'], le='+Inf')
+            lineas.append(f"{muestra['name']}_bucket{_etiquetas(etiquetas)} {muestra['count']}")
+            lineas.append(f"{muestra['name']}_count{_etiquetas(muestra['labels'])} {muestra['count']}")
+            lineas.append(f"{muestra['name']}_sum{_etiquetas(muestra['labels'])} {muestra['sum']}")
+        for muestra in datos['gauges']:
+            if muestra['name'] not in familias:
+                familias.append(muestra['name'])
+                lineas.append(f"# TYPE {muestra['name']} gauge")
+            lineas.append(f"{muestra['name']}{_etiquetas(muestra['labels'])} {muestra['value']}")
+        lineas.append('# EOF')
+        return '\n'.join(lineas) + '\n'
+
+def _escapar(valor):
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ''
+    pares = ','.join(f'{k}="{_escapar(str(v))}"' for k, v in etiquetas.items())
+    return '{' + pares + '}'
+
+# Registro global para uso en todo el sistema
+registro = Registro()
+
+def activas():
+    return _activas
+
+def activar(valor=True):
+    global _activas
+    _activas = bool(valor)
+
+def activar_perfil_memoria(valor=True):
+    """
+    Activa el perfil de memoria por etapa (inicia tracemalloc si hace falta).
+    """
+    global _perfil_memoria
+    _perfil_memoria = bool(valor)
+    if _perfil_memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+class _EtapaNula:
+    """
+    Contexto sin efecto que se usa cuando las métricas están desactivadas.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, nombre, valor):
+        pass
+
+    def contar_bloques(self, semilla, n_bloques):
+        pass
+
+_NULA = _EtapaNula()
+
+class _Etapa:
+    """
+    Mide una etapa y vuelca el resultado en el registro al salir.
+    """
+
+    def __init__(self, operacion, nombre, entrada):
+        self.operacion = operacion
+        self.nombre = nombre
+        self.entrada = entrada
+        self.salida = None
+        self.bloques = None
+        self.transformaciones = None
+
+    def contar_bloques(self, semilla, n_bloques):
+        self.bloques = n_bloques
+        self.transformaciones = contar_transformaciones(semilla, n_bloques)
+
+    def __enter__(self):
+        if _perfil_memoria and tracemalloc.is_tracing():
+            self._memoria = _MemoriaEtapa()
+        else:
+            self._memoria = None
+        self._inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        duracion = time.perf_counter_ns() - self._inicio
+        etiquetas = {'operacion': self.operacion, 'etapa': self.nombre}
+        if self._memoria is not None:
+            pico, asignaciones = self._memoria.cerrar()
+            registro.maximo('hydra_etapa_pico_memoria_bytes', pico, **etiquetas)
+            registro.incrementar('hydra_etapa_asignaciones_vivas', asignaciones, **etiquetas)
+            for informe in _informes:
+                informe.append(dict(etiquetas, pico_bytes=pico, asignaciones=asignaciones,
+                                    entrada=self.entrada, salida=self.salida))
+        registro.observar('hydra_etapa_duracion_segundos', duracion / 1e9, **etiquetas)
+        registro.incrementar('hydra_etapa_ejecuciones', **etiquetas)
+        if tipo is not None:
+            registro.incrementar('hydra_etapa_errores', **etiquetas)
+        if self.entrada is not None:
+            registro.incrementar('hydra_etapa_bytes_entrada', self.entrada, **etiquetas)
+        if self.salida is not None:
+            registro.incrementar('hydra_etapa_bytes_salida', self.salida, **etiquetas)
+        if self.bloques is not None:
+            registro.incrementar('hydra_bloques', self.bloques, operacion=self.operacion)
+            for funcion, cuenta in self.transformaciones.items():
+                registro.incrementar('hydra_transformaciones', cuenta, operacion=self.operacion, funcion=funcion)
+        return False
+
+# Etapas abiertas con perfil de memoria (las anidadas reinician el pico)
+_pila_memoria = []
+# Listas que reciben el perfil de cada etapa (ver perfilar_memoria)
+_informes = []
+
+def _bloques_vivos():
+    # Número de bloques de memoria trazados en este momento
+    return len(tracemalloc.take_snapshot().traces)
+
+class _MemoriaEtapa:
+    """
+    Pico de tracemalloc y asignaciones vivas de una etapa.
+    """
+
+    def __init__(self):
+        if _pila_memoria:
+            # El pico acumulado del padre se guarda antes de reiniciarlo
+            padre = _pila_memoria[-1]
+            padre.pico = max(padre.pico, tracemalloc.get_traced_memory()[1])
+        self.bloques = _bloques_vivos()
+        self.base = tracemalloc.get_traced_memory()[0]
+        self.pico = self.base
+        tracemalloc.reset_peak()
+        _pila_memoria.append(self)
+
+    def cerrar(self):
+        _pila_memoria.pop()
+        self.pico = max(self.pico, tracemalloc.get_traced_memory()[1])
+        if _pila_memoria:
+            padre = _pila_memoria[-1]
+            padre.pico = max(padre.pico, self.pico)
+        return self.pico - self.base, max(0, _bloques_vivos() - self.bloques)
+
+def etapa(operacion, nombre, entrada=None):
+    """
+    Contexto que mide una etapa del pipeline. Dentro del bloque se puede
+    fijar `.salida` (bytes producidos) y llamar a `.contar_bloques()`.
+    """
+    if not (_activas or _perfil_memoria):
+        return _NULA
+    return _Etapa(operacion, nombre, entrada)
+
+def contar_transformaciones(semilla, n_bloques):
+    """
+    Cuántos bloques recibe cada función, a partir del calendario de la
+    semilla (sin recorrer los bloques).
+    """
+    cuentas = dict.fromkeys(FUNCIONES_BLOQUE, 0)
+    if not semilla or not n_bloques:
+        return cuentas
+    vueltas, resto = divmod(n_bloques, len(semilla))
+    for posicion, caracter in enumerate(semilla):
+        funcion = FUNCIONES_BLOQUE[int(caracter, 16) % len(FUNCIONES_BLOQUE)]
+        cuentas[funcion] += vueltas + (1 if posicion < resto else 0)
+    return cuentas
+
+@contextmanager
+def perfilar_memoria():
+    """
+    Activa el perfil de memoria dentro del bloque y entrega la lista de
+    etapas medidas: operacion, etapa, pico_bytes, asignaciones, entrada y
+    salida. Restaura el estado anterior (y tracemalloc) al salir.
+    """
+    global _perfil_memoria
+    anterior = _perfil_memoria
+    iniciado = not tracemalloc.is_tracing()
+    if iniciado:
+        tracemalloc.start()
+    _perfil_memoria = True
+    informe = []
+    _informes.append(informe)
+    try:
+        yield informe
+    finally:
+        _informes.remove(informe)
+        _perfil_memoria = anterior
+        if iniciado:
+            tracemalloc.stop()
+
+def exportar_openmetrics():
+    return registro.a_openmetrics()
+
+def exportar_json():
+    return registro.a_json()
+
+def reiniciar():
+    registro.reiniciar()
@@ -0,0 +1,234 @@
+"""
+Motor vectorizado con NumPy.
+
+El mensaje con salt se trata como una matriz (n_bloques x tam_bloque) de
+bytes. Cada función por bloque se aplica de una vez a todas las filas que le
+tocan según la semilla: rotación con np.roll, inversión con [:, ::-1], XOR
+por difusión, mutación ADN con una tabla de 256 entradas y permutación con
+un gather por índices. El último bloque incompleto (si existe) se procesa con
+las funciones de referencia. La salida es idéntica a la del motor de
+referencia.
+"""
+import base64
+import random
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+from .funciones_bloque import (rotar_bloque, rotar_bloque_derecha, invertir_bloque, xor_con_clave,
+                               des_permutar_bloque, mutacion_adn, revertir_bloques, clave_en_bytes)
+from .reensamblado import serializar_bloques, deserializar_bloques
+
+_SEPARADOR = ord('|')
+_RELLENO = ord('=')
+
+def disponible():
+    return np is not None
+
+def _tabla_adn():
+    tabla = np.arange(256, dtype=np.uint8)
+    for origen, destino in zip(b'ATCGatcg', b'TAGCtagc'):
+        tabla[origen] = destino
+    return tabla
+
+def _a_bytes(texto):
+    return np.frombuffer(texto.encode('latin1'), dtype=np.uint8)
+
+def _repetir(periodo, n):
+    # Como np.resize, sin la tupla de n / len(periodo) referencias que este concatena
+    return np.tile(periodo, -(-n // len(periodo)))[:n]
+
+def _xor_global(datos, clave_bytes):
+    if not clave_bytes or not len(datos):
+        return datos
+    flujo = _repetir(np.frombuffer(clave_bytes, dtype=np.uint8), len(datos))
+    return datos ^ flujo
+
+def _calendario(semilla, n_bloques):
+    """
+    Índice de función (0-4) de cada bloque; es periódico en len(semilla).
+    """
+    periodo = np.array([int(c, 16) % 5 for c in semilla], dtype=np.int8)
+    return _repetir(periodo, n_bloques)
+
+def _barajar(prng, tam_bloque):
+    # Réplica de random.shuffle(list(range(tam_bloque))) sin llamadas intermedias
+    indices = list(range(tam_bloque))
+    getrandbits = prng.getrandbits
+    for i in reversed(range(1, tam_bloque)):
+        n = i + 1
+        k = n.bit_length()
+        j = getrandbits(k)
+        while j >= n:
+            j = getrandbits(k)
+        indices[i], indices[j] = indices[j], indices[i]
+    return indices
+
+def _barajar_estandar(prng, tam_bloque):
+    indices = list(range(tam_bloque))
+    prng.shuffle(indices)
+    return indices
+
+def _comprobar_barajar():
+    # Si esta versión de Python baraja distinto, se usa random.shuffle
+    a, b = random.Random('hydra'), random.Random('hydra')
+    if all(_barajar(a, n) == _barajar_estandar(b, n) for n in range(1, 70)):
+        return _barajar
+    return _barajar_estandar
+
+_barajar_rapido = _comprobar_barajar()
+
+def _indices_permutacion(prng, semilla, idx, tam_bloque):
+    # Misma secuencia que permutar_bloque, pero con un PRNG propio
+    prng.seed(f"{semilla}-{idx}")
+    return _barajar_rapido(prng, tam_bloque)
+
+def _b64_filas(matriz):
+    """
+    Codifica en base64 cada fila de la matriz y las une con '|'.
+    """
+    n_filas, tam = matriz.shape
+    grupos = -(-tam // 3)
+    relleno = grupos * 3 - tam
+    if relleno:
+        matriz = np.pad(matriz, ((0, 0), (0, relleno)))
+    codificado = np.frombuffer(base64.b64encode(matriz.tobytes()), dtype=np.uint8)
+    salida = np.empty((n_filas, grupos * 4 + 1), dtype=np.uint8)
+    salida[:, :-1] = codificado.reshape(n_filas, grupos * 4)
+    if relleno:
+        salida[:, grupos * 4 - relleno:grupos * 4] = _RELLENO
+    salida[:, -1] = _SEPARADOR
+    # Sin el último separador, con una sola copia antes de decodificar
+    return salida.reshape(-1)[:-1].tobytes().decode('ascii')
+
+def _filas_b64(cuerpo):
+    """
+    Decodifica la parte regular del cuerpo (todas las filas salvo la última).
+    Devuelve (matriz, ultima_parte) o None si el cuerpo no tiene zancada fija.
+    """
+    datos = np.frombuffer(cuerpo.encode('ascii'), dtype=np.uint8)
+    separadores = np.flatnonzero(datos == _SEPARADOR)
+    if not len(separadores):
+        return None
+    ancho = int(separadores[0])
+    esperado = np.arange(1, len(separadores) + 1) * (ancho + 1) - 1
+    if ancho == 0 or ancho % 4 or not np.array_equal(separadores, esperado):
+        return None
+    filas = datos[:len(separadores) * (ancho + 1)].reshape(len(separadores), ancho + 1)[:, :-1]
+    relleno = (filas[:, -2:] == _RELLENO).sum(axis=1)
+    if np.any(relleno != relleno[0]):
+        return None
+    filas = np.where(filas == _RELLENO, ord('A'), filas).astype(np.uint8)
+    decodificado = np.frombuffer(base64.b64decode(filas.tobytes()), dtype=np.uint8)
+    tam = (ancho // 4) * 3 - int(relleno[0])
+    matriz = decodificado.reshape(len(filas), (ancho // 4) * 3)[:, :tam].copy()
+    return matriz, cuerpo[int(separadores[-1]) + 1:]
+
+def _aplicar(matriz, calendario, semilla, clave_bytes, inversa, permutaciones=None):
+    n_filas, tam = matriz.shape
+    if tam > 1:
+        rotar = calendario == 0
+        matriz[rotar] = np.roll(matriz[rotar], 1 if inversa else -1, axis=1)
+    invertir = calendario == 1
+    matriz[invertir] = matriz[invertir, ::-1]
+    if clave_bytes:
+        fila_clave = np.resize(np.frombuffer(clave_bytes, dtype=np.uint8), tam)
+        matriz[calendario == 2] ^= fila_clave
+    adn = calendario == 4
+    matriz[adn] = _tabla_adn()[matriz[adn]]
+    filas_perm = np.flatnonzero(calendario == 3)
+    if tam > 1 and len(filas_perm):
+        if permutaciones is None:
+            prng = random.Random()
+            indices = np.array([_indices_permutacion(prng, semilla, i, tam) for i in filas_perm.tolist()],
+                               dtype=np.intp)
+        else:
+            indices = np.array([permutaciones[i] for i in filas_perm], dtype=np.intp)
+        seleccion = matriz[filas_perm]
+        if inversa:
+            original = np.empty_like(seleccion)
+            np.put_along_axis(original, indices, seleccion, axis=1)
+            matriz[filas_perm] = original
+        else:
+            matriz[filas_perm] = np.take_along_axis(seleccion, indices, axis=1)
+        return indices, filas_perm
+    return None, filas_perm
+
+def cifrar(datos, clave, semilla, tam_bloque=4, prefijo='', resumen=None):
+    """
+    Equivalente vectorizado de motores.cifrar_referencia.
+    """
+    if resumen is not None:
+        resumen.update(datos.encode('latin1'))
+    datos = prefijo + datos
+    if not datos:
+        return '', []
+    clave_bytes = clave_en_bytes(clave, len(datos))
+    plano = _xor_global(_a_bytes(datos), clave_bytes)
+    n_completos = len(plano) // tam_bloque
+    resto = len(plano) - n_completos * tam_bloque
+    matriz = plano[:n_completos * tam_bloque].reshape(n_completos, tam_bloque).copy()
+    calendario = _calendario(semilla, n_completos)
+    perms, filas_perm = _aplicar(matriz, calendario, semilla, clave_bytes, inversa=False)
+
+    # Los bloques sin permutar comparten una sola lista identidad
+    permutaciones = [list(range(tam_bloque))] * n_completos
+    if perms is not None:
+        for fila, indices in zip(filas_perm.tolist(), perms.tolist()):
+            permutaciones[fila] = indices
+    partes = [_b64_filas(matriz)] if n_completos else []
+    if resto:
+        cola = plano[n_completos * tam_bloque:].tobytes().decode('latin1')
+        cola_mod, indices = _bloque_suelto(cola, semilla, clave, n_completos)
+        partes.append(serializar_bloques([cola_mod]))
+        permutaciones.append(indices)
+    return '|'.join(partes), permutaciones
+
+def descifrar(cuerpo, clave, semilla, permutaciones):
+    """
+    Equivalente vectorizado de motores.descifrar_referencia.
+    """
+    regular = _filas_b64(cuerpo) if permutaciones is not None else None
+    if regular is None:
+        bloques = revertir_bloques(deserializar_bloques(cuerpo), semilla, clave, permutaciones)
+        return xor_con_clave(''.join(bloques), clave)
+    matriz, ultima = regular
+    n_filas, tam = matriz.shape
+    calendario = _calendario(semilla, n_filas)
+    filas_perm = np.flatnonzero(calendario == 3)
+    if len(permutaciones) < n_filas + 1 or any(len(permutaciones[i]) != tam for i in filas_perm):
+        bloques = revertir_bloques(deserializar_bloques(cuerpo), semilla, clave, permutaciones)
+        return xor_con_clave(''.join(bloques), clave)
+    ultimo_bloque = deserializar_bloques(ultima)[0]
+    clave_bytes = clave_en_bytes(clave, matriz.size + len(ultimo_bloque))
+    _aplicar(matriz, calendario, semilla, clave_bytes, inversa=True, permutaciones=permutaciones)
+
+    cola, _ = _bloque_suelto(ultimo_bloque, semilla, clave, n_filas,
+                             inversa=True, indices=permutaciones[n_filas])
+    plano = np.concatenate([matriz.reshape(-1), _a_bytes(cola)])
+    return _xor_global(plano, clave_bytes).tobytes().decode('latin1')
+
+def _bloque_suelto(bloque, semilla, clave, idx, inversa=False, indices=None):
+    """
+    Aplica (o revierte) la función del bloque idx a un único bloque, igual
+    que procesar_bloques/revertir_bloques. Se usa para el bloque final.
+    """
+    funcion = int(semilla[idx % len(semilla)], 16) % 5
+    if funcion == 3:
+        if len(bloque) <= 1:
+            return bloque, list(range(len(bloque)))
+        if inversa:
+            return des_permutar_bloque(bloque, semilla, idx, indices), indices
+        indices = _indices_permutacion(random.Random(), semilla, idx, len(bloque))
+        return ''.join(bloque[i] for i in indices), indices
+    if funcion == 0:
+        bloque = rotar_bloque_derecha(bloque) if inversa else rotar_bloque(bloque)
+    elif funcion == 1:
+        bloque = invertir_bloque(bloque)
+    elif funcion == 2:
+        bloque = xor_con_clave(bloque, clave or '')
+    else:
+        bloque = mutacion_adn(bloque)
+    return bloque, list(range(len(bloque)))
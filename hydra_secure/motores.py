@@ -0,0 +1,105 @@
+"""
+Registro de motores del núcleo del pipeline.
+
+Un motor recibe el mensaje ya preparado y su salt, y aplica el XOR global,
+la fragmentación, las funciones por bloque y la serialización del cuerpo
+(base64 por bloque unido con '|'). Todos los motores deben producir
+exactamente la misma salida que el motor de referencia.
+"""
+from collections import namedtuple
+
+from .fragmentacion import fragmentar_mensaje
+from .funciones_bloque import procesar_bloques, revertir_bloques, xor_con_clave
+from .reensamblado import serializar_bloques, deserializar_bloques
+from .metricas import etapa
+
+Motor = namedtuple('Motor', ['nombre', 'cifrar', 'descifrar'])
+
+MOTOR_POR_DEFECTO = 'referencia'
+
+def cifrar_referencia(datos, clave, semilla, tam_bloque=4, prefijo='', resumen=None):
+    """
+    Implementación de referencia: una pasada completa por cada etapa.
+    Cifra prefijo + datos y, si se indica, alimenta resumen con datos.
+    Devuelve el cuerpo serializado y las permutaciones por bloque.
+    """
+    if resumen is not None:
+        resumen.update(datos.encode('latin1'))
+    with etapa('cifrar', 'xor', len(prefijo) + len(datos)):
+        limpio_xor = xor_con_clave(prefijo + datos, clave)
+    with etapa('cifrar', 'fragmentacion', len(limpio_xor)):
+        bloques = fragmentar_mensaje(limpio_xor, tam_bloque)
+    with etapa('cifrar', 'funciones_bloque', len(limpio_xor)):
+        bloques_mod, permutaciones = procesar_bloques(bloques, semilla, clave)
+    with etapa('cifrar', 'serializacion', len(limpio_xor)) as m:
+        cuerpo = serializar_bloques(bloques_mod)
+        m.salida = len(cuerpo)
+    return cuerpo, permutaciones
+
+def descifrar_referencia(cuerpo, clave, semilla, permutaciones):
+    """
+    Inversa de cifrar_referencia: devuelve el mensaje con salt.
+    """
+    with etapa('descifrar', 'serializacion', len(cuerpo)):
+        bloques_mod = deserializar_bloques(cuerpo)
+    with etapa('descifrar', 'funciones_bloque'):
+        bloques = revertir_bloques(bloques_mod, semilla, clave, permutaciones)
+    with etapa('descifrar', 'xor') as m:
+        limpio = xor_con_clave(''.join(bloques), clave)
+        m.salida = len(limpio)
+    return limpio
+
+def _cargar_referencia():
+    return Motor('referencia', cifrar_referencia, descifrar_referencia)
+
+def _cargar_fusion():
+    from . import fusion
+    return Motor('fusion', fusion.cifrar, fusion.descifrar)
+
+def _cargar_numpy():
+    from . import motor_numpy
+    if not motor_numpy.disponible():
+        return None
+    return Motor('numpy', motor_numpy.cifrar, motor_numpy.descifrar)
+
+def _cargar_paralelo():
+    from . import paralelo
+    if not paralelo.disponible():
+        return None
+    return Motor('paralelo', paralelo.cifrar, paralelo.descifrar)
+
+# Los motores opcionales se importan solo cuando se piden
+_CARGADORES = {
+    'referencia': _cargar_referencia,
+    'fusion': _cargar_fusion,
+    'numpy': _cargar_numpy,
+    'paralelo': _cargar_paralelo,
+}
+_cargados = {}
+
+def obtener_motor(nombre=MOTOR_POR_DEFECTO):
+    """
+    Devuelve el motor registrado con ese nombre.
+    Lanza ValueError si no existe y RuntimeError si falta su dependencia.
+    """
+    if nombre not in _CARGADORES:
+        raise ValueError(f"Motor desconocido: {nombre}")
+    if nombre not in _cargados:
+        _cargados[nombre] = _CARGADORES[nombre]()
+    motor = _cargados[nombre]
+    if motor is None:
+        raise RuntimeError(f"Motor {nombre} no disponible en este entorno")
+    return motor
+
+def motores_disponibles():
+    """
+    Nombres de los motores que pueden usarse en este entorno.
+    """
+    disponibles = []
+    for nombre in _CARGADORES:
+        try:
+            obtener_motor(nombre)
+        except RuntimeError:
+            continue
+        disponibles.append(nombre)
+    return disponibles
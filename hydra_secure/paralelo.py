@@ -0,0 +1,330 @@
+"""
+Motor paralelo: reparte los bloques entre procesos sin copiar el documento.
+
+El mensaje (o el cuerpo, al descifrar) se escribe una vez en un segmento de
+multiprocessing.shared_memory y la salida se escribe directamente en otro
+segmento del tamaño exacto (fusion.longitud_cuerpo). A cada proceso solo se
+le envían los nombres de los segmentos y su rango de bloques: el XOR global
+depende solo de la posición y cada bloque de su índice, así que cada rango se
+procesa con las mismas funciones del motor fusion y se escribe en su
+desplazamiento fijo. Las permutaciones (un byte por índice) usan un tercer
+segmento; solo con bloques de más de 256 caracteres viajan por pickle.
+
+Los procesos y los segmentos (que se reutilizan) los gestiona PoolProcesos;
+por debajo de MIN_BYTES_PARALELO se delega en el motor fusion. La salida es
+idéntica a la del motor de referencia.
+"""
+import os
+import atexit
+import binascii
+import threading
+from binascii import b2a_base64, a2b_base64
+from itertools import chain
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, wait
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # sin memoria compartida POSIX en esta plataforma
+    shared_memory = None
+
+from . import fusion
+from .fusion import longitud_b64, longitud_cuerpo, _Transformador, _flujo_clave, _xor_posicional
+from .funciones_bloque import clave_en_bytes
+
+# Por debajo de este tamaño arrancar tareas cuesta más de lo que se gana
+MIN_BYTES_PARALELO = 1 << 20
+# Segmentos libres que se conservan para reutilizar (y tamaño máximo de cada uno)
+MAX_SEGMENTOS_LIBRES = 4
+MAX_BYTES_SEGMENTO_LIBRE = 256 * 1024 ** 2
+TAM_MINIMO_SEGMENTO = 64 * 1024
+
+def disponible():
+    return shared_memory is not None
+
+def procesos_por_defecto():
+    return int(os.environ.get('HYDRA_PROCESOS') or os.cpu_count() or 1)
+
+def _redondear(tam):
+    # Potencias de dos para que un segmento sirva a documentos de tamaño parecido
+    return 1 << (max(tam, TAM_MINIMO_SEGMENTO) - 1).bit_length()
+
+def _adjuntar(nombre):
+    # El proceso que crea el segmento es quien lo libera; los trabajadores solo lo abren
+    try:
+        return shared_memory.SharedMemory(name=nombre, track=False)
+    except TypeError:  # track existe desde Python 3.13
+        return shared_memory.SharedMemory(name=nombre)
+
+def _liberar(segmento):
+    segmento.close()
+    try:
+        segmento.unlink()
+    except FileNotFoundError:
+        pass
+
+class PoolProcesos:
+    """
+    Procesos de trabajo y segmentos de memoria compartida reutilizables.
+    """
+
+    def __init__(self, procesos=None):
+        self.procesos = procesos or procesos_por_defecto()
+        self.pid = os.getpid()
+        self._ejecutor = None
+        self._libres = []
+        self._lock = threading.Lock()
+
+    def enviar(self, funcion, *args):
+        with self._lock:
+            if self._ejecutor is None:
+                self._ejecutor = ProcessPoolExecutor(self.procesos)
+            return self._ejecutor.submit(funcion, *args)
+
+    @contextmanager
+    def segmento(self, tam):
+        """
+        Segmento de al menos tam bytes; al salir vuelve a la lista de libres.
+        """
+        segmento = self._tomar(tam)
+        try:
+            yield segmento
+        finally:
+            self._devolver(segmento)
+
+    def _tomar(self, tam):
+        with self._lock:
+            candidatos = [s for s in self._libres if s.size >= tam]
+            if candidatos:
+                elegido = min(candidatos, key=lambda s: s.size)
+                self._libres.remove(elegido)
+                return elegido
+        return shared_memory.SharedMemory(create=True, size=_redondear(tam))
+
+    def _devolver(self, segmento):
+        with self._lock:
+            if len(self._libres) < MAX_SEGMENTOS_LIBRES and segmento.size <= MAX_BYTES_SEGMENTO_LIBRE:
+                self._libres.append(segmento)
+                return
+        _liberar(segmento)
+
+    def segmentos_libres(self):
+        with self._lock:
+            return [s.name for s in self._libres]
+
+    def cerrar(self):
+        """
+        Termina los procesos y libera (unlink) los segmentos libres.
+        """
+        with self._lock:
+            ejecutor, self._ejecutor = self._ejecutor, None
+            libres, self._libres = self._libres, []
+        if ejecutor is not None:
+            ejecutor.shutdown()
+        for segmento in libres:
+            _liberar(segmento)
+
+_pool = None
+_lock_pool = threading.Lock()
+
+def obtener_pool():
+    """
+    Pool global (se crea al primer uso; un proceso hijo creado con fork no
+    reutiliza el del padre).
+    """
+    global _pool
+    with _lock_pool:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = PoolProcesos()
+        return _pool
+
+def configurar(procesos=None):
+    """
+    Cambia el número de procesos del pool global (None: HYDRA_PROCESOS o CPUs).
+    """
+    global _pool
+    cerrar()
+    with _lock_pool:
+        _pool = PoolProcesos(procesos)
+    return _pool
+
+def cerrar():
+    global _pool
+    with _lock_pool:
+        pool, _pool = _pool, None
+    if pool is not None and pool.pid == os.getpid():
+        pool.cerrar()
+
+atexit.register(cerrar)
+
+class _Irregular(Exception):
+    """
+    El cuerpo no tiene bloques de tamaño fijo: se descifra sin repartir.
+    """
+
+def _repartir(n_bloques, partes):
+    tam = -(-n_bloques // partes)
+    return [(desde, min(desde + tam, n_bloques)) for desde in range(0, n_bloques, tam)]
+
+def _permutaciones_en_bytes(tam_bloque):
+    # Con bloques de hasta 256 caracteres cada índice cabe en un byte y las
+    # permutaciones viajan por memoria compartida en lugar de por pickle
+    return tam_bloque <= 256
+
+def _cifrar_rango(entrada, salida, nombre_perm, total, desde, hasta, tam_bloque, n_bloques, semilla, clave_bytes,
+                  paso):
+    # En el proceso de trabajo: cifra los bloques [desde, hasta) y los escribe en su sitio
+    ent, sal = _adjuntar(entrada), _adjuntar(salida)
+    perm = _adjuntar(nombre_perm) if nombre_perm else None
+    try:
+        transformador = _Transformador(semilla, clave_bytes)
+        flujo = _flujo_clave(clave_bytes, paso * tam_bloque)
+        ancho = longitud_b64(tam_bloque) + 1
+        permutaciones = []
+        for inicio in range(desde, hasta, paso):
+            fin = min(inicio + paso, hasta)
+            trozo = bytes(ent.buf[inicio * tam_bloque:min(fin * tam_bloque, total)])
+            fase = inicio * tam_bloque % len(clave_bytes) if clave_bytes else 0
+            trozo = _xor_posicional(trozo, flujo, fase)
+            piezas = [b2a_base64(transformador.directa(trozo[i:i + tam_bloque], idx, permutaciones), newline=False)
+                      for idx, i in enumerate(range(0, len(trozo), tam_bloque), inicio)]
+            codificado = b'|'.join(piezas) + (b'|' if fin < n_bloques else b'')
+            sal.buf[inicio * ancho:inicio * ancho + len(codificado)] = codificado
+            if perm is not None:
+                perm.buf[inicio * tam_bloque:inicio * tam_bloque + len(trozo)] = bytes(chain.from_iterable(permutaciones))
+                permutaciones = []
+        return permutaciones
+    finally:
+        ent.close()
+        sal.close()
+        if perm is not None:
+            perm.close()
+
+def _descifrar_rango(entrada, salida, nombre_perm, largo, total, desde, hasta, tam_bloque, n_bloques, semilla,
+                     clave_bytes, paso, permutaciones=None):
+    # En el proceso de trabajo: revierte los bloques [desde, hasta) y escribe el texto en su sitio
+    ent, sal = _adjuntar(entrada), _adjuntar(salida)
+    perm = _adjuntar(nombre_perm) if nombre_perm else None
+    try:
+        transformador = _Transformador(semilla, clave_bytes)
+        flujo = _flujo_clave(clave_bytes, paso * tam_bloque)
+        ancho = longitud_b64(tam_bloque) + 1
+        for inicio in range(desde, hasta, paso):
+            fin = min(inicio + paso, hasta)
+            partes = bytes(ent.buf[inicio * ancho:min(fin * ancho - 1, largo)]).split(b'|')
+            if len(partes) != fin - inicio:
+                raise _Irregular()
+            if perm is not None:
+                # Índices de un byte: el inverso de la permutación acepta cualquier secuencia
+                plano = bytes(perm.buf[inicio * tam_bloque:min(fin * tam_bloque, total)])
+                indices = [plano[i:i + tam_bloque] for i in range(0, len(plano), tam_bloque)]
+            else:
+                indices = permutaciones[inicio - desde:fin - desde]
+            bloques = []
+            for idx, parte in enumerate(partes, inicio):
+                bloque = a2b_base64(parte)
+                if len(bloque) != tam_bloque and idx != n_bloques - 1:
+                    raise _Irregular()
+                bloques.append(transformador.inversa(bloque, idx, indices[idx - inicio]))
+            fase = inicio * tam_bloque % len(clave_bytes) if clave_bytes else 0
+            trozo = _xor_posicional(b''.join(bloques), flujo, fase)
+            sal.buf[inicio * tam_bloque:inicio * tam_bloque + len(trozo)] = trozo
+    finally:
+        ent.close()
+        sal.close()
+        if perm is not None:
+            perm.close()
+
+@contextmanager
+def _segmento_permutaciones(pool, tam_bloque, tam):
+    if _permutaciones_en_bytes(tam_bloque):
+        with pool.segmento(tam) as segmento:
+            yield segmento
+    else:
+        yield None
+
+def cifrar(datos, clave, semilla, tam_bloque=4, prefijo='', resumen=None):
+    """
+    Equivalente de motores.cifrar_referencia repartido entre procesos.
+    """
+    total = len(prefijo) + len(datos)
+    if total < max(MIN_BYTES_PARALELO, 1):
+        return fusion.cifrar(datos, clave, semilla, tam_bloque, prefijo, resumen)
+    clave_bytes = clave_en_bytes(clave, total)
+    n_bloques = -(-total // tam_bloque)
+    largo = longitud_cuerpo(total, tam_bloque)
+    pool = obtener_pool()
+    with pool.segmento(total) as ent, pool.segmento(largo) as sal, \
+            _segmento_permutaciones(pool, tam_bloque, total) as perm:
+        cabeza = prefijo.encode('latin1')
+        ent.buf[:len(cabeza)] = cabeza
+        parte = datos.encode('latin1')
+        if resumen is not None:
+            resumen.update(parte)
+        ent.buf[len(cabeza):total] = parte
+        del parte
+        futuros = [pool.enviar(_cifrar_rango, ent.name, sal.name, perm and perm.name, total, desde, hasta,
+                               tam_bloque, n_bloques, semilla, clave_bytes, fusion.BLOQUES_POR_TROZO)
+                   for desde, hasta in _repartir(n_bloques, pool.procesos)]
+        # Ningún proceso puede seguir escribiendo cuando el segmento vuelve al pool
+        wait(futuros)
+        permutaciones = []
+        for futuro in futuros:
+            permutaciones.extend(futuro.result())
+        if perm is not None:
+            completos = (n_bloques - 1) * tam_bloque
+            with perm.buf[:completos] as vista:
+                permutaciones = list(map(list, zip(*[iter(vista)] * tam_bloque)))
+            permutaciones.append(list(perm.buf[completos:total]))
+        with sal.buf[:largo] as vista:
+            cuerpo = str(vista, 'ascii')
+    return cuerpo, permutaciones
+
+def descifrar(cuerpo, clave, semilla, permutaciones):
+    """
+    Inversa de cifrar. Cuerpos pequeños o irregulares se descifran con el
+    motor fusion.
+    """
+    primero = cuerpo.find('|')
+    if len(cuerpo) < MIN_BYTES_PARALELO or primero <= 0 or permutaciones is None:
+        return fusion.descifrar(cuerpo, clave, semilla, permutaciones)
+    ancho = primero + 1
+    n_bloques = cuerpo.count('|') + 1
+    ultimo = len(cuerpo) - (n_bloques - 1) * ancho
+    try:
+        tam_bloque = len(a2b_base64(cuerpo[:primero]))
+        resto = len(a2b_base64(cuerpo[-ultimo:])) if 0 < ultimo <= primero else 0
+    except binascii.Error:
+        return fusion.descifrar(cuerpo, clave, semilla, permutaciones)
+    if tam_bloque == 0 or resto == 0 or len(permutaciones) < n_bloques:
+        return fusion.descifrar(cuerpo, clave, semilla, permutaciones)
+    total = (n_bloques - 1) * tam_bloque + resto
+    plano = None
+    if _permutaciones_en_bytes(tam_bloque):
+        try:
+            plano = bytes(chain.from_iterable(permutaciones[:n_bloques]))
+        except (TypeError, ValueError):
+            plano = b''
+        if len(plano) != total:
+            # Permutaciones que no encajan con los bloques: sin reparto
+            return fusion.descifrar(cuerpo, clave, semilla, permutaciones)
+    clave_bytes = clave_en_bytes(clave, total)
+    pool = obtener_pool()
+    with pool.segmento(len(cuerpo)) as ent, pool.segmento(total) as sal, \
+            _segmento_permutaciones(pool, tam_bloque, total) as perm:
+        ent.buf[:len(cuerpo)] = cuerpo.encode('ascii')
+        if perm is not None:
+            perm.buf[:total] = plano
+            del plano
+        futuros = [pool.enviar(_descifrar_rango, ent.name, sal.name, perm and perm.name, len(cuerpo), total,
+                               desde, hasta, tam_bloque, n_bloques, semilla, clave_bytes, fusion.BLOQUES_POR_TROZO,
+                               None if perm is not None else permutaciones[desde:hasta])
+                   for desde, hasta in _repartir(n_bloques, pool.procesos)]
+        wait(futuros)
+        try:
+            for futuro in futuros:
+                futuro.result()
+        except (_Irregular, binascii.Error):
+            return fusion.descifrar(cuerpo, clave, semilla, permutaciones)
+        with sal.buf[:total] as vista:
+            return str(vista, 'latin1')
@@ -1,22 +1,41 @@
 from .preparacion import preparar_entrada
 from .semilla import generar_semilla
-from .fragmentacion import fragmentar_mensaje
-from .funciones_bloque import procesar_bloques, revertir_bloques, xor_con_clave
-from .reensamblado import reensamblar, desensamblar
-from .integridad import generar_hash, verificar_hash
+from .motores import obtener_motor
+from .autoajuste import resolver, MOTOR_AUTOMATICO
+from .reensamblado import ensamblar_cuerpo, leer_cabecera
+from .funciones_bloque import derivar_permutaciones
+from . import artefacto
+from .autenticacion import (sellar, verificar_kcv, verificar_mac, indexar, verificar_segmentos, ancho_segmento,
+                            MAC_POR_DEFECTO)
+from .funciones_bloque import clave_en_bytes
+from . import fusion
+from .integridad import nuevo_resumen, verificar_hash, resolver_algoritmo, ALGORITMO_POR_DEFECTO
+from .compresion import comprimir, descomprimir
 from .contenedor_png import empaquetar_resultado_png, extraer_resultado_png
 from .iso_27001_compliance import secure_pipeline_wrapper, iso_compliance
+from .metricas import etapa, activas, registro
 import os
 import string
 import random
 
-def generar_salt(longitud=8):
+LONGITUD_SALT = 8
+
+def generar_salt(longitud=LONGITUD_SALT):
     # Salt alfanumérico seguro
     chars = string.ascii_letters + string.digits
     return ''.join(random.SystemRandom().choice(chars) for _ in range(longitud))
 
+def _elegir_motor(operacion, motor, n_bytes):
+    # (motor, tam_bloque) efectivos; con métricas activas se cuenta la ruta elegida
+    motor, tam_bloque = resolver(motor, n_bytes)
+    if activas():
+        registro.incrementar('hydra_motor_elegido', operacion=operacion, motor=motor, tam_bloque=str(tam_bloque))
+    return motor, tam_bloque
+
 @secure_pipeline_wrapper
-def cifrar_pipeline(mensaje, clave, id_usuario, contenedor_png=False, ruta_png="mensaje.png", doc_type=None):
+def cifrar_pipeline(mensaje, clave, id_usuario, contenedor_png=False, ruta_png="mensaje.png", doc_type=None,
+                    motor=MOTOR_AUTOMATICO, compresion=None, algoritmo_hash=ALGORITMO_POR_DEFECTO,
+                    algoritmo_mac=MAC_POR_DEFECTO, autocontenido=False, indice_rango=False):
     # Verificación de acceso ISO 27001 A.9.1.1
     tipo_doc = doc_type if doc_type else 'pipeline'
     if not iso_compliance.access_control(id_usuario, tipo_doc, 'encrypt'):
@@ -26,32 +45,64 @@ def cifrar_pipeline(mensaje, clave, id_usuario, contenedor_png=False, ruta_png="
     iso_compliance.log_security_event('ENCRYPTION_STARTED', f"Starting encryption for user {id_usuario}")
     
     # 1. Preparación
-    limpio = preparar_entrada(mensaje)
+    with etapa('cifrar', 'preparacion', len(mensaje)) as m:
+        limpio = preparar_entrada(mensaje)
+        m.salida = len(limpio)
+    # Algoritmo de hash para integridad y semilla ('auto': el más rápido del equipo)
+    algoritmo_hash = resolver_algoritmo(algoritmo_hash)
+    resumen = nuevo_resumen(algoritmo_hash)
+    # (Opcional) Compresión: 'zlib', 'lzma', 'bz2' o 'auto' (omite datos incompresibles)
+    with etapa('cifrar', 'compresion', len(limpio)) as m:
+        datos, codec = comprimir(limpio, compresion)
+        if codec:
+            resumen.update(limpio.encode('ascii'))
+        m.salida = len(datos)
     # Salt aleatorio
-    salt = generar_salt(8)
-    limpio_con_salt = salt + limpio
-    # XOR global antes de fragmentar
-    limpio_xor = xor_con_clave(limpio_con_salt, clave)
+    salt = generar_salt()
     # 2. Semilla dinámica
-    semilla, timestamp, uuid = generar_semilla(clave, id_usuario)
-    # 3. Fragmentación
-    bloques = fragmentar_mensaje(limpio_xor)
-    # 4. Funciones por bloque (devuelve bloques_mod y permutaciones)
-    bloques_mod, permutaciones = procesar_bloques(bloques, semilla, clave)
-    # 5. Reensamblado (cabecera oculta JSON)
-    cifrado, metadatos = reensamblar(bloques_mod, timestamp, uuid)
+    with etapa('cifrar', 'semilla'):
+        semilla, timestamp, uuid = generar_semilla(clave, id_usuario, algoritmo=algoritmo_hash)
+    # 3-4. XOR global, fragmentación y funciones por bloque sobre salt + datos
+    # (según el motor; 'auto' elige por tamaño con el perfil de autoajuste);
+    # sin compresión el hash se alimenta en la misma pasada
+    motor, tam_bloque = _elegir_motor('cifrar', motor, len(salt) + len(datos))
+    with etapa('cifrar', 'nucleo', len(salt) + len(datos)) as m:
+        cuerpo, permutaciones = obtener_motor(motor).cifrar(datos, clave, semilla, tam_bloque, prefijo=salt,
+                                                           resumen=None if codec else resumen)
+        m.salida = len(cuerpo)
+        m.contar_bloques(semilla, len(permutaciones))
+    # 5. Reensamblado (cabecera oculta JSON con comprobación de clave y MAC;
+    # autocontenido: cabecera binaria con lo necesario para descifrar sin metadatos)
+    with etapa('cifrar', 'reensamblado', len(cuerpo)) as m:
+        campos = {'timestamp': timestamp, 'uuid': uuid, 'hash_alg': algoritmo_hash, 'mac_alg': algoritmo_mac}
+        if codec:
+            campos['codec'] = codec
+        if autocontenido:
+            campos.update(tam_bloque=tam_bloque, longitud=len(salt) + len(datos), propietario=id_usuario)
+        campos.update(sellar(clave, campos, cuerpo))
+        cifrado, metadatos = ensamblar_cuerpo(cuerpo, timestamp, uuid, campos)
+        if autocontenido:
+            cifrado = artefacto.empaquetar(campos, cuerpo)
+        # Índice para descifrar_rango: un MAC por segmento de bloques (True o bloques por segmento)
+        if indice_rango:
+            metadatos['indice'] = indexar(clave, campos, cuerpo, tam_bloque, len(salt) + len(datos),
+                                          *(() if indice_rango is True else (indice_rango,)))
+        m.salida = len(cifrado)
     metadatos['permutaciones'] = permutaciones
     metadatos['semilla'] = semilla
     metadatos['salt'] = salt
+    metadatos['motor'] = motor
+    metadatos['tam_bloque'] = tam_bloque
     # 6. (Opcional) Contenedor externo PNG
     if contenedor_png:
-        ruta = empaquetar_resultado_png(cifrado, ruta_png)
+        with etapa('cifrar', 'png', len(cifrado)):
+            ruta = empaquetar_resultado_png(cifrado, ruta_png)
         cifrado = ruta  # El resultado es la ruta del PNG
         metadatos['contenedor'] = 'png'
         metadatos['ruta_png'] = ruta_png
-    # 7. Hash de verificación
-    hash_verif = generar_hash(limpio)
-    metadatos['hash'] = hash_verif
+    # 7. Hash de verificación (alimentado durante el núcleo o la compresión)
+    with etapa('cifrar', 'hash'):
+        metadatos['hash'] = resumen.hexdigest()
     
     # Log de éxito
     iso_compliance.log_security_event('ENCRYPTION_COMPLETED', f"Encryption completed for user {id_usuario}")
@@ -59,38 +110,181 @@ def cifrar_pipeline(mensaje, clave, id_usuario, contenedor_png=False, ruta_png="
     return cifrado, metadatos
 
 
+def _separar(cifrado, metadatos):
+    """
+    (cabecera, cuerpo) de un cifrado, de su PNG o de un artefacto.
+    """
+    # 6. Extraer del contenedor externo PNG si corresponde (sin metadatos, una ruta .png)
+    if metadatos.get('contenedor') == 'png' or (not metadatos and isinstance(cifrado, str)
+                                                and cifrado.lower().endswith('.png')):
+        with etapa('descifrar', 'png') as m:
+            cifrado = extraer_resultado_png(cifrado)
+            m.salida = len(cifrado)
+    # 5. Desensamblar: primero solo la cabecera (JSON, o binaria en un artefacto)
+    if artefacto.es_artefacto(cifrado):
+        cabecera, inicio_cuerpo = artefacto.leer(cifrado)
+        return cabecera, bytes(cifrado[inicio_cuerpo:]).decode('ascii')
+    if not metadatos:
+        raise ValueError('Faltan los metadatos del cifrado.')
+    cabecera, inicio_cuerpo = leer_cabecera(cifrado)
+    return cabecera, cifrado[inicio_cuerpo:]
+
+def _comprobar_clave(clave, cabecera, metadatos, id_usuario):
+    if ('mac' in cabecera or 'mac' in metadatos) and not verificar_kcv(clave, cabecera):
+        iso_compliance.log_security_event('KEY_CHECK_FAILED', f"Key check failed for user {id_usuario}", 'ERROR')
+        raise ValueError('Clave incorrecta.')
+
+def _semilla_de(clave, cabecera):
+    # Un artefacto no guarda la semilla: se recalcula con la de quien cifró
+    return generar_semilla(clave, cabecera['propietario'], cabecera['timestamp'], cabecera['uuid'],
+                           algoritmo=cabecera['hash_alg'])[0]
+
 @secure_pipeline_wrapper
-def descifrar_pipeline(cifrado, clave, id_usuario, metadatos, doc_type=None):
+def descifrar_pipeline(cifrado, clave, id_usuario, metadatos=None, doc_type=None, motor=MOTOR_AUTOMATICO):
+    """
+    Descifra un cifrado de cifrar_pipeline con sus metadatos, o un artefacto
+    autocontenido (bytes o la ruta de su PNG) sin ellos.
+    """
     # Verificación de acceso ISO 27001 A.9.1.1
     tipo_doc = doc_type if doc_type else 'pipeline'
     if not iso_compliance.access_control(id_usuario, tipo_doc, 'decrypt'):
         raise PermissionError(f"Usuario {id_usuario} no tiene permisos para descifrar")
     # Log de inicio de operación
     iso_compliance.log_security_event('DECRYPTION_STARTED', f"Starting decryption for user {id_usuario}")
-    # 6. Extraer del contenedor externo PNG si corresponde
-    if metadatos.get('contenedor') == 'png':
-        cifrado = extraer_resultado_png(cifrado)
-    # 5. Desensamblar (extrae bloques_mod, timestamp, uuid)
-    bloques_mod, timestamp, uuid = desensamblar(cifrado)
-    # 2. Recuperar semilla
-    semilla = metadatos['semilla']
-    # 4. Revertir funciones por bloque (usa permutaciones)
-    permutaciones = metadatos.get('permutaciones')
-    bloques = revertir_bloques(bloques_mod, semilla, clave, permutaciones)
-    # 3. Reensamblar mensaje original (antes de quitar XOR global)
-    limpio_xor = ''.join(bloques)
-    # Revertir XOR global
-    limpio_con_salt = xor_con_clave(limpio_xor, clave)
-    # Quitar salt
-    salt = metadatos.get('salt', '')
+    metadatos = metadatos or {}
+    cabecera, cuerpo = _separar(cifrado, metadatos)
+    autocontenido = 'propietario' in cabecera
+    autenticado = 'mac' in cabecera or 'mac' in metadatos
+    # Clave incorrecta: se rechaza con la cabecera, sin tocar el cuerpo
+    _comprobar_clave(clave, cabecera, metadatos, id_usuario)
+    # Manipulación: una pasada de MAC antes de revertir ningún bloque
+    with etapa('descifrar', 'mac', len(cuerpo)):
+        mac_valido = not autenticado or verificar_mac(clave, cabecera, cuerpo)
+    if not mac_valido:
+        iso_compliance.log_security_event('MAC_MISMATCH', f"Ciphertext MAC mismatch for user {id_usuario}", 'ERROR')
+        raise ValueError('El cifrado fue manipulado (MAC no coincide).')
+    # 2. Recuperar semilla (en un artefacto se recalcula, y con ella las permutaciones)
+    if autocontenido:
+        semilla = _semilla_de(clave, cabecera)
+        permutaciones = derivar_permutaciones(semilla, cabecera['longitud'], cabecera['tam_bloque'])
+    else:
+        semilla = metadatos['semilla']
+        permutaciones = metadatos.get('permutaciones')
+        if permutaciones is None:
+            # cifrar_archivo no las guarda: se derivan de la semilla y de la forma del cuerpo
+            forma = fusion.geometria(lambda a, b: cuerpo[a:b].encode('ascii'), len(cuerpo))
+            if forma:
+                permutaciones = derivar_permutaciones(semilla, forma[2], forma[0])
+    # 4-3. Revertir funciones por bloque (usa permutaciones) y XOR global
+    # El tamaño de bloque se deduce del cuerpo; 'auto' estima la carga (base64)
+    motor, _ = _elegir_motor('descifrar', motor, len(cuerpo) * 3 // 4)
+    with etapa('descifrar', 'nucleo', len(cuerpo)) as m:
+        limpio_con_salt = obtener_motor(motor).descifrar(cuerpo, clave, semilla, permutaciones)
+        m.salida = len(limpio_con_salt)
+        m.contar_bloques(semilla, len(permutaciones or ()))
+    # Quitar salt (un artefacto no lo lleva en claro: solo su longitud)
+    salt = limpio_con_salt[:LONGITUD_SALT] if autocontenido else metadatos.get('salt', '')
     if not limpio_con_salt.startswith(salt):
         iso_compliance.log_security_event('SALT_MISMATCH', f"Salt mismatch for user {id_usuario}", 'ERROR')
         raise ValueError('Salt incorrecto o clave incorrecta.')
     limpio = limpio_con_salt[len(salt):]
-    # 7. Verificar hash
-    if not verificar_hash(limpio, metadatos.get('hash', '')):
+    # Descompresión si el cifrado la registró en la cabecera
+    if cabecera.get('codec'):
+        with etapa('descifrar', 'compresion', len(limpio)) as m:
+            limpio = descomprimir(limpio, cabecera['codec'])
+            m.salida = len(limpio)
+    # 7. Verificar hash (un archivo cifrado en modo binario se resume como bytes;
+    # un artefacto sin metadatos queda verificado por el MAC)
+    with etapa('descifrar', 'hash', len(limpio)):
+        resumido = limpio.encode('latin1') if cabecera.get('formato') == 'binario' else limpio
+        hash_valido = ('hash' not in metadatos and autocontenido) or verificar_hash(
+            resumido, metadatos.get('hash', ''), cabecera.get('hash_alg', ALGORITMO_POR_DEFECTO))
+    if not hash_valido:
         iso_compliance.log_security_event('HASH_MISMATCH', f"Hash mismatch for user {id_usuario}", 'ERROR')
         raise ValueError('Hash de verificación no coincide.')
     # Log de éxito
     iso_compliance.log_security_event('DECRYPTION_COMPLETED', f"Decryption completed for user {id_usuario}")
-    return limpio 
\ No newline at end of file
+    return limpio 
+
+def _rango(cuerpo, cabecera, metadatos, clave, id_usuario, inicio, fin):
+    """
+    Bytes [inicio, fin) del texto (sin salt) de un cuerpo (str, bytes o una
+    vista de un mmap), revirtiendo solo los bloques que los cubren. Con
+    índice de rangos en los metadatos solo se autentican los segmentos
+    leídos; sin él, el MAC recorre el cuerpo (sin revertir ningún bloque).
+    """
+    if cabecera.get('codec'):
+        raise ValueError('Cifrado comprimido: el rango no se puede descifrar sin descomprimirlo entero.')
+    _comprobar_clave(clave, cabecera, metadatos, id_usuario)
+
+    def leer(a, b):
+        tramo = cuerpo[a:b]
+        return tramo.encode('latin1') if isinstance(tramo, str) else bytes(tramo)
+
+    if 'propietario' in cabecera:
+        semilla, salt, prefijo = _semilla_de(clave, cabecera), None, LONGITUD_SALT
+    else:
+        salt = metadatos.get('salt', '').encode('latin1')
+        semilla, prefijo = metadatos['semilla'], len(salt)
+    indice = metadatos.get('indice')
+    if indice:
+        forma = fusion.forma_de(indice['tam_bloque'], indice['longitud'])
+    elif 'propietario' in cabecera:
+        forma = fusion.forma_de(cabecera['tam_bloque'], cabecera['longitud'])
+    else:
+        forma = fusion.geometria(leer, len(cuerpo)) if len(cuerpo) else fusion.forma_de(1, 0)
+    if forma is None:
+        raise ValueError('Cuerpo del cifrado con bloques irregulares.')
+    tam_bloque, _, total = forma
+    if fusion.longitud_cuerpo(total, tam_bloque) != len(cuerpo):
+        iso_compliance.log_security_event('MAC_MISMATCH', f"Ciphertext length mismatch for user {id_usuario}", 'ERROR')
+        raise ValueError('El cifrado fue manipulado (longitud del cuerpo).')
+    inicio, fin, _ = slice(inicio, fin).indices(max(total - prefijo, 0))
+    if inicio >= fin:
+        return b''
+    desde, hasta = inicio + prefijo, fin + prefijo
+    ancho = fusion.longitud_b64(tam_bloque) + 1
+    a, b = desde // tam_bloque * ancho, min(((hasta - 1) // tam_bloque + 1) * ancho, len(cuerpo))
+    # Manipulación: solo los segmentos del tramo o, sin índice, una pasada de MAC
+    autenticado = 'mac' in cabecera or 'mac' in metadatos
+    with etapa('descifrar', 'mac', b - a):
+        if indice:
+            tam_segmento = ancho_segmento(indice)
+            primero = a // tam_segmento
+            base = primero * tam_segmento
+            tramo = leer(base, min(-(-b // tam_segmento) * tam_segmento, len(cuerpo)))
+            mac_valido = verificar_segmentos(clave, cabecera, indice, primero, tramo)
+            leer_bloques = lambda x, y: tramo[x - base:y - base]
+        else:
+            mac_valido = not autenticado or verificar_mac(clave, cabecera, cuerpo)
+            leer_bloques = leer
+    if not mac_valido:
+        iso_compliance.log_security_event('MAC_MISMATCH', f"Ciphertext MAC mismatch for user {id_usuario}", 'ERROR')
+        raise ValueError('El cifrado fue manipulado (MAC no coincide).')
+    clave_bytes = clave_en_bytes(clave, total)
+    # Sin autenticación, el salt es la única comprobación de la clave
+    if not autenticado and salt and fusion.descifrar_rango_en(leer, forma, clave_bytes, semilla, 0, len(salt)) != salt:
+        iso_compliance.log_security_event('SALT_MISMATCH', f"Salt mismatch for user {id_usuario}", 'ERROR')
+        raise ValueError('Salt incorrecto o clave incorrecta.')
+    with etapa('descifrar', 'nucleo', b - a) as m:
+        plano = fusion.descifrar_rango_en(leer_bloques, forma, clave_bytes, semilla, desde, hasta)
+        m.salida = len(plano)
+    return plano
+
+@secure_pipeline_wrapper
+def descifrar_rango(cifrado, inicio, fin, clave, id_usuario, metadatos=None, doc_type=None):
+    """
+    Caracteres [inicio, fin) (como un corte) del texto que devolvería
+    descifrar_pipeline, con un coste proporcional al rango: solo se revierten
+    los bloques que lo cubren. No admite cifrados comprimidos.
+    """
+    # Verificación de acceso ISO 27001 A.9.1.1
+    tipo_doc = doc_type if doc_type else 'pipeline'
+    if not iso_compliance.access_control(id_usuario, tipo_doc, 'decrypt'):
+        raise PermissionError(f"Usuario {id_usuario} no tiene permisos para descifrar")
+    iso_compliance.log_security_event('DECRYPTION_STARTED', f"Starting range decryption for user {id_usuario}")
+    metadatos = metadatos or {}
+    cabecera, cuerpo = _separar(cifrado, metadatos)
+    plano = _rango(cuerpo, cabecera, metadatos, clave, id_usuario, inicio, fin)
+    iso_compliance.log_security_event('DECRYPTION_COMPLETED', f"Range decryption completed for user {id_usuario}")
+    return plano.decode('latin1')
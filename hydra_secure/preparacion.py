@@ -1,5 +1,8 @@
 import unicodedata
 
+# Tras pasar a ASCII solo quedan por quitar los controles (0-31) y DEL
+_NO_IMPRIMIBLES = dict.fromkeys([*range(32), 127])
+
 def preparar_entrada(texto):
     """
     Limpia, normaliza y convierte el texto a ASCII (elimina tildes y caracteres no válidos).
@@ -8,5 +11,5 @@ def preparar_entrada(texto):
     texto = unicodedata.normalize('NFKD', texto)
     texto = texto.encode('ascii', 'ignore').decode('ascii')
     # Elimina caracteres no imprimibles
-    texto = ''.join(c for c in texto if 32 <= ord(c) <= 126)
+    texto = texto.translate(_NO_IMPRIMIBLES)
     return texto 
\ No newline at end of file
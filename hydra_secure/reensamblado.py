@@ -1,24 +1,56 @@
 import json
 import base64
 
+def serializar_bloques(bloques):
+    """
+    Codifica cada bloque en base64 y los une con '|' (cuerpo del mensaje).
+    """
+    return '|'.join(base64.b64encode(b.encode('latin1')).decode() for b in bloques)
+
+def deserializar_bloques(cuerpo):
+    """
+    Separa el cuerpo por '|' y decodifica cada bloque de base64.
+    """
+    return [base64.b64decode(b).decode('latin1') for b in cuerpo.split('|')]
+
+def ensamblar_cuerpo(cuerpo, timestamp, uuid, extra=None):
+    """
+    Antepone la cabecera oculta JSON a un cuerpo ya serializado.
+    extra añade campos a la cabecera (y a los metadatos devueltos).
+    """
+    metadatos = {'timestamp': timestamp, 'uuid': uuid}
+    metadatos.update(extra or {})
+    mensaje = json.dumps(metadatos) + '\n' + cuerpo
+    return mensaje, dict(metadatos)
+
+def leer_cabecera(mensaje):
+    """
+    Lee solo la cabecera JSON. Devuelve (cabecera, posición del cuerpo).
+    """
+    fin = mensaje.index('\n')
+    cabecera = json.loads(mensaje[:fin])
+    if not isinstance(cabecera, dict):
+        raise ValueError('Cabecera del cifrado inválida.')
+    return cabecera, fin + 1
+
+def separar_cuerpo(mensaje):
+    """
+    Separa la cabecera JSON del cuerpo sin decodificar los bloques.
+    """
+    cabecera, inicio = leer_cabecera(mensaje)
+    return mensaje[inicio:], cabecera
+
 def reensamblar(bloques, timestamp, uuid):
     """
     Une los bloques y añade metadatos (cabecera oculta JSON).
     Codifica cada bloque en base64 para evitar conflictos con separadores.
     """
-    bloques_b64 = [base64.b64encode(b.encode('latin1')).decode() for b in bloques]
-    cabecera = json.dumps({'timestamp': timestamp, 'uuid': uuid})
-    mensaje = cabecera + '\n' + '|'.join(bloques_b64)
-    metadatos = {'timestamp': timestamp, 'uuid': uuid}
-    return mensaje, metadatos
+    return ensamblar_cuerpo(serializar_bloques(bloques), timestamp, uuid)
 
 def desensamblar(mensaje):
     """
     Separa los bloques y extrae metadatos de la cabecera JSON.
     Decodifica cada bloque de base64.
     """
-    cabecera, bloques_str = mensaje.split('\n', 1)
-    meta = json.loads(cabecera)
-    bloques_b64 = bloques_str.split('|')
-    bloques = [base64.b64decode(b).decode('latin1') for b in bloques_b64]
-    return bloques, meta['timestamp'], meta['uuid'] 
\ No newline at end of file
+    cuerpo, meta = separar_cuerpo(mensaje)
+    return deserializar_bloques(cuerpo), meta['timestamp'], meta['uuid']
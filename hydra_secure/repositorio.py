@@ -0,0 +1,239 @@
+"""
+Repositorio persistente de documentos cifrados.
+
+Los datos de cada documento (id, tipo, creador, fecha, tamaños) viven en
+SQLite en modo WAL, con índices por id, por tipo, por creador y por fecha;
+los metadatos del cifrado (que incluyen las permutaciones y pueden ser
+grandes) van en una tabla aparte y solo se leen al pedirlos. El cifrado se
+guarda fuera de la base, en un almacén direccionado por contenido
+(blobs/ab/<sha256>): dos documentos con el mismo cifrado comparten archivo y
+un documento nuevo nunca sobrescribe a otro.
+
+listar pagina por cursor (fecha e id del último documento de la página
+anterior), así que cada página cuesta lo mismo sea cual sea su posición.
+guardar_lote inserta muchos documentos en una sola transacción.
+"""
+import os
+import json
+import sqlite3
+import hashlib
+import datetime
+
+NOMBRE_BASE = 'hydra.db'
+DIRECTORIO_BLOBS = 'blobs'
+TAM_PAGINA = 50
+SUFIJO_TEMPORAL = '.parcial'
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS documentos (
+    id TEXT PRIMARY KEY,
+    doc_type TEXT NOT NULL,
+    creador TEXT NOT NULL,
+    creado TEXT NOT NULL,
+    blob TEXT NOT NULL,
+    formato TEXT NOT NULL,
+    tam_original INTEGER,
+    tam_cifrado INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metadatos (
+    id TEXT PRIMARY KEY REFERENCES documentos(id) ON DELETE CASCADE,
+    datos TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documentos_por_tipo ON documentos(doc_type, creado, id);
+CREATE INDEX IF NOT EXISTS documentos_por_creador ON documentos(creador, creado, id);
+CREATE INDEX IF NOT EXISTS documentos_por_fecha ON documentos(creado, id);
+CREATE INDEX IF NOT EXISTS documentos_por_blob ON documentos(blob);
+"""
+_COLUMNAS = 'id, doc_type, creador, creado, blob, formato, tam_original, tam_cifrado'
+
+class Documento:
+    """
+    Fila del repositorio; metadatos y cifrado se cargan al primer acceso.
+    """
+
+    def __init__(self, repositorio, fila):
+        self._repositorio = repositorio
+        (self.id, self.doc_type, self.creador, self.creado, self.blob, self.formato,
+         self.tam_original, self.tam_cifrado) = fila
+        self._metadatos = self._cifrado = None
+
+    @property
+    def metadatos(self):
+        if self._metadatos is None:
+            self._metadatos = self._repositorio.metadatos(self.id)
+        return self._metadatos
+
+    @property
+    def cifrado(self):
+        """
+        Como lo devolvió el cifrado: str, bytes (artefacto) o la ruta del PNG.
+        """
+        if self._cifrado is None:
+            self._cifrado = self._repositorio.leer_blob(self.blob, self.formato)
+        return self._cifrado
+
+class Repositorio:
+    """
+    Base SQLite (WAL) y almacén de blobs bajo un directorio.
+    """
+
+    def __init__(self, directorio):
+        self.directorio = os.path.abspath(directorio)
+        os.makedirs(os.path.join(self.directorio, DIRECTORIO_BLOBS), exist_ok=True)
+        self._conexion = sqlite3.connect(os.path.join(self.directorio, NOMBRE_BASE))
+        self._conexion.execute('PRAGMA journal_mode=WAL')
+        # Con WAL, NORMAL solo arriesga la última transacción ante un corte de luz, no la base
+        self._conexion.execute('PRAGMA synchronous=NORMAL')
+        self._conexion.execute('PRAGMA foreign_keys=ON')
+        self._conexion.executescript(_ESQUEMA)
+
+    def cerrar(self):
+        self._conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.cerrar()
+
+    def _ruta_blob(self, huella, formato):
+        nombre = huella + ('.png' if formato == 'png' else '')
+        return os.path.join(self.directorio, DIRECTORIO_BLOBS, huella[:2], nombre)
+
+    @staticmethod
+    def _contenido(cifrado):
+        # Cifrado de cifrar_pipeline: str (cabecera JSON), bytes (artefacto) o ruta de un PNG
+        if isinstance(cifrado, (bytes, bytearray)):
+            return 'bytes', bytes(cifrado)
+        if cifrado.lower().endswith('.png') and os.path.isfile(cifrado):
+            with open(cifrado, 'rb') as f:
+                return 'png', f.read()
+        return 'texto', cifrado.encode('utf-8')
+
+    def _escribir_blob(self, huella, formato, crudo):
+        """
+        Escribe el blob si no existía; devuelve su ruta si lo creó.
+        """
+        ruta = self._ruta_blob(huella, formato)
+        if os.path.exists(ruta):
+            return None
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta + SUFIJO_TEMPORAL, 'wb') as f:
+            f.write(crudo)
+        os.replace(ruta + SUFIJO_TEMPORAL, ruta)
+        return ruta
+
+    def leer_blob(self, huella, formato):
+        ruta = self._ruta_blob(huella, formato)
+        if formato == 'png':
+            return ruta
+        with open(ruta, 'rb') as f:
+            crudo = f.read()
+        return crudo if formato == 'bytes' else crudo.decode('utf-8')
+
+    def guardar(self, doc_id, cifrado, doc_type, creador, metadatos=None, tam_original=None, creado=None):
+        """
+        Guarda un documento (ver guardar_lote) y devuelve el Documento.
+        """
+        self.guardar_lote([{'id': doc_id, 'cifrado': cifrado, 'doc_type': doc_type, 'creador': creador,
+                            'metadatos': metadatos, 'tam_original': tam_original, 'creado': creado}])
+        return self.obtener(doc_id)
+
+    def guardar_lote(self, documentos):
+        """
+        Inserta en una transacción documentos (dicts con id, cifrado,
+        doc_type, creador y, opcionales, metadatos, tam_original y creado,
+        por defecto ahora). Un id repetido aborta el lote entero sin dejar
+        blobs huérfanos.
+        """
+        filas, metadatos, blobs = [], [], {}
+        for documento in documentos:
+            formato, crudo = self._contenido(documento['cifrado'])
+            huella = hashlib.sha256(crudo).hexdigest()
+            blobs[(huella, formato)] = crudo
+            creado = documento.get('creado') or datetime.datetime.now().isoformat()
+            filas.append((documento['id'], documento['doc_type'], documento['creador'], creado, huella, formato,
+                          documento.get('tam_original'), len(crudo)))
+            if documento.get('metadatos') is not None:
+                metadatos.append((documento['id'], json.dumps(documento['metadatos'])))
+        # Los blobs se escriben tras insertar las filas y antes del commit: si
+        # algo falla se deshace la transacción y se borran los blobs creados
+        nuevos = []
+        try:
+            with self._conexion:
+                self._conexion.executemany(f"INSERT INTO documentos ({_COLUMNAS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                           filas)
+                self._conexion.executemany('INSERT INTO metadatos (id, datos) VALUES (?, ?)', metadatos)
+                for (huella, formato), crudo in blobs.items():
+                    ruta = self._escribir_blob(huella, formato, crudo)
+                    if ruta:
+                        nuevos.append(ruta)
+        except BaseException:
+            for ruta in nuevos:
+                os.remove(ruta)
+            raise
+        return len(filas)
+
+    def obtener(self, doc_id):
+        """
+        El Documento con ese id, o None.
+        """
+        fila = self._conexion.execute(f"SELECT {_COLUMNAS} FROM documentos WHERE id = ?", (doc_id,)).fetchone()
+        return Documento(self, fila) if fila else None
+
+    def metadatos(self, doc_id):
+        fila = self._conexion.execute('SELECT datos FROM metadatos WHERE id = ?', (doc_id,)).fetchone()
+        return json.loads(fila[0]) if fila else {}
+
+    def _filtro(self, doc_type, creador, desde, hasta):
+        condiciones, valores = [], []
+        for condicion, valor in (('doc_type = ?', doc_type), ('creador = ?', creador),
+                                 ('creado >= ?', desde), ('creado < ?', hasta)):
+            if valor is not None:
+                condiciones.append(condicion)
+                valores.append(valor)
+        return condiciones, valores
+
+    def listar(self, doc_type=None, creador=None, desde=None, hasta=None, despues=None, limite=TAM_PAGINA):
+        """
+        Una página de Documentos (del más reciente al más antiguo) que
+        cumplen los filtros (desde y hasta: fechas ISO). Para la siguiente,
+        despues=(creado, id) del último documento de esta.
+        """
+        condiciones, valores = self._filtro(doc_type, creador, desde, hasta)
+        if despues is not None:
+            condiciones.append('(creado, id) < (?, ?)')
+            valores.extend(despues)
+        donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+        filas = self._conexion.execute(f"SELECT {_COLUMNAS} FROM documentos {donde} "
+                                       f"ORDER BY creado DESC, id DESC LIMIT ?", (*valores, limite)).fetchall()
+        return [Documento(self, fila) for fila in filas]
+
+    def contar(self, doc_type=None, creador=None, desde=None, hasta=None):
+        condiciones, valores = self._filtro(doc_type, creador, desde, hasta)
+        donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+        return self._conexion.execute(f"SELECT COUNT(*) FROM documentos {donde}", valores).fetchone()[0]
+
+    def creadores(self):
+        """
+        Usuarios que han guardado algún documento.
+        """
+        filas = self._conexion.execute('SELECT DISTINCT creador FROM documentos ORDER BY creador').fetchall()
+        return [fila[0] for fila in filas]
+
+    def eliminar(self, doc_id):
+        """
+        Borra el documento; su blob también si ningún otro lo usa.
+        """
+        documento = self.obtener(doc_id)
+        if documento is None:
+            return False
+        with self._conexion:
+            self._conexion.execute('DELETE FROM documentos WHERE id = ?', (doc_id,))
+            compartido = self._conexion.execute('SELECT 1 FROM documentos WHERE blob = ? LIMIT 1',
+                                                (documento.blob,)).fetchone()
+        if not compartido:
+            ruta = self._ruta_blob(documento.blob, documento.formato)
+            if os.path.exists(ruta):
+                os.remove(ruta)
+        return True
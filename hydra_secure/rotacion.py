@@ -0,0 +1,146 @@
+"""
+Rotación de claves de un almacén cifrado con encrypt-dir (lotes.py).
+
+Cada <ruta>.hydra se descifra en memoria con la clave actual y se vuelve a
+cifrar con la nueva (archivos.descifrar_archivo_en_memoria y
+cifrar_datos_en_archivo), sin escribir el texto en disco. Los documentos se
+reparten por lotes entre procesos y cada lote registra un solo evento de
+auditoría AUDIT_BATCH (iso_27001_compliance.agrupar_auditoria) en lugar de
+los siete u ocho por documento; los fallos se siguen registrando uno a uno.
+
+Punto de control: cada documento rotado se apunta en el diario
+.hydra_rotacion.jsonl del almacén con el MAC de su nuevo cifrado, y una
+rotación interrumpida se reanuda volviéndola a lanzar con las mismas claves
+(un documento sin apuntar cuya cabecera ya valida la clave nueva tampoco se
+repite). El cifrado y sus metadatos se escriben con nombre temporal y se
+renombran en orden (cifrado, metadatos); si la interrupción cae entre los dos
+renombrados, la siguiente ejecución completa el segundo. Al terminar sin
+errores el diario se borra.
+"""
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .archivos import descifrar_archivo_en_memoria, cifrar_datos_en_archivo
+from .autoajuste import TAM_BLOQUE_POR_DEFECTO
+from .autenticacion import verificar_kcv, MAC_POR_DEFECTO
+from .integridad import ALGORITMO_POR_DEFECTO
+from .iso_27001_compliance import agrupar_auditoria, configuracion_logging
+from .lotes import (Manifiesto, Progreso, huella_cifrado, _recorrer, _inicializar,
+                    EXTENSION, EXTENSION_METADATOS, SUFIJO_TEMPORAL)
+
+NOMBRE_PUNTO_CONTROL = '.hydra_rotacion.jsonl'
+# Documentos por tarea (y por evento de auditoría)
+TAM_LOTE = 32
+
+def _completar_pendiente(ruta):
+    # Roll-forward: el cifrado nuevo ya se renombró pero sus metadatos no
+    meta = ruta + EXTENSION_METADATOS
+    if os.path.exists(meta + SUFIJO_TEMPORAL):
+        if os.path.exists(ruta + SUFIJO_TEMPORAL):
+            os.remove(ruta + SUFIJO_TEMPORAL)
+            os.remove(meta + SUFIJO_TEMPORAL)
+        else:
+            os.replace(meta + SUFIJO_TEMPORAL, meta)
+
+def _ya_rotado(ruta, clave_nueva):
+    # La comprobación de clave de la cabecera ya corresponde a la clave nueva
+    with open(ruta, 'rb') as f:
+        return verificar_kcv(clave_nueva, json.loads(f.readline()))
+
+def _rotar_uno(ruta, clave_actual, clave_nueva, id_usuario, doc_type):
+    meta = ruta + EXTENSION_METADATOS
+    with open(meta, encoding='utf-8') as f:
+        metadatos = json.load(f)
+    datos = descifrar_archivo_en_memoria(ruta, clave_actual, id_usuario, metadatos, doc_type=doc_type)
+    nuevos = cifrar_datos_en_archivo(datos, ruta + SUFIJO_TEMPORAL, clave_nueva, id_usuario, doc_type=doc_type,
+                                     binario=metadatos.get('formato') == 'binario',
+                                     tam_bloque=metadatos.get('tam_bloque', TAM_BLOQUE_POR_DEFECTO),
+                                     algoritmo_hash=metadatos.get('hash_alg', ALGORITMO_POR_DEFECTO),
+                                     algoritmo_mac=metadatos.get('mac_alg', MAC_POR_DEFECTO))
+    with open(meta + SUFIJO_TEMPORAL, 'w', encoding='utf-8') as f:
+        json.dump(nuevos, f)
+    os.replace(ruta + SUFIJO_TEMPORAL, ruta)
+    os.replace(meta + SUFIJO_TEMPORAL, meta)
+    return len(datos)
+
+def _rotar_lote(rutas, clave_actual, clave_nueva, id_usuario, doc_type):
+    """
+    [(ruta, bytes, huella nueva o None, error o None)] de un lote.
+    """
+    resultados = []
+    with agrupar_auditoria(f"Key rotation batch of {len(rutas)} documents for user {id_usuario}"):
+        for ruta in rutas:
+            try:
+                tam = _rotar_uno(ruta, clave_actual, clave_nueva, id_usuario, doc_type)
+                resultados.append((ruta, tam, huella_cifrado(ruta), None))
+            except Exception as e:
+                # Como _completar_pendiente: si el cifrado nuevo ya se renombró, sus
+                # metadatos temporales se conservan para completarlo en la siguiente ejecución
+                if os.path.exists(ruta + SUFIJO_TEMPORAL):
+                    for temporal in (ruta + SUFIJO_TEMPORAL, ruta + EXTENSION_METADATOS + SUFIJO_TEMPORAL):
+                        if os.path.exists(temporal):
+                            os.remove(temporal)
+                resultados.append((ruta, 0, None, f"{type(e).__name__}: {e}"))
+    return resultados
+
+def rotar_claves(almacen, clave_actual, clave_nueva, id_usuario, doc_type=None, procesos=None, tam_lote=TAM_LOTE,
+                 progreso=None):
+    """
+    Vuelve a cifrar con clave_nueva todos los documentos del almacén.
+    Devuelve un resumen con procesados, omitidos (ya rotados), errores,
+    bytes y segundos.
+    """
+    almacen = os.path.abspath(almacen)
+    if not os.path.isdir(almacen):
+        raise ValueError(f"No es un directorio: {almacen}")
+    procesos = procesos or int(os.environ.get('HYDRA_PROCESOS') or os.cpu_count() or 1)
+    punto = Manifiesto(os.path.join(almacen, NOMBRE_PUNTO_CONTROL))
+    try:
+        documentos = list(_recorrer(almacen, lambda nombre: nombre.endswith(EXTENSION)))
+        progreso = progreso if progreso is not None else Progreso(len(documentos))
+        progreso.total = len(documentos)
+        relativas, pendientes = {}, []
+        for rel, ruta in documentos:
+            _completar_pendiente(ruta)
+            entrada = punto.entradas.get(rel)
+            if entrada is not None and entrada['huella'] == huella_cifrado(ruta):
+                progreso.avanzar(omitido=True)
+            elif _ya_rotado(ruta, clave_nueva):
+                estado = os.stat(ruta)
+                punto.registrar(rel, estado.st_size, estado.st_mtime_ns, huella_cifrado(ruta))
+                progreso.avanzar(omitido=True)
+            else:
+                relativas[ruta] = rel
+                pendientes.append(ruta)
+        lotes = [pendientes[i:i + tam_lote] for i in range(0, len(pendientes), tam_lote)]
+
+        def apuntar(resultados):
+            for ruta, tam, huella, error in resultados:
+                if error is not None:
+                    progreso.avanzar(error=(relativas[ruta], error))
+                    continue
+                estado = os.stat(ruta)
+                punto.registrar(relativas[ruta], estado.st_size, estado.st_mtime_ns, huella)
+                progreso.avanzar(tam)
+
+        argumentos = (clave_actual, clave_nueva, id_usuario, doc_type)
+        if procesos <= 1:
+            for lote in lotes:
+                apuntar(_rotar_lote(lote, *argumentos))
+        elif lotes:
+            with ProcessPoolExecutor(procesos, initializer=_inicializar,
+                                     initargs=(configuracion_logging(),)) as ejecutor:
+                futuros = [ejecutor.submit(_rotar_lote, lote, *argumentos) for lote in lotes]
+                try:
+                    for futuro in as_completed(futuros):
+                        apuntar(futuro.result())
+                except BaseException:
+                    ejecutor.shutdown(cancel_futures=True)
+                    raise
+    finally:
+        punto.cerrar()
+    resumen = progreso.resumen()
+    if not resumen['errores']:
+        os.remove(punto.ruta)
+    return resumen
@@ -1,12 +1,12 @@
-import hashlib
 import uuid
 import datetime
+from .integridad import generar_hash, ALGORITMO_POR_DEFECTO
 
-def generar_semilla(clave, id_usuario, timestamp=None, uuid_str=None):
+def generar_semilla(clave, id_usuario, timestamp=None, uuid_str=None, algoritmo=ALGORITMO_POR_DEFECTO):
     if timestamp is None:
         timestamp = int(datetime.datetime.now().strftime('%Y%m%d%H%M%S'))
     if uuid_str is None:
         uuid_str = str(uuid.uuid4())
     semilla_base = f"{clave}{timestamp}{id_usuario}{uuid_str}"
-    semilla = hashlib.sha256(semilla_base.encode()).hexdigest()
+    semilla = generar_hash(semilla_base, algoritmo)
     return semilla, timestamp, uuid_str 
\ No newline at end of file
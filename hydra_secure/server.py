@@ -0,0 +1,376 @@
+"""
+Servicio local de cifrado: un solo proceso con el motor ya ajustado al que se
+conectan varias aplicaciones.
+
+Protocolo sobre TCP (por defecto 127.0.0.1:8765): cada mensaje es una trama
+con 4 bytes de longitud (big endian) seguidos de un objeto JSON en UTF-8. La
+petición lleva 'op' ('encrypt', 'decrypt', 'access' o 'status') y sus
+parámetros; la respuesta lleva 'estado' con códigos al estilo HTTP (200, 400,
+403, 413, 500, 503) y 'resultado' o 'error'. Las conexiones se mantienen
+abiertas (keep-alive) y atienden peticiones una tras otra.
+
+Las operaciones se ejecutan en un pool de procesos que se arranca y calienta
+al iniciar (imports y perfil de autoajuste cargados; el logging de auditoría es
+el del proceso que arranca el servicio).
+Si hay max_pendientes peticiones en curso o en cola, las nuevas se rechazan en
+el acto con 503 en lugar de encolarse sin límite. Cliente incluido: Cliente,
+con un pool de conexiones reutilizables y seguro entre hilos.
+
+Uso: python -m hydra_secure.server [--host 127.0.0.1] [--puerto 8765]
+                                   [--procesos N] [--max-pendientes M]
+"""
+import os
+import sys
+import json
+import socket
+import struct
+import asyncio
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+from .iso_27001_compliance import (configurar_logging, configuracion_logging, replicar_logging, contexto_solicitud,
+                                   iso_compliance, RUTA_LOG_AUDITORIA)
+from .metricas import activas, registro
+
+HOST_POR_DEFECTO = '127.0.0.1'
+PUERTO_POR_DEFECTO = 8765
+# Peticiones en curso o en cola por proceso antes de responder 503
+MAX_PENDIENTES_POR_PROCESO = 4
+MAX_TRAMA = 256 * 1024 ** 2
+# Segundos que una conexión keep-alive puede estar inactiva
+TIEMPO_INACTIVO = 60.0
+# Opciones de cifrar_pipeline que se aceptan por la red (el PNG escribiría en el servidor)
+OPCIONES_CIFRADO = ('motor', 'compresion', 'algoritmo_hash', 'algoritmo_mac')
+
+_CABECERA = struct.Struct('>I')
+
+class ServicioSaturado(RuntimeError):
+    """
+    El servicio respondió 503: demasiadas peticiones pendientes.
+    """
+
+def _empaquetar(objeto):
+    datos = json.dumps(objeto).encode('utf-8')
+    return _CABECERA.pack(len(datos)) + datos
+
+# --- Procesos de trabajo ---
+
+def _calentar(logging_padre=None):
+    # Inicializador de cada proceso: todo lo que cada aplicación pagaba por su cuenta
+    replicar_logging(logging_padre)
+    from . import pipeline, autoajuste  # noqa: F401
+    autoajuste.perfil()
+
+def _listo():
+    return os.getpid()
+
+def _ejecutar(operacion, parametros, sesion):
+    from .pipeline import cifrar_pipeline, descifrar_pipeline
+    usuario = parametros['usuario']
+    with contexto_solicitud(usuario, sesion):
+        if operacion == 'encrypt':
+            opciones = {k: parametros[k] for k in OPCIONES_CIFRADO if k in parametros}
+            cifrado, metadatos = cifrar_pipeline(parametros['mensaje'], parametros['clave'], usuario,
+                                                 doc_type=parametros.get('doc_type'), **opciones)
+            return {'cifrado': cifrado, 'metadatos': metadatos}
+        if operacion == 'decrypt':
+            opciones = {'motor': parametros['motor']} if 'motor' in parametros else {}
+            return descifrar_pipeline(parametros['cifrado'], parametros['clave'], usuario, parametros['metadatos'],
+                                      doc_type=parametros.get('doc_type'), **opciones)
+        return iso_compliance.access_control(usuario, parametros['doc_type'], parametros['accion'])
+
+def _codigo(error):
+    if isinstance(error, PermissionError):
+        return 403
+    if isinstance(error, (ValueError, KeyError, TypeError)):
+        return 400
+    return 500
+
+# --- Servidor ---
+
+class Servidor:
+    """
+    Servicio asyncio con pool de procesos precalentado y rechazo por saturación.
+    """
+
+    def __init__(self, host=HOST_POR_DEFECTO, puerto=PUERTO_POR_DEFECTO, procesos=None, max_pendientes=None):
+        self.host = host
+        self.puerto = puerto
+        self.procesos = procesos or int(os.environ.get('HYDRA_PROCESOS') or os.cpu_count() or 1)
+        self.max_pendientes = self.procesos * MAX_PENDIENTES_POR_PROCESO if max_pendientes is None else max_pendientes
+        self.pendientes = 0
+        self.atendidas = 0
+        self.rechazadas = 0
+        self._ejecutor = None
+        self._servidor = None
+        self._conexiones = set()
+        self._siguiente_conexion = 0
+        self._bucle = None
+        self._hilo = None
+
+    async def iniciar(self):
+        """
+        Arranca y calienta todos los procesos y abre el puerto (con puerto 0
+        se elige uno libre y queda en self.puerto).
+        """
+        bucle = asyncio.get_running_loop()
+        self._ejecutor = ProcessPoolExecutor(self.procesos, initializer=_calentar,
+                                             initargs=(configuracion_logging(),))
+        # Cada envío sin procesos libres arranca uno nuevo: así se arrancan todos ya
+        await asyncio.gather(*(bucle.run_in_executor(self._ejecutor, _listo) for _ in range(self.procesos)))
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.puerto)
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+        return self
+
+    async def cerrar(self):
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+        for escritor in list(self._conexiones):
+            escritor.close()
+        if self._ejecutor is not None:
+            self._ejecutor.shutdown()
+
+    def estado(self):
+        return {'procesos': self.procesos, 'max_pendientes': self.max_pendientes, 'pendientes': self.pendientes,
+                'atendidas': self.atendidas, 'rechazadas': self.rechazadas, 'conexiones': len(self._conexiones)}
+
+    async def _atender(self, lector, escritor):
+        self._siguiente_conexion += 1
+        sesion = f"srv-{os.getpid()}-{self._siguiente_conexion}"
+        self._conexiones.add(escritor)
+        try:
+            while True:
+                try:
+                    prefijo = await asyncio.wait_for(lector.readexactly(_CABECERA.size), TIEMPO_INACTIVO)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                (longitud,) = _CABECERA.unpack(prefijo)
+                if longitud > MAX_TRAMA:
+                    escritor.write(_empaquetar({'estado': 413, 'error': f"Trama de {longitud} bytes demasiado grande."}))
+                    await escritor.drain()
+                    break
+                try:
+                    peticion = json.loads(await lector.readexactly(longitud))
+                except asyncio.IncompleteReadError:
+                    break
+                except ValueError:
+                    peticion = None
+                respuesta = await self._procesar(peticion, sesion)
+                if isinstance(peticion, dict) and 'id' in peticion:
+                    respuesta['id'] = peticion['id']
+                escritor.write(_empaquetar(respuesta))
+                # Si el cliente no lee, la escritura espera (contrapresión por conexión)
+                await escritor.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._conexiones.discard(escritor)
+            escritor.close()
+
+    async def _procesar(self, peticion, sesion):
+        if not isinstance(peticion, dict) or peticion.get('op') not in ('encrypt', 'decrypt', 'access', 'status'):
+            return {'estado': 400, 'error': 'Petición inválida.'}
+        operacion = peticion['op']
+        if operacion == 'status':
+            return {'estado': 200, 'resultado': self.estado()}
+        if self.pendientes >= self.max_pendientes:
+            self.rechazadas += 1
+            self._contar(operacion, 503)
+            return {'estado': 503, 'error': 'Servicio saturado, reintentar más tarde.'}
+        self.pendientes += 1
+        try:
+            resultado = await asyncio.get_running_loop().run_in_executor(
+                self._ejecutor, _ejecutar, operacion, peticion, sesion)
+            respuesta = {'estado': 200, 'resultado': resultado}
+        except Exception as e:
+            respuesta = {'estado': _codigo(e), 'error': f"{type(e).__name__}: {e}"}
+        finally:
+            self.pendientes -= 1
+        self.atendidas += 1
+        self._contar(operacion, respuesta['estado'])
+        return respuesta
+
+    def _contar(self, operacion, estado):
+        if activas():
+            registro.incrementar('hydra_servidor_peticiones', op=operacion, estado=str(estado))
+
+    async def servir(self, al_iniciar=None):
+        await self.iniciar()
+        if al_iniciar is not None:
+            al_iniciar(self)
+        try:
+            await self._servidor.serve_forever()
+        finally:
+            await self.cerrar()
+
+    def arrancar_en_hilo(self):
+        """
+        Arranca el servicio en un hilo propio (para incrustarlo en una
+        aplicación o en pruebas); vuelve cuando ya acepta conexiones.
+        """
+        listo = threading.Event()
+        errores = []
+
+        def correr():
+            self._bucle = asyncio.new_event_loop()
+            try:
+                self._bucle.run_until_complete(self.iniciar())
+            except Exception as e:
+                errores.append(e)
+                return
+            finally:
+                listo.set()
+            self._bucle.run_forever()
+            self._bucle.run_until_complete(self.cerrar())
+            self._bucle.close()
+
+        self._hilo = threading.Thread(target=correr, name='hydra-servidor', daemon=True)
+        self._hilo.start()
+        listo.wait()
+        if errores:
+            raise errores[0]
+        return self
+
+    def detener(self):
+        if self._hilo is not None:
+            self._bucle.call_soon_threadsafe(self._bucle.stop)
+            self._hilo.join()
+            self._hilo = None
+
+# --- Cliente ---
+
+def _recibir(conexion, n):
+    datos = bytearray()
+    while len(datos) < n:
+        trozo = conexion.recv(n - len(datos))
+        if not trozo:
+            raise ConnectionError('El servicio cerró la conexión.')
+        datos += trozo
+    return bytes(datos)
+
+class _ConexionCaducada(ConnectionError):
+    """
+    Una conexión reutilizada estaba cerrada por el servicio.
+    """
+
+class Cliente:
+    """
+    Cliente del servicio con conexiones reutilizables (hasta max_conexiones
+    a la vez); se puede compartir entre hilos.
+    """
+
+    def __init__(self, host=HOST_POR_DEFECTO, puerto=PUERTO_POR_DEFECTO, max_conexiones=4, timeout=60.0):
+        self.host = host
+        self.puerto = puerto
+        self.timeout = timeout
+        self._libres = []
+        self._lock = threading.Lock()
+        self._cupo = threading.BoundedSemaphore(max_conexiones)
+
+    @contextmanager
+    def _conexion(self, nueva=False):
+        with self._cupo:
+            conexion = None
+            if not nueva:
+                with self._lock:
+                    conexion = self._libres.pop() if self._libres else None
+            reutilizada = conexion is not None
+            if conexion is None:
+                conexion = socket.create_connection((self.host, self.puerto), self.timeout)
+                conexion.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            try:
+                yield conexion, reutilizada
+            except BaseException:
+                conexion.close()
+                raise
+            with self._lock:
+                self._libres.append(conexion)
+
+    def _intercambiar(self, peticion, nueva=False):
+        with self._conexion(nueva) as (conexion, reutilizada):
+            try:
+                conexion.sendall(_empaquetar(peticion))
+                prefijo = _recibir(conexion, _CABECERA.size)
+            except ConnectionError as e:
+                if not reutilizada:
+                    raise
+                # El servicio cerró la conexión inactiva antes de leer la petición; al
+                # salir con excepción, _conexion la cierra en vez de devolverla al pool
+                raise _ConexionCaducada() from e
+            return json.loads(_recibir(conexion, _CABECERA.unpack(prefijo)[0]))
+
+    def solicitar(self, op, **parametros):
+        """
+        Envía una petición y devuelve su resultado; los códigos de error se
+        convierten en PermissionError (403), ValueError (400),
+        ServicioSaturado (503) o RuntimeError.
+        """
+        peticion = dict(parametros, op=op)
+        try:
+            respuesta = self._intercambiar(peticion)
+        except _ConexionCaducada:
+            # Las demás conexiones libres pueden haber caducado igual: se reintenta en una nueva
+            respuesta = self._intercambiar(peticion, nueva=True)
+        estado = respuesta.get('estado')
+        if estado == 200:
+            return respuesta.get('resultado')
+        error = respuesta.get('error', f"Estado {estado}")
+        if estado == 403:
+            raise PermissionError(error)
+        if estado == 400:
+            raise ValueError(error)
+        if estado == 503:
+            raise ServicioSaturado(error)
+        raise RuntimeError(error)
+
+    def cifrar(self, mensaje, clave, id_usuario, doc_type=None, **opciones):
+        resultado = self.solicitar('encrypt', mensaje=mensaje, clave=clave, usuario=id_usuario,
+                                   doc_type=doc_type, **opciones)
+        return resultado['cifrado'], resultado['metadatos']
+
+    def descifrar(self, cifrado, clave, id_usuario, metadatos, doc_type=None, **opciones):
+        return self.solicitar('decrypt', cifrado=cifrado, clave=clave, usuario=id_usuario, metadatos=metadatos,
+                              doc_type=doc_type, **opciones)
+
+    def permitido(self, id_usuario, doc_type, accion):
+        return self.solicitar('access', usuario=id_usuario, doc_type=doc_type, accion=accion)
+
+    def estado(self):
+        return self.solicitar('status')
+
+    def cerrar(self):
+        with self._lock:
+            libres, self._libres = self._libres, []
+        for conexion in libres:
+            conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog='python -m hydra_secure.server', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default=HOST_POR_DEFECTO)
+    parser.add_argument('--puerto', type=int, default=PUERTO_POR_DEFECTO)
+    parser.add_argument('--procesos', type=int, default=None, help='por defecto HYDRA_PROCESOS o el número de CPUs')
+    parser.add_argument('--max-pendientes', type=int, default=None,
+                        help=f'peticiones en curso o en cola antes de responder 503 '
+                             f'(por defecto {MAX_PENDIENTES_POR_PROCESO} por proceso)')
+    args = parser.parse_args(argv)
+    configurar_logging(RUTA_LOG_AUDITORIA, consola=False)
+    servidor = Servidor(args.host, args.puerto, args.procesos, args.max_pendientes)
+    try:
+        asyncio.run(servidor.servir(lambda s: print(
+            f"Servicio hydra_secure en {s.host}:{s.puerto} con {s.procesos} procesos "
+            f"(máximo {s.max_pendientes} pendientes)")))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
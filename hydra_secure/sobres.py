@@ -0,0 +1,193 @@
+"""
+Cifrado de sobre para varios destinatarios.
+
+El documento se cifra una sola vez, como artefacto autocontenido
+(cifrar_pipeline con autocontenido=True), con una clave de datos aleatoria de
+32 bytes. El sobre guarda esa clave envuelta con AES-256-GCM para cada
+destinatario bajo su clave de cifrado de claves (KEK). Por defecto los
+destinatarios son los usuarios a los que la política de access_control
+permite descifrar ese tipo de documento.
+
+Dar acceso a un lector más solo envuelve 32 bytes (conceder), sin volver a
+cifrar el documento; revocar quita su entrada del sobre. Cada envoltura se
+liga al documento (uuid), al tipo de documento y al destinatario como datos
+adicionales autenticados, así que no se puede trasladar a otro sobre.
+
+Para que un sobre se pueda abrir en otro proceso (o tras reiniciar), las KEK
+se derivan (HMAC-SHA256) de una clave maestra: la de configurar_clave_maestra,
+la de la variable de entorno HYDRA_CLAVE_MAESTRA (hex) o la de un archivo
+(cargar_clave_maestra). Sin clave maestra, las KEK se generan en el almacén
+en memoria de iso_compliance (key_management, 'kek:<usuario>') y el sobre
+solo sirve dentro del proceso que lo creó. El sobre anota de dónde salen sus
+KEK ('kek'); al desenvolver nunca se genera una KEK nueva: si no está
+disponible, el error lo dice en lugar de parecer una manipulación.
+"""
+import os
+import hmac
+import hashlib
+
+from .pipeline import cifrar_pipeline, descifrar_pipeline
+from .iso_27001_compliance import iso_compliance
+
+LONGITUD_CLAVE_DATOS = 32
+LONGITUD_CLAVE_MAESTRA = 32
+VARIABLE_CLAVE_MAESTRA = 'HYDRA_CLAVE_MAESTRA'
+ORIGEN_MEMORIA = 'memoria'
+_LONGITUD_NONCE = 12
+
+_clave_maestra = None
+
+def configurar_clave_maestra(clave):
+    """
+    Fija la clave maestra (bytes o hex, al menos 32 bytes) de la que se
+    derivan las KEK; None vuelve a la variable de entorno.
+    """
+    global _clave_maestra
+    if isinstance(clave, str):
+        clave = bytes.fromhex(clave)
+    if clave is not None and len(clave) < LONGITUD_CLAVE_MAESTRA:
+        raise ValueError(f"La clave maestra debe tener al menos {LONGITUD_CLAVE_MAESTRA} bytes.")
+    _clave_maestra = clave
+
+def cargar_clave_maestra(ruta):
+    """
+    Configura la clave maestra guardada en ruta; la primera vez la genera y
+    la escribe con permisos solo para el propietario.
+    """
+    try:
+        descriptor = os.open(ruta, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(ruta, 'rb') as f:
+            configurar_clave_maestra(f.read())
+        return
+    clave = os.urandom(LONGITUD_CLAVE_MAESTRA)
+    with os.fdopen(descriptor, 'wb') as f:
+        f.write(clave)
+    iso_compliance.log_security_event('KEY_GENERATED', f"Master key generated: {os.path.basename(ruta)}")
+    configurar_clave_maestra(clave)
+
+def clave_maestra():
+    """
+    La clave maestra configurada (o la de HYDRA_CLAVE_MAESTRA), o None.
+    """
+    if _clave_maestra is None and os.environ.get(VARIABLE_CLAVE_MAESTRA):
+        configurar_clave_maestra(os.environ[VARIABLE_CLAVE_MAESTRA])
+    return _clave_maestra
+
+def origen_kek():
+    """
+    De dónde salen ahora las KEK: 'maestra:<huella>' (derivadas de la clave
+    maestra) u ORIGEN_MEMORIA (almacén de claves del proceso). Se guarda en
+    cada sobre.
+    """
+    maestra = clave_maestra()
+    if maestra is None:
+        return ORIGEN_MEMORIA
+    return 'maestra:' + hmac.new(maestra, b'hydra_secure|huella', hashlib.sha256).hexdigest()[:16]
+
+def clave_de_destinatario(id_usuario, origen=None, generar=True):
+    """
+    KEK del destinatario: derivada de la clave maestra o, sin ella, la del
+    almacén de claves (se genera si falta y generar es True). origen es el
+    de un sobre existente; si no coincide con el actual, o la KEK no está,
+    ValueError ('KEK no disponible').
+    """
+    actual = origen_kek()
+    if origen is not None and origen != actual:
+        iso_compliance.log_security_event('KEY_UNAVAILABLE', f"KEK source mismatch for user {id_usuario}", 'ERROR')
+        raise ValueError(f"KEK no disponible para {id_usuario}: el sobre se creó con otra clave maestra "
+                         f"({origen}, ahora {actual}).")
+    if actual != ORIGEN_MEMORIA:
+        return hmac.new(clave_maestra(), f"hydra_secure|kek|{id_usuario}".encode('utf-8'), hashlib.sha256).digest()
+    identificador = f"kek:{id_usuario}"
+    clave = iso_compliance.key_management(identificador, 'retrieve')
+    if clave is None and generar:
+        clave = iso_compliance.key_management(identificador, 'generate')
+    if clave is None:
+        iso_compliance.log_security_event('KEY_UNAVAILABLE', f"No KEK available for user {id_usuario}", 'ERROR')
+        raise ValueError(f"KEK no disponible para {id_usuario}: el sobre se creó sin clave maestra en otro "
+                         f"proceso; configura {VARIABLE_CLAVE_MAESTRA} para sobres duraderos.")
+    return clave
+
+def _datos_adicionales(sobre, destinatario):
+    return f"hydra_secure|sobre|{sobre['uuid']}|{sobre['doc_type']}|{destinatario}".encode('utf-8')
+
+def _envolver(sobre, destinatario, clave_datos):
+    # cryptography se importa al primer uso, como en cryptographic_control
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    nonce = os.urandom(_LONGITUD_NONCE)
+    kek = clave_de_destinatario(destinatario, sobre.get('kek', ORIGEN_MEMORIA))
+    envuelta = AESGCM(kek).encrypt(nonce, clave_datos, _datos_adicionales(sobre, destinatario))
+    return (nonce + envuelta).hex()
+
+def _desenvolver(sobre, id_usuario):
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    envuelta = sobre['claves'].get(id_usuario)
+    if envuelta is None:
+        iso_compliance.log_security_event('ACCESS_DENIED', f"User {id_usuario} is not a recipient of {sobre['uuid']}",
+                                          'WARNING')
+        raise PermissionError(f"Usuario {id_usuario} no es destinatario del documento")
+    crudo = bytes.fromhex(envuelta)
+    kek = clave_de_destinatario(id_usuario, sobre.get('kek', ORIGEN_MEMORIA), generar=False)
+    nonce, envuelta = crudo[:_LONGITUD_NONCE], crudo[_LONGITUD_NONCE:]
+    try:
+        return AESGCM(kek).decrypt(nonce, envuelta, _datos_adicionales(sobre, id_usuario))
+    except InvalidTag:
+        iso_compliance.log_security_event('KEY_UNWRAP_FAILED', f"Key unwrap failed for user {id_usuario}", 'ERROR')
+        raise ValueError('La clave envuelta fue manipulada o la KEK no corresponde.') from None
+
+def _autorizar_destinatario(destinatario, doc_type):
+    if not iso_compliance.access_control(destinatario, doc_type, 'decrypt'):
+        raise PermissionError(f"Usuario {destinatario} no tiene permisos para descifrar {doc_type}")
+
+def cifrar_para(mensaje, id_usuario, doc_type, destinatarios=None, **opciones):
+    """
+    Cifra mensaje una vez y devuelve (cifrado, sobre). destinatarios por
+    defecto: todos los que la política deja descifrar doc_type. opciones se
+    pasan a cifrar_pipeline (contenedor_png, motor...).
+    """
+    clave_datos = os.urandom(LONGITUD_CLAVE_DATOS)
+    cifrado, metadatos = cifrar_pipeline(mensaje, clave_datos.hex(), id_usuario, doc_type=doc_type,
+                                         autocontenido=True, **opciones)
+    sobre = {'uuid': metadatos['uuid'], 'doc_type': doc_type, 'propietario': id_usuario, 'kek': origen_kek(),
+             'claves': {}}
+    if destinatarios is None:
+        destinatarios = iso_compliance.authorized_users(doc_type, 'decrypt')
+    else:
+        for destinatario in destinatarios:
+            _autorizar_destinatario(destinatario, doc_type)
+    for destinatario in destinatarios:
+        sobre['claves'][destinatario] = _envolver(sobre, destinatario, clave_datos)
+    iso_compliance.log_security_event('ENVELOPE_CREATED', f"Document {sobre['uuid']} wrapped for "
+                                                          f"{len(sobre['claves'])} recipients by {id_usuario}")
+    return cifrado, sobre
+
+def conceder(sobre, id_usuario, destinatario):
+    """
+    Da acceso a destinatario: id_usuario (que ya lo tiene) desenvuelve la
+    clave de datos y la envuelve para él. Modifica y devuelve el sobre.
+    """
+    _autorizar_destinatario(id_usuario, sobre['doc_type'])
+    _autorizar_destinatario(destinatario, sobre['doc_type'])
+    sobre['claves'][destinatario] = _envolver(sobre, destinatario, _desenvolver(sobre, id_usuario))
+    iso_compliance.log_security_event('ENVELOPE_GRANTED', f"User {id_usuario} granted {destinatario} access to "
+                                                          f"{sobre['uuid']}")
+    return sobre
+
+def revocar(sobre, destinatario):
+    """
+    Quita a destinatario del sobre (no vuelve a cifrar el documento: quien
+    ya conozca la clave de datos la sigue conociendo).
+    """
+    if sobre['claves'].pop(destinatario, None) is not None:
+        iso_compliance.log_security_event('ENVELOPE_REVOKED', f"Access of {destinatario} to {sobre['uuid']} revoked")
+    return sobre
+
+def descifrar_para(cifrado, sobre, id_usuario, **opciones):
+    """
+    Descifra con la clave de datos que id_usuario desenvuelve del sobre.
+    """
+    _autorizar_destinatario(id_usuario, sobre['doc_type'])
+    clave_datos = _desenvolver(sobre, id_usuario)
+    return descifrar_pipeline(cifrado, clave_datos.hex(), id_usuario, doc_type=sobre['doc_type'], **opciones)
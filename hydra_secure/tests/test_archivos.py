@@ -0,0 +1,79 @@
+from hydra_secure.archivos import cifrar_archivo, descifrar_archivo
+from hydra_secure.pipeline import descifrar_pipeline
+from hydra_secure.preparacion import preparar_entrada
+from hydra_secure import fusion
+import os
+import json
+import random
+import pytest
+
+def _cifrar(tmp_path, contenido, **opciones):
+    plano, cifrado = tmp_path / "plano.bin", tmp_path / "cifrado.hydra"
+    plano.write_bytes(contenido)
+    metadatos = cifrar_archivo(str(plano), str(cifrado), "clave", "user1", doc_type="datos_clientes", **opciones)
+    return cifrado, metadatos
+
+@pytest.mark.parametrize("longitud", [0, 1, 7, 1000, 70000])
+def test_archivo_binario_ida_y_vuelta(tmp_path, longitud):
+    contenido = bytes(random.Random(longitud).randrange(256) for _ in range(longitud))
+    cifrado, metadatos = _cifrar(tmp_path, contenido)
+    # Salida preasignada: cabecera más el cuerpo predicho para la longitud de entrada
+    cabecera = cifrado.read_bytes().split(b"\n", 1)[0]
+    assert os.path.getsize(cifrado) == len(cabecera) + 1 + fusion.longitud_cuerpo(8 + longitud, 4)
+    salida = tmp_path / "salida.bin"
+    escritos = descifrar_archivo(str(cifrado), str(salida), "clave", "user1", metadatos, doc_type="datos_clientes")
+    assert escritos == longitud and salida.read_bytes() == contenido
+    # El cifrado del archivo también lo entiende el pipeline en memoria
+    recuperado = descifrar_pipeline(cifrado.read_text(), "clave", "user1", metadatos, doc_type="datos_clientes")
+    assert recuperado == contenido.decode("latin1")
+
+def test_archivo_metadatos_sin_permutaciones(tmp_path, monkeypatch):
+    monkeypatch.setattr(fusion, "BLOQUES_POR_TROZO", 16)
+    contenido = bytes(range(256)) * 40
+    cifrado, metadatos = _cifrar(tmp_path, contenido)
+    # Solo los campos de la cabecera: las permutaciones se derivan de la semilla al descifrar
+    assert "permutaciones" not in metadatos and metadatos["tam_bloque"] == 4
+    salida = tmp_path / "salida.bin"
+    descifrar_archivo(str(cifrado), str(salida), "clave", "user1", metadatos, doc_type="datos_clientes")
+    assert salida.read_bytes() == contenido
+    recuperado = descifrar_pipeline(cifrado.read_text(), "clave", "user1", metadatos, doc_type="datos_clientes")
+    assert recuperado == contenido.decode("latin1")
+
+def test_archivo_texto_se_prepara_como_el_pipeline(tmp_path):
+    texto = "Cláusula 1ª:\nconfidencialidad\tabsoluta. " * 30
+    cifrado, metadatos = _cifrar(tmp_path, texto.encode("utf-8"), binario=False)
+    assert "formato" not in metadatos
+    assert descifrar_pipeline(cifrado.read_text(), "clave", "user1", metadatos,
+                              doc_type="datos_clientes") == preparar_entrada(texto)
+    salida = tmp_path / "salida.txt"
+    descifrar_archivo(str(cifrado), str(salida), "clave", "user1", metadatos, doc_type="datos_clientes")
+    assert salida.read_text() == preparar_entrada(texto)
+
+def test_archivo_manipulado_no_deja_salida(tmp_path):
+    cifrado, metadatos = _cifrar(tmp_path, b"Balance Q4 " * 100)
+    datos = bytearray(cifrado.read_bytes())
+    datos[-5] = ord("A") if datos[-5] != ord("A") else ord("B")
+    cifrado.write_bytes(bytes(datos))
+    salida = tmp_path / "salida.bin"
+    with pytest.raises(ValueError):
+        descifrar_archivo(str(cifrado), str(salida), "clave", "user1", metadatos, doc_type="datos_clientes")
+    assert not salida.exists()
+    with pytest.raises(ValueError):
+        descifrar_archivo(str(cifrado), str(salida), "otra", "user1", metadatos, doc_type="datos_clientes")
+
+def test_archivo_cuerpo_irregular_no_deja_salida(tmp_path, monkeypatch):
+    monkeypatch.setattr(fusion, "BLOQUES_POR_TROZO", 16)
+    cifrado, metadatos = _cifrar(tmp_path, b"Balance Q4 " * 100)
+    # Sin MAC el cuerpo llega al núcleo: un bloque corto en el segundo trozo, con
+    # el primero ya escrito en la salida
+    cabecera, cuerpo = cifrado.read_bytes().split(b"\n", 1)
+    cabecera = json.loads(cabecera)
+    del cabecera["mac"]
+    bloques = cuerpo.split(b"|")
+    bloques[20] = b"AA=="
+    cifrado.write_bytes(json.dumps(cabecera).encode() + b"\n" + b"|".join(bloques))
+    metadatos = {k: v for k, v in metadatos.items() if k != "mac"}
+    salida = tmp_path / "salida.bin"
+    with pytest.raises(ValueError, match="irregulares"):
+        descifrar_archivo(str(cifrado), str(salida), "clave", "user1", metadatos, doc_type="datos_clientes")
+    assert not salida.exists()
@@ -0,0 +1,63 @@
+from hydra_secure import artefacto
+from hydra_secure.pipeline import cifrar_pipeline, descifrar_pipeline
+from hydra_secure.funciones_bloque import derivar_permutaciones
+from hydra_secure.motores import obtener_motor
+from hydra_secure.preparacion import preparar_entrada
+from hydra_secure.semilla import generar_semilla
+import pytest
+
+def test_permutaciones_derivadas_de_la_semilla():
+    motor = obtener_motor('referencia')
+    for clave in ["k", "otraClave123"]:
+        semilla = generar_semilla(clave, "user1", 20240101000000, "uuid-fijo")[0]
+        for tam_bloque in [1, 3, 4, 7]:
+            for longitud in [1, 5, 17, 100]:
+                _, permutaciones = motor.cifrar("x" * longitud, clave, semilla, tam_bloque, prefijo="SALT1234")
+                assert derivar_permutaciones(semilla, longitud + 8, tam_bloque) == permutaciones
+
+@pytest.mark.parametrize("opciones", [{}, {"compresion": "zlib"}, {"motor": "fusion", "algoritmo_mac": "blake2b"}])
+def test_artefacto_se_descifra_sin_metadatos(opciones):
+    mensaje = "Reporte Q4: ingresos $15,750,000\n" * 20
+    cifrado, metadatos = cifrar_pipeline(mensaje, "clave", "CFO_001", doc_type="reportes_financieros",
+                                         autocontenido=True, **opciones)
+    assert isinstance(cifrado, bytes) and artefacto.es_artefacto(cifrado)
+    campos, inicio = artefacto.leer(cifrado)
+    assert campos["propietario"] == "CFO_001" and inicio < 128
+    # Otro usuario autorizado lo descifra solo con el artefacto y la clave
+    assert descifrar_pipeline(cifrado, "clave", "CEO_001", doc_type="reportes_financieros") == preparar_entrada(mensaje)
+    # Con los metadatos también se verifica el hash
+    assert descifrar_pipeline(cifrado, "clave", "CEO_001", metadatos,
+                              doc_type="reportes_financieros") == preparar_entrada(mensaje)
+
+def test_artefacto_manipulado_o_clave_incorrecta():
+    cifrado, _ = cifrar_pipeline("Contrato confidencial", "clave", "user1", doc_type="datos_clientes",
+                                 autocontenido=True)
+    with pytest.raises(ValueError, match="Clave incorrecta"):
+        descifrar_pipeline(cifrado, "otra", "user1", doc_type="datos_clientes")
+    # Cambiar un campo de la cabecera (tam_bloque) o del cuerpo rompe el MAC
+    for posicion in (10, len(cifrado) - 2):
+        alterado = bytearray(cifrado)
+        alterado[posicion] ^= 0x01
+        with pytest.raises(ValueError):
+            descifrar_pipeline(bytes(alterado), "clave", "user1", doc_type="datos_clientes")
+    texto, _ = cifrar_pipeline("Contrato confidencial", "clave", "user1", doc_type="datos_clientes")
+    with pytest.raises(ValueError, match="metadatos"):
+        descifrar_pipeline(texto, "clave", "user1", doc_type="datos_clientes")
+
+def test_artefacto_rechaza_flags_desconocidos_y_reservado():
+    cifrado, _ = cifrar_pipeline("Contrato confidencial", "clave", "user1", doc_type="datos_clientes",
+                                 autocontenido=True)
+    # Ni los flags (byte 5) ni el reservado (byte 9) entran en el MAC: se exige que sean conocidos
+    for posicion, bit in ((5, 0x80), (9, 0x01)):
+        alterado = bytearray(cifrado)
+        alterado[posicion] |= bit
+        with pytest.raises(ValueError, match="reservado"):
+            descifrar_pipeline(bytes(alterado), "clave", "user1", doc_type="datos_clientes")
+
+def test_artefacto_en_png(tmp_path):
+    pytest.importorskip("PIL")
+    ruta = str(tmp_path / "artefacto.png")
+    cifrado, _ = cifrar_pipeline("Balance anual", "clave", "user1", contenedor_png=True, ruta_png=ruta,
+                                 doc_type="datos_clientes", autocontenido=True)
+    assert cifrado == ruta
+    assert descifrar_pipeline(ruta, "clave", "user1", doc_type="datos_clientes") == "Balance anual"
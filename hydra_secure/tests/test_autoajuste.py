@@ -0,0 +1,54 @@
+from hydra_secure import autoajuste, fusion
+from hydra_secure.pipeline import cifrar_pipeline, descifrar_pipeline
+from hydra_secure.preparacion import preparar_entrada
+import json
+import pytest
+
+@pytest.fixture
+def perfil_temporal(tmp_path, monkeypatch):
+    ruta = tmp_path / "perfil.json"
+    monkeypatch.setenv("HYDRA_PERFIL", str(ruta))
+    monkeypatch.setattr(fusion, "BLOQUES_POR_TROZO", fusion.BLOQUES_POR_TROZO)
+    yield ruta
+    # Vuelve al perfil de la sesión (ver conftest), no al del usuario
+    monkeypatch.undo()
+    autoajuste.recargar()
+
+def test_sin_perfil_usa_referencia(perfil_temporal):
+    autoajuste.recargar()
+    assert autoajuste.elegir(10) == ('referencia', 4)
+    assert autoajuste.elegir(10 ** 8) == ('referencia', 4)
+
+def test_perfil_despacha_por_tamano(perfil_temporal):
+    perfil_temporal.write_text(json.dumps({
+        'version': autoajuste.VERSION_PERFIL,
+        'tramos': [{'hasta': 4096, 'motor': 'referencia', 'tam_bloque': 4},
+                   {'hasta': None, 'motor': 'fusion', 'tam_bloque': 8}],
+        'bloques_por_trozo': 2048,
+    }))
+    autoajuste.recargar()
+    assert fusion.BLOQUES_POR_TROZO == 2048
+    assert autoajuste.elegir(4096) == ('referencia', 4)
+    assert autoajuste.elegir(4097) == ('fusion', 8)
+    for mensaje, motor in [("Nota breve", 'referencia'), ("Balance anual " * 400, 'fusion')]:
+        cifrado, metadatos = cifrar_pipeline(mensaje, "clave", "user1", doc_type="datos_clientes")
+        assert metadatos['motor'] == motor
+        # Otro tamaño de bloque cambia el cifrado, pero cualquier motor lo descifra
+        assert descifrar_pipeline(cifrado, "clave", "user1", metadatos, doc_type="datos_clientes",
+                                  motor='referencia') == preparar_entrada(mensaje)
+        assert descifrar_pipeline(cifrado, "clave", "user1", metadatos, doc_type="datos_clientes") == preparar_entrada(mensaje)
+
+def test_perfil_invalido_se_ignora(perfil_temporal):
+    perfil_temporal.write_text(json.dumps({'version': autoajuste.VERSION_PERFIL,
+                                           'tramos': [{'hasta': None, 'motor': 'inexistente'}]}))
+    autoajuste.recargar()
+    assert autoajuste.elegir(100) == ('referencia', 4)
+
+def test_calibrar_y_guardar(perfil_temporal):
+    perfil = autoajuste.calibrar(tamanos=(64, 256), motores=['referencia', 'fusion'], trozos=(16, 64),
+                                 presupuesto=0.0)
+    assert perfil['tramos'][-1]['hasta'] is None
+    assert perfil['bloques_por_trozo'] in (16, 64)
+    autoajuste.guardar_perfil(perfil)
+    autoajuste.recargar()
+    assert autoajuste.elegir(10)[0] in ('referencia', 'fusion')
@@ -0,0 +1,47 @@
+from hydra_secure.busqueda import IndiceCiego, palabras
+from hydra_secure.pipeline import descifrar_pipeline
+import pytest
+
+OPCIONES = dict(doc_type="datos_clientes")
+
+def _indice():
+    indice = IndiceCiego()
+    documentos = {
+        "DOC_1": "Cliente: Empresa ABC S.A. Contacto: María García, Ciudad de México",
+        "DOC_2": "Cliente: Distribuidora XYZ. Contacto: Juan Pérez, Bogotá",
+        "DOC_3": "Renovación pendiente con Empresa ABC y Distribuidora XYZ",
+    }
+    cifrados = {doc_id: indice.cifrar(doc_id, texto, "clave", "user1", **OPCIONES)
+                for doc_id, texto in documentos.items()}
+    return indice, cifrados
+
+def test_indice_no_guarda_palabras_en_claro():
+    indice, _ = _indice()
+    assert palabras("María García, 2024!") == {"maria", "garcia", "2024"}
+    tokens = " ".join(indice.entradas)
+    assert "empresa" not in tokens and "garcia" not in tokens
+    assert all(len(token) == 32 for token in indice.entradas)
+
+def test_busqueda_devuelve_candidatos_y_solo_los_descifra_a_ellos():
+    indice, cifrados = _indice()
+    assert indice.buscar("empresa abc", "user1", **OPCIONES) == ["DOC_1", "DOC_3"]
+    assert indice.buscar("Pérez", "user2", **OPCIONES) == ["DOC_2"]
+    assert indice.buscar("inexistente", "user1", **OPCIONES) == []
+    descifrados = []
+
+    def descifrar(doc_id):
+        descifrados.append(doc_id)
+        cifrado, metadatos = cifrados[doc_id]
+        return descifrar_pipeline(cifrado, "clave", "user1", metadatos, **OPCIONES)
+
+    encontrados = indice.descifrar_candidatos("distribuidora xyz", "user1", "datos_clientes", descifrar)
+    assert sorted(encontrados) == descifrados == ["DOC_2", "DOC_3"]
+    indice.eliminar("DOC_3")
+    assert indice.buscar("empresa", "user1", **OPCIONES) == ["DOC_1"]
+
+def test_busqueda_con_control_de_acceso():
+    indice, _ = _indice()
+    with pytest.raises(PermissionError):
+        indice.buscar("empresa", "HACKER_001", **OPCIONES)
+    # Los tokens de un tipo de documento no coinciden con los de otro
+    assert indice.buscar("empresa", "CEO_001", doc_type="contratos") == []
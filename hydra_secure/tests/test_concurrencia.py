@@ -0,0 +1,58 @@
+from hydra_secure.motores import obtener_motor
+from hydra_secure.semilla import generar_semilla
+from hydra_secure.iso_27001_compliance import ISO27001Compliance, contexto_solicitud
+from benchmarks.escalado_hilos import escalado, gil_activo
+from concurrent.futures import ThreadPoolExecutor
+import os
+import random
+import pytest
+
+def test_permutaciones_deterministas_entre_hilos():
+    # Con el PRNG global, otro hilo resembraba a mitad de un shuffle
+    motor = obtener_motor('referencia')
+    semilla = generar_semilla("clave", "user1", 20240101000000, "uuid-fijo")[0]
+    datos = "Balance consolidado Q4 " * 40
+    esperado = motor.cifrar(datos, "clave", semilla, 7)
+
+    def cifrar_varias(_):
+        return [motor.cifrar(datos, "clave", semilla, 7) for _ in range(20)]
+
+    with ThreadPoolExecutor(8) as pool:
+        for resultados in pool.map(cifrar_varias, range(8)):
+            assert all(r == esperado for r in resultados)
+
+def test_permutar_no_toca_prng_global():
+    random.seed(1234)
+    esperado = random.random()
+    random.seed(1234)
+    obtener_motor('referencia').cifrar("abcdefgh" * 8, "k", "3" * 64, 4)
+    assert random.random() == esperado
+
+def test_contexto_por_hilo_y_totales():
+    compliance = ISO27001Compliance(max_registros=50)
+
+    def registrar(i):
+        with contexto_solicitud(f"user{i}", f"sess{i}"):
+            for _ in range(100):
+                compliance.log_security_event('EVENTO', f"user{i}")
+                compliance.audit_trail('ACCION', f"user{i}", {'sesion': f"sess{i}"})
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(registrar, range(8)))
+    assert compliance.total_security_events == 800
+    assert compliance.total_audit_entries == 800
+    assert all(e['user_id'] == e['description'] for e in compliance.security_events)
+    assert all(e['session_id'] == e['details']['sesion'] for e in compliance.audit_log)
+    # Fuera del contexto se vuelve a los valores por defecto
+    assert compliance.current_user == 'SYSTEM' and compliance.session_id == 'N/A'
+
+def test_ids_de_incidente_unicos():
+    compliance = ISO27001Compliance()
+    with ThreadPoolExecutor(8) as pool:
+        ids = list(pool.map(lambda _: compliance.incident_response('PRUEBA', 'x')['id'], range(200)))
+    assert len(set(ids)) == 200
+
+@pytest.mark.skipif(gil_activo() or (os.cpu_count() or 1) < 4, reason="requiere CPython sin GIL y 4 CPUs")
+def test_escalado_casi_lineal_sin_gil():
+    resultados = escalado((1, 4), operaciones=40, tam='4KB', nucleo=True)
+    assert resultados[4][2] >= float(os.environ.get('HYDRA_MIN_EFICIENCIA', 0.7))
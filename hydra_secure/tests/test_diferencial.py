@@ -0,0 +1,24 @@
+from benchmarks.diferencial import ejecutar, comprobar_caso
+from hydra_secure.motores import obtener_motor, motores_disponibles
+from hydra_secure.pipeline import cifrar_pipeline, descifrar_pipeline
+from hydra_secure.preparacion import preparar_entrada
+import os
+
+# Casos aleatorios por ejecución; subir con HYDRA_FUZZ_CASOS para campañas largas
+CASOS = int(os.environ.get('HYDRA_FUZZ_CASOS', '400'))
+
+def test_motores_identicos_al_oraculo():
+    assert ejecutar(CASOS, semilla=int(os.environ.get('HYDRA_FUZZ_SEMILLA', '0'))) >= CASOS
+
+def test_clave_no_latin1_solo_falla_si_se_usa():
+    motores = [obtener_motor(nombre) for nombre in motores_disponibles()]
+    for datos in ['', 'ab', 'abcdefgh']:
+        comprobar_caso(motores, (datos, 'clave€', '3f7a', 4, ''))
+
+def test_pipeline_descifra_con_cualquier_motor():
+    mensaje = "Contrato marco de servicios, cláusula 7.2 " * 30
+    for origen in motores_disponibles():
+        cifrado, metadatos = cifrar_pipeline(mensaje, "clave", "user1", doc_type="datos_clientes", motor=origen)
+        for destino in motores_disponibles():
+            assert descifrar_pipeline(cifrado, "clave", "user1", metadatos, doc_type="datos_clientes",
+                                      motor=destino) == preparar_entrada(mensaje)
@@ -0,0 +1,15 @@
+from benchmarks.bench_importacion import medir_importacion
+import os
+import statistics
+
+def test_importar_pipeline_sin_efectos():
+    _, _, pesadas, creados = medir_importacion('hydra_secure.pipeline')
+    # Ni Pillow ni cryptography hasta usar PNG o AES, y sin abrir security_audit.log
+    assert pesadas == []
+    assert creados == []
+
+def test_tiempo_importacion_acotado():
+    # Holgado para máquinas lentas de CI; HYDRA_MAX_IMPORTACION_MS lo ajusta
+    limite_ms = float(os.environ.get('HYDRA_MAX_IMPORTACION_MS', 500))
+    mediana_ms = statistics.median(medir_importacion('hydra_secure.pipeline')[0] for _ in range(3)) / 1000
+    assert mediana_ms < limite_ms
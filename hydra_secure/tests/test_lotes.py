@@ -0,0 +1,92 @@
+from hydra_secure import lotes
+from hydra_secure.lotes import cifrar_directorio, descifrar_directorio, Progreso, NOMBRE_MANIFIESTO
+from hydra_secure.__main__ import main
+import os
+import json
+import logging
+import pytest
+
+OPCIONES = dict(doc_type="datos_clientes", procesos=1)
+
+def _arbol(raiz):
+    archivos = {"informe.txt": b"Balance Q4\n" * 50, "a/datos.bin": bytes(range(256)) * 40,
+                "a/b/vacio": b"", "a/b/nota.txt": b"confidencial"}
+    for rel, contenido in archivos.items():
+        ruta = raiz / rel
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        ruta.write_bytes(contenido)
+    return archivos
+
+def _silencioso():
+    return Progreso(0, salida=None)
+
+def test_directorio_ida_y_vuelta_incremental(tmp_path):
+    archivos = _arbol(tmp_path / "src")
+    resumen = cifrar_directorio(tmp_path / "src", tmp_path / "enc", "clave", "user1", progreso=_silencioso(), **OPCIONES)
+    assert (resumen["procesados"], resumen["omitidos"], resumen["errores"]) == (4, 0, [])
+    assert (tmp_path / "enc" / "a" / "datos.bin.hydra").exists()
+    # Metadatos de tamaño fijo, sin las permutaciones por bloque
+    lateral = tmp_path / "enc" / "a" / "datos.bin.hydra.json"
+    assert "permutaciones" not in json.loads(lateral.read_text())
+    assert lateral.stat().st_size < 1024 < (tmp_path / "enc" / "a" / "datos.bin.hydra").stat().st_size
+    # Sin cambios: nada que hacer; solo mtime cambiado: se compara el hash y se omite
+    os.utime(tmp_path / "src" / "informe.txt", ns=(1, 1))
+    resumen = cifrar_directorio(tmp_path / "src", tmp_path / "enc", "clave", "user1", progreso=_silencioso(), **OPCIONES)
+    assert (resumen["procesados"], resumen["omitidos"]) == (0, 4)
+    (tmp_path / "src" / "a" / "b" / "nota.txt").write_bytes(b"confidencial v2")
+    resumen = cifrar_directorio(tmp_path / "src", tmp_path / "enc", "clave", "user1", progreso=_silencioso(), **OPCIONES)
+    assert (resumen["procesados"], resumen["omitidos"]) == (1, 3)
+    archivos["a/b/nota.txt"] = b"confidencial v2"
+
+    resumen = descifrar_directorio(tmp_path / "enc", tmp_path / "dec", "clave", "user1", progreso=_silencioso(), **OPCIONES)
+    assert resumen["procesados"] == 4 and resumen["errores"] == []
+    for rel, contenido in archivos.items():
+        assert (tmp_path / "dec" / rel).read_bytes() == contenido
+    resumen = descifrar_directorio(tmp_path / "enc", tmp_path / "dec", "clave", "user1", progreso=_silencioso(), **OPCIONES)
+    assert resumen["omitidos"] == 4
+
+def test_reanuda_tras_interrupcion(tmp_path, monkeypatch):
+    _arbol(tmp_path / "src")
+    original = lotes._cifrar_uno
+    llamadas = []
+
+    def interrumpir(*args):
+        llamadas.append(args)
+        if len(llamadas) == 3:
+            raise KeyboardInterrupt
+        return original(*args)
+
+    monkeypatch.setattr(lotes, "_cifrar_uno", interrumpir)
+    with pytest.raises(KeyboardInterrupt):
+        cifrar_directorio(tmp_path / "src", tmp_path / "enc", "clave", "user1", progreso=_silencioso(), **OPCIONES)
+    monkeypatch.setattr(lotes, "_cifrar_uno", original)
+    # Una línea cortada al final del manifiesto no impide reanudar
+    with open(tmp_path / "enc" / NOMBRE_MANIFIESTO, "a") as f:
+        f.write('{"ruta": "a/b/no')
+    resumen = cifrar_directorio(tmp_path / "src", tmp_path / "enc", "clave", "user1", progreso=_silencioso(), **OPCIONES)
+    assert (resumen["procesados"], resumen["omitidos"]) == (2, 2)
+
+@pytest.fixture
+def logging_restaurado():
+    # La CLI configura el logging raíz del proceso: se deja como estaba
+    raiz = logging.getLogger()
+    manejadores, nivel = list(raiz.handlers), raiz.level
+    yield
+    for manejador in raiz.handlers:
+        if manejador not in manejadores:
+            manejador.close()
+    raiz.handlers[:] = manejadores
+    raiz.setLevel(nivel)
+
+def test_cli_errores_por_archivo(tmp_path, capsys, monkeypatch, logging_restaurado):
+    monkeypatch.chdir(tmp_path)
+    _arbol(tmp_path / "src")
+    comun = ["--usuario", "user1", "--doc-type", "datos_clientes", "--procesos", "2", "--silencioso",
+             "--log", str(tmp_path / "auditoria.log")]
+    assert main(["encrypt-dir", str(tmp_path / "src"), str(tmp_path / "enc"), "--clave", "k"] + comun) == 0
+    assert main(["decrypt-dir", str(tmp_path / "enc"), str(tmp_path / "dec"), "--clave", "otra"] + comun) == 1
+    assert "Clave incorrecta" in capsys.readouterr().err
+    assert not any(n != NOMBRE_MANIFIESTO for n in os.listdir(tmp_path / "dec") if os.path.isfile(tmp_path / "dec" / n))
+    # Los procesos de trabajo escriben en el registro de la CLI, no en uno propio
+    assert "user1" in (tmp_path / "auditoria.log").read_text()
+    assert not (tmp_path / "security_audit.log").exists()
@@ -0,0 +1,89 @@
+from hydra_secure import metricas, fusion
+from hydra_secure.motores import motores_disponibles
+from hydra_secure.iso_27001_compliance import iso_compliance
+from hydra_secure.pipeline import cifrar_pipeline, descifrar_pipeline
+import os
+import sys
+import pytest
+
+@pytest.fixture
+def metricas_activas():
+    metricas.reiniciar()
+    metricas.activar(True)
+    yield
+    metricas.activar(False)
+    metricas.reiniciar()
+
+def _valor(datos, nombre, **etiquetas):
+    return sum(c['value'] for c in datos['counters']
+               if c['name'] == nombre and all(c['labels'].get(k) == v for k, v in etiquetas.items()))
+
+def test_metricas_por_etapa(metricas_activas):
+    mensaje = "Contrato de servicios " * 50
+    cifrado, metadatos = cifrar_pipeline(mensaje, "clave", "user1", doc_type="datos_clientes")
+    descifrar_pipeline(cifrado, "clave", "user1", metadatos, doc_type="datos_clientes")
+    datos = metricas.exportar_json()
+    for etapa in ['total', 'preparacion', 'semilla', 'nucleo', 'xor', 'fragmentacion',
+                  'funciones_bloque', 'serializacion', 'reensamblado', 'hash']:
+        assert _valor(datos, 'hydra_etapa_ejecuciones', operacion='cifrar', etapa=etapa) == 1
+    n_bloques = len(metadatos['permutaciones'])
+    assert _valor(datos, 'hydra_bloques', operacion='cifrar') == n_bloques
+    assert _valor(datos, 'hydra_transformaciones', operacion='cifrar') == n_bloques
+    assert _valor(datos, 'hydra_etapa_bytes_salida', operacion='cifrar', etapa='reensamblado') == len(cifrado)
+    assert _valor(datos, 'hydra_etapa_ejecuciones', operacion='descifrar', etapa='nucleo') == 1
+    texto = metricas.exportar_openmetrics()
+    assert '# TYPE hydra_etapa_duracion_segundos histogram' in texto
+    assert 'hydra_etapa_duracion_segundos_bucket{etapa="nucleo",operacion="cifrar",le="+Inf"} 1' in texto
+    assert texto.endswith('# EOF\n')
+    assert iso_compliance.compliance_report()['metrics'] == metricas.exportar_json()
+
+def test_openmetrics_valido_para_parser_estricto(metricas_activas):
+    parser = pytest.importorskip('prometheus_client.openmetrics.parser')
+    cifrado, metadatos = cifrar_pipeline("Contrato de servicios " * 50, "clave", "user1", doc_type="datos_clientes")
+    descifrar_pipeline(cifrado, "clave", "user1", metadatos, doc_type="datos_clientes")
+    metricas.registro.incrementar('hydra_prueba', ruta='C:\\datos\\"q4"\n')
+    familias = {f.name: f for f in parser.text_string_to_metric_families(metricas.exportar_openmetrics())}
+    assert familias['hydra_etapa_duracion_segundos'].type == 'histogram'
+    assert familias['hydra_etapa_ejecuciones'].type == 'counter'
+    assert familias['hydra_prueba'].samples[0].labels == {'ruta': 'C:\\datos\\"q4"\n'}
+
+def test_metricas_desactivadas_no_registran():
+    metricas.reiniciar()
+    assert not metricas.activas()
+    cifrar_pipeline("hola", "clave", "user1", doc_type="datos_clientes")
+    assert metricas.exportar_json() == {'counters': [], 'histograms': [], 'gauges': []}
+    with metricas.etapa('cifrar', 'x') as m:
+        m.salida = 3
+
+# Pico de memoria permitido por motor, en copias del tamaño de entrada (más las
+# permutaciones al cifrar). La referencia materializa el texto con salt, el XOR,
+# la lista de bloques, los bloques modificados y su base64; fusion solo el texto
+# preparado, la salida (búfer y str) y un trozo en curso; numpy las matrices
+# intermedias y el base64 completo. HYDRA_MULTIPLO_MEMORIA fija otro límite.
+COPIAS_MEMORIA = {'referencia': 60, 'fusion': 8, 'numpy': 20}
+
+def _tam_permutaciones(permutaciones):
+    # Las listas compartidas (bloques sin permutar) cuentan una vez
+    return sys.getsizeof(permutaciones) + sum(sys.getsizeof(p) for p in {id(p): p for p in permutaciones}.values())
+
+@pytest.mark.parametrize('motor', ['referencia', 'fusion', 'numpy'])
+def test_pico_memoria_acotado(motor, monkeypatch):
+    if motor not in motores_disponibles():
+        pytest.skip(f"motor {motor} no disponible")
+    # El trozo de fusion lo fija el perfil; aquí uno pequeño y conocido
+    monkeypatch.setattr(fusion, "BLOQUES_POR_TROZO", 1024)
+    copias = float(os.environ.get('HYDRA_MULTIPLO_MEMORIA', COPIAS_MEMORIA[motor]))
+    mensaje = "Informe anual de resultados. " * 2000
+    # Las importaciones perezosas del motor no cuentan
+    cifrar_pipeline("calentamiento", "clave", "user1", doc_type="datos_clientes", motor=motor)
+    with metricas.perfilar_memoria() as informe:
+        cifrado, metadatos = cifrar_pipeline(mensaje, "clave", "user1", doc_type="datos_clientes", motor=motor)
+        descifrar_pipeline(cifrado, "clave", "user1", metadatos, doc_type="datos_clientes", motor=motor)
+    picos = {(e['operacion'], e['etapa']): e['pico_bytes'] for e in informe}
+    assert ('cifrar', 'nucleo') in picos and ('descifrar', 'hash') in picos
+    permutaciones = _tam_permutaciones(metadatos['permutaciones'])
+    assert 0 < picos[('cifrar', 'total')] <= copias * len(mensaje) + permutaciones
+    assert 0 < picos[('descifrar', 'total')] <= copias * len(mensaje)
+    for operacion in ['cifrar', 'descifrar']:
+        # Las etapas anidadas nunca superan el pico de la operación completa
+        assert max(p for (o, _), p in picos.items() if o == operacion) == picos[(operacion, 'total')]
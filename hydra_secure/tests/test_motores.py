@@ -0,0 +1,63 @@
+from hydra_secure.motores import obtener_motor
+from hydra_secure.pipeline import cifrar_pipeline, descifrar_pipeline
+from hydra_secure.preparacion import preparar_entrada
+from hydra_secure.semilla import generar_semilla
+from hydra_secure import fusion
+import hashlib
+import random
+import pytest
+
+def _mensajes():
+    rng = random.Random(7)
+    for longitud in [0, 1, 3, 4, 5, 8, 9, 63, 64, 65, 257]:
+        yield ''.join(chr(rng.randrange(32, 127)) for _ in range(longitud))
+
+def test_motor_numpy_identico_a_referencia():
+    pytest.importorskip("numpy")
+    referencia = obtener_motor('referencia')
+    vectorizado = obtener_motor('numpy')
+    for clave in ["", "k", "otraClave123"]:
+        semilla, _, _ = generar_semilla(clave, "user1", 20240101000000, "uuid-fijo")
+        for tam_bloque in [1, 2, 3, 4, 5, 7, 16]:
+            for datos in _mensajes():
+                esperado = referencia.cifrar(datos, clave, semilla, tam_bloque)
+                assert vectorizado.cifrar(datos, clave, semilla, tam_bloque) == esperado
+                cuerpo, permutaciones = esperado
+                assert vectorizado.descifrar(cuerpo, clave, semilla, permutaciones) == datos
+
+def test_pipeline_motor_numpy():
+    pytest.importorskip("numpy")
+    mensaje = "Reporte Q4: ingresos $15,750,000 " * 20
+    cifrado, metadatos = cifrar_pipeline(mensaje, "clave", "user1", doc_type="datos_clientes", motor="numpy")
+    # Un cifrado del motor vectorizado se descifra con el de referencia y viceversa
+    assert descifrar_pipeline(cifrado, "clave", "user1", metadatos, doc_type="datos_clientes") == preparar_entrada(mensaje)
+    assert descifrar_pipeline(cifrado, "clave", "user1", metadatos, doc_type="datos_clientes",
+                              motor="numpy") == preparar_entrada(mensaje)
+
+def test_motor_fusion_identico_a_referencia(monkeypatch):
+    # Trozos diminutos para ejercitar las fronteras entre trozos
+    monkeypatch.setattr(fusion, "BLOQUES_POR_TROZO", 3)
+    referencia = obtener_motor('referencia')
+    fusionado = obtener_motor('fusion')
+    for clave in ["", "k", "otraClave123"]:
+        semilla, _, _ = generar_semilla(clave, "user1", 20240101000000, "uuid-fijo")
+        for tam_bloque in [1, 3, 4, 5, 16]:
+            for datos in _mensajes():
+                resumen_ref, resumen_fus = hashlib.sha256(), hashlib.sha256()
+                esperado = referencia.cifrar(datos, clave, semilla, tam_bloque, prefijo="SALT1234", resumen=resumen_ref)
+                obtenido = fusionado.cifrar(datos, clave, semilla, tam_bloque, prefijo="SALT1234", resumen=resumen_fus)
+                assert obtenido == esperado
+                assert resumen_fus.hexdigest() == resumen_ref.hexdigest()
+                assert len(obtenido[0]) == fusion.longitud_cuerpo(len(datos) + 8, tam_bloque)
+                assert fusionado.descifrar(obtenido[0], clave, semilla, obtenido[1]) == "SALT1234" + datos
+
+def test_pipeline_motor_fusion():
+    mensaje = "Contrato MegaCorp: $5,000,000 / 24 meses " * 30
+    cifrado, metadatos = cifrar_pipeline(mensaje, "clave", "user1", doc_type="datos_clientes", motor="fusion")
+    assert descifrar_pipeline(cifrado, "clave", "user1", metadatos, doc_type="datos_clientes") == preparar_entrada(mensaje)
+    assert descifrar_pipeline(cifrado, "clave", "user1", metadatos, doc_type="datos_clientes",
+                              motor="fusion") == preparar_entrada(mensaje)
+
+def test_motor_desconocido():
+    with pytest.raises(ValueError):
+        obtener_motor('inexistente')
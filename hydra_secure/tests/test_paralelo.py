@@ -0,0 +1,55 @@
+from hydra_secure import paralelo, fusion
+from hydra_secure.motores import obtener_motor
+from hydra_secure.pipeline import cifrar_pipeline, descifrar_pipeline
+from hydra_secure.preparacion import preparar_entrada
+from hydra_secure.semilla import generar_semilla
+from multiprocessing import shared_memory
+import random
+import pytest
+
+pytestmark = pytest.mark.skipif(not paralelo.disponible(), reason="sin multiprocessing.shared_memory")
+
+@pytest.fixture
+def pool_pequeno(monkeypatch):
+    # Siempre en paralelo, 3 procesos y trozos diminutos para cruzar fronteras de rango y de trozo
+    monkeypatch.setattr(paralelo, "MIN_BYTES_PARALELO", 0)
+    monkeypatch.setattr(fusion, "BLOQUES_POR_TROZO", 3)
+    pool = paralelo.configurar(3)
+    yield pool
+    paralelo.cerrar()
+
+def test_motor_paralelo_identico_a_referencia(pool_pequeno):
+    referencia = obtener_motor('referencia')
+    repartido = obtener_motor('paralelo')
+    rng = random.Random(3)
+    for clave in ["", "k", "otraClave123"]:
+        semilla, _, _ = generar_semilla(clave, "user1", 20240101000000, "uuid-fijo")
+        for tam_bloque in [1, 3, 4, 7, 300]:
+            for longitud in [1, 2, 5, 17, 100, 701]:
+                datos = ''.join(chr(rng.randrange(256)) for _ in range(longitud))
+                esperado = referencia.cifrar(datos, clave, semilla, tam_bloque, prefijo="SALT1234")
+                assert repartido.cifrar(datos, clave, semilla, tam_bloque, prefijo="SALT1234") == esperado
+                cuerpo, permutaciones = esperado
+                assert repartido.descifrar(cuerpo, clave, semilla, permutaciones) == "SALT1234" + datos
+
+def test_segmentos_reutilizados_y_liberados(pool_pequeno):
+    motor = obtener_motor('paralelo')
+    semilla = generar_semilla("clave", "user1", 20240101000000, "uuid-fijo")[0]
+    for _ in range(3):
+        cuerpo, permutaciones = motor.cifrar("Contrato marco " * 50, "clave", semilla, 4)
+        motor.descifrar(cuerpo, "clave", semilla, permutaciones)
+    libres = pool_pequeno.segmentos_libres()
+    # Cifrar y descifrar usan a lo sumo tres segmentos a la vez, que se reutilizan
+    assert 0 < len(libres) <= 3
+    pool_pequeno.cerrar()
+    for nombre in libres:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=nombre)
+
+def test_pipeline_motor_paralelo(pool_pequeno):
+    mensaje = "Reporte Q4: ingresos $15,750,000 " * 40
+    cifrado, metadatos = cifrar_pipeline(mensaje, "clave", "user1", doc_type="datos_clientes", motor="paralelo")
+    assert metadatos['motor'] == 'paralelo'
+    assert descifrar_pipeline(cifrado, "clave", "user1", metadatos, doc_type="datos_clientes") == preparar_entrada(mensaje)
+    assert descifrar_pipeline(cifrado, "clave", "user1", metadatos, doc_type="datos_clientes",
+                              motor="paralelo") == preparar_entrada(mensaje)
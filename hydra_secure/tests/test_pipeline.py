@@ -66,4 +66,80 @@ def test_pipeline_manipulacion():
     metadatos_mal = dict(metadatos)
     metadatos_mal['hash'] = 'hash_incorrecto'
     with pytest.raises(ValueError):
-        descifrar_pipeline(cifrado, clave, usuario, metadatos_mal) 
\ No newline at end of file
+        descifrar_pipeline(cifrado, clave, usuario, metadatos_mal) 
+
+def test_pipeline_rechazo_temprano(monkeypatch):
+    import hydra_secure.pipeline as pipeline
+    cifrado, metadatos = cifrar_pipeline("Reporte confidencial", "clave", "user1", doc_type="datos_clientes")
+    assert 'kcv' in metadatos and 'mac' in metadatos
+
+    # Ningún bloque debe revertirse si la clave o el cuerpo son incorrectos
+    def motor_prohibido(nombre):
+        raise AssertionError("no debe llegar a descifrar bloques")
+    monkeypatch.setattr(pipeline, "obtener_motor", motor_prohibido)
+    with pytest.raises(ValueError, match="Clave incorrecta"):
+        descifrar_pipeline(cifrado, "clave_mal", "user1", metadatos, doc_type="datos_clientes")
+    ultimo = cifrado[-1]
+    manipulado = cifrado[:-1] + ('A' if ultimo != 'A' else 'B')
+    with pytest.raises(ValueError, match="MAC"):
+        descifrar_pipeline(manipulado, "clave", "user1", metadatos, doc_type="datos_clientes")
+    # Quitar el MAC de la cabecera no degrada la verificación
+    cabecera, cuerpo = cifrado.split('\n', 1)
+    import json
+    sin_mac = json.dumps({k: v for k, v in json.loads(cabecera).items() if k != 'mac'}) + '\n' + cuerpo
+    with pytest.raises(ValueError):
+        descifrar_pipeline(sin_mac, "clave", "user1", metadatos, doc_type="datos_clientes")
+
+def test_pipeline_compresion():
+    import json
+    documento = json.dumps({'premium_customers': [{'id': f'CUST_{i:03d}', 'contract_value': '$2,500,000'}
+                                                  for i in range(100)]}, indent=2)
+    limpio = preparar_entrada(documento)
+    for codec in ['zlib', 'lzma', 'bz2', 'auto']:
+        cifrado, metadatos = cifrar_pipeline(documento, "clave", "user1", doc_type="datos_clientes", compresion=codec)
+        assert metadatos['codec'] == ('zlib' if codec == 'auto' else codec)
+        assert len(cifrado) < len(limpio)
+        assert descifrar_pipeline(cifrado, "clave", "user1", metadatos, doc_type="datos_clientes") == limpio
+    # En modo automático los mensajes cortos no se comprimen
+    cifrado, metadatos = cifrar_pipeline("Hola mundo! 123", "clave", "user1", doc_type="datos_clientes", compresion='auto')
+    assert 'codec' not in metadatos
+    assert descifrar_pipeline(cifrado, "clave", "user1", metadatos, doc_type="datos_clientes") == "Hola mundo! 123"
+
+def test_compresion_omite_datos_aleatorios():
+    import os
+    from hydra_secure.compresion import es_compresible, entropia
+    assert entropia(b"aaaa") == 0.0
+    assert not es_compresible(os.urandom(4096))
+    assert es_compresible(b'{"revenue": "$15,750,000"} ' * 100)
+
+def test_compresion_auto_omite_datos_ya_comprimidos():
+    import os
+    import random
+    import string
+    from hydra_secure.compresion import comprimir
+    # Texto imprimible aleatorio (un token, un PNG en base85...): zlib apenas lo reduce
+    aleatorio = ''.join(random.Random(7).choices(string.printable[:95], k=20000))
+    cifrado, metadatos = cifrar_pipeline(aleatorio, "clave", "user1", doc_type="datos_clientes", compresion='auto')
+    assert 'codec' not in metadatos
+    assert descifrar_pipeline(cifrado, "clave", "user1", metadatos, doc_type="datos_clientes") == aleatorio
+    binario = os.urandom(64 * 1024).decode('latin1')
+    assert comprimir(binario, 'auto') == (binario, None)
+    informe = '{"revenue": "$15,750,000", "region": "EMEA"} ' * 500
+    comprimido, codec = comprimir(informe, 'auto')
+    assert codec == 'zlib' and len(comprimido) < len(informe) // 10
+
+def test_pipeline_algoritmos_hash():
+    from hydra_secure.integridad import ALGORITMOS, algoritmo_mas_rapido
+    from hydra_secure.semilla import generar_semilla
+    assert algoritmo_mas_rapido() in ALGORITMOS
+    semilla_b, _, _ = generar_semilla("clave", "user1", 20240101000000, "u", algoritmo='blake2b')
+    semilla_s, _, _ = generar_semilla("clave", "user1", 20240101000000, "u", algoritmo='sha256')
+    assert len(semilla_b) == 128 and len(semilla_s) == 64
+    for algoritmo, mac in [('blake2b', 'blake2b'), ('blake2s', 'hmac-sha256'), ('auto', 'blake2b')]:
+        cifrado, metadatos = cifrar_pipeline("Balance trimestral " * 10, "clave", "user1", doc_type="datos_clientes",
+                                             algoritmo_hash=algoritmo, algoritmo_mac=mac)
+        assert metadatos['hash_alg'] in ALGORITMOS and metadatos['mac_alg'] == mac
+        assert descifrar_pipeline(cifrado, "clave", "user1", metadatos,
+                                  doc_type="datos_clientes") == preparar_entrada("Balance trimestral " * 10)
+    with pytest.raises(ValueError):
+        cifrar_pipeline("x", "clave", "user1", doc_type="datos_clientes", algoritmo_hash='md5')
@@ -0,0 +1,51 @@
+from hydra_secure.pipeline import cifrar_pipeline, descifrar_pipeline, descifrar_rango
+from hydra_secure.archivos import cifrar_archivo, descifrar_rango_archivo
+import random
+import pytest
+
+OPCIONES = dict(doc_type="datos_clientes")
+
+@pytest.mark.parametrize("motor", ["referencia", "fusion", "numpy"])
+@pytest.mark.parametrize("opciones", [{}, {"indice_rango": 3}, {"autocontenido": True}])
+def test_rango_coincide_con_el_descifrado_completo(motor, opciones):
+    if motor == "numpy":
+        pytest.importorskip("numpy")
+    generador = random.Random(46)
+    for longitud in [0, 1, 9, 250]:
+        mensaje = "".join(generador.choice("Informe anual 2024 ") for _ in range(longitud))
+        cifrado, metadatos = cifrar_pipeline(mensaje, "clave", "user1", motor=motor, **opciones, **OPCIONES)
+        completo = descifrar_pipeline(cifrado, "clave", "user1", metadatos, **OPCIONES)
+        for inicio, fin in [(0, 10), (5, 6), (longitud - 3, longitud + 4), (-7, None), (8, 3)]:
+            assert descifrar_rango(cifrado, inicio, fin, "clave", "user1", metadatos,
+                                   **OPCIONES) == completo[inicio:fin]
+
+def test_indice_autentica_solo_los_segmentos_leidos():
+    mensaje = "Pagina 1 del informe. " * 40
+    cifrado, metadatos = cifrar_pipeline(mensaje, "clave", "user1", indice_rango=4, **OPCIONES)
+    assert len(metadatos["indice"]["macs"]) > 10
+    # Un bloque manipulado al final del cuerpo no impide ver la primera página...
+    alterado = cifrado[:-3] + ("A" if cifrado[-3] != "A" else "B") + cifrado[-2:]
+    assert descifrar_rango(alterado, 0, 22, "clave", "user1", metadatos, **OPCIONES) == mensaje[:22]
+    # ...pero sí leer el rango que lo contiene, y sin índice el MAC recorre todo
+    with pytest.raises(ValueError, match="manipulado"):
+        descifrar_rango(alterado, len(mensaje) - 5, None, "clave", "user1", metadatos, **OPCIONES)
+    sin_indice = dict(metadatos)
+    del sin_indice["indice"]
+    with pytest.raises(ValueError, match="manipulado"):
+        descifrar_rango(alterado, 0, 22, "clave", "user1", sin_indice, **OPCIONES)
+    with pytest.raises(ValueError, match="Clave incorrecta"):
+        descifrar_rango(cifrado, 0, 22, "otra", "user1", metadatos, **OPCIONES)
+
+def test_rango_no_admite_compresion():
+    cifrado, metadatos = cifrar_pipeline("texto " * 50, "clave", "user1", compresion="zlib", **OPCIONES)
+    with pytest.raises(ValueError, match="comprimido"):
+        descifrar_rango(cifrado, 0, 10, "clave", "user1", metadatos, **OPCIONES)
+
+def test_rango_de_archivo(tmp_path):
+    contenido = bytes(random.Random(7).randrange(256) for _ in range(50000))
+    plano, cifrado = tmp_path / "plano.bin", tmp_path / "cifrado.hydra"
+    plano.write_bytes(contenido)
+    metadatos = cifrar_archivo(str(plano), str(cifrado), "clave", "user1", indice_rango=True, **OPCIONES)
+    for inicio, fin in [(0, 4096), (12345, 12346), (49990, 60000)]:
+        assert descifrar_rango_archivo(str(cifrado), inicio, fin, "clave", "user1", metadatos,
+                                       **OPCIONES) == contenido[inicio:fin]
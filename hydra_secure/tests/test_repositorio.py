@@ -0,0 +1,66 @@
+from hydra_secure.repositorio import Repositorio, DIRECTORIO_BLOBS
+from hydra_secure.pipeline import cifrar_pipeline, descifrar_pipeline
+import os
+import sqlite3
+import pytest
+
+OPCIONES = dict(doc_type="datos_clientes")
+
+def _lote(n, desplazamiento=0):
+    return [{"id": f"DOC_{i:05d}", "cifrado": f"cifrado {i % 10}", "doc_type": ("contratos", "datos_clientes")[i % 2],
+             "creador": f"user{i % 3}", "metadatos": {"indice": i}, "creado": f"2024-03-{1 + i % 28:02d}T10:{i % 60:02d}"}
+            for i in range(desplazamiento, desplazamiento + n)]
+
+def test_paginacion_filtros_y_blobs_compartidos(tmp_path):
+    with Repositorio(tmp_path) as repositorio:
+        assert repositorio.guardar_lote(_lote(1000)) == 1000
+        # Diez cifrados distintos: diez blobs direccionados por contenido
+        assert sum(len(archivos) for _, _, archivos in os.walk(tmp_path / DIRECTORIO_BLOBS)) == 10
+        vistos, despues = [], None
+        while True:
+            pagina = repositorio.listar(doc_type="contratos", despues=despues, limite=64)
+            if not pagina:
+                break
+            vistos.extend(pagina)
+            despues = (pagina[-1].creado, pagina[-1].id)
+        assert len(vistos) == len({d.id for d in vistos}) == repositorio.contar(doc_type="contratos") == 500
+        assert [d.creado for d in vistos] == sorted((d.creado for d in vistos), reverse=True)
+        assert repositorio.contar(creador="user1", desde="2024-03-10", hasta="2024-03-20") == len(
+            [d for d in _lote(1000) if d["creador"] == "user1" and "2024-03-10" <= d["creado"] < "2024-03-20"])
+        documento = repositorio.obtener("DOC_00042")
+        assert documento._metadatos is None
+        assert documento.metadatos == {"indice": 42} and documento.cifrado == "cifrado 2"
+        with pytest.raises(sqlite3.IntegrityError):
+            repositorio.guardar_lote(_lote(1, 42))
+        assert repositorio.eliminar("DOC_00042") and repositorio.obtener("DOC_00042") is None
+    # Persistente: se reabre con los mismos datos
+    with Repositorio(tmp_path) as repositorio:
+        assert repositorio.contar() == 999
+
+def test_lote_abortado_no_deja_blobs_huerfanos(tmp_path):
+    with Repositorio(tmp_path) as repositorio:
+        repositorio.guardar("DOC_00000", "cifrado existente", "contratos", "user1")
+        lote = [{"id": f"NUEVO_{i}", "cifrado": f"cifrado nuevo {i}", "doc_type": "contratos", "creador": "user1"}
+                for i in range(3)]
+        # El id repetido aborta el lote; el blob ya existente sigue en su sitio
+        lote.append({"id": "DOC_00000", "cifrado": "cifrado existente", "doc_type": "contratos", "creador": "user1"})
+        with pytest.raises(sqlite3.IntegrityError):
+            repositorio.guardar_lote(lote)
+        assert repositorio.contar() == 1
+        assert sum(len(archivos) for _, _, archivos in os.walk(tmp_path / DIRECTORIO_BLOBS)) == 1
+        assert repositorio.obtener("DOC_00000").cifrado == "cifrado existente"
+
+def test_cifrados_reales_y_png_sin_sobrescribir(tmp_path):
+    pytest.importorskip("PIL")
+    with Repositorio(tmp_path / "repo") as repositorio:
+        for i, texto in enumerate(["Contrato A", "Contrato B"]):
+            # Mismo nombre de PNG temporal: el repositorio guarda cada uno aparte
+            ruta = str(tmp_path / "temporal.png")
+            cifrado, metadatos = cifrar_pipeline(texto, "clave", "user1", contenedor_png=True, ruta_png=ruta,
+                                                 **OPCIONES)
+            repositorio.guardar(f"PNG_{i}", cifrado, "datos_clientes", "user1", metadatos, tam_original=len(texto))
+        artefacto, _ = cifrar_pipeline("Contrato C", "clave", "user1", autocontenido=True, **OPCIONES)
+        repositorio.guardar("ART", artefacto, "datos_clientes", "user1")
+        for doc_id, texto in [("PNG_0", "Contrato A"), ("PNG_1", "Contrato B"), ("ART", "Contrato C")]:
+            documento = repositorio.obtener(doc_id)
+            assert descifrar_pipeline(documento.cifrado, "clave", "user1", documento.metadatos, **OPCIONES) == texto
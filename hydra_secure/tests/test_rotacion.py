@@ -0,0 +1,97 @@
+from hydra_secure import rotacion
+from hydra_secure.rotacion import rotar_claves, NOMBRE_PUNTO_CONTROL
+from hydra_secure.lotes import cifrar_directorio, descifrar_directorio, Progreso
+from hydra_secure.iso_27001_compliance import iso_compliance, agrupar_auditoria, ISO27001Compliance
+import os
+import pytest
+
+OPCIONES = dict(doc_type="datos_clientes", procesos=1)
+
+def _almacen(tmp_path, n=5):
+    for i in range(n):
+        (tmp_path / "src" / "docs").mkdir(parents=True, exist_ok=True)
+        (tmp_path / "src" / "docs" / f"doc{i}.bin").write_bytes(bytes(range(256)) * (i + 1))
+    cifrar_directorio(tmp_path / "src", tmp_path / "enc", "clave2024", "user1",
+                      progreso=Progreso(0, salida=None), **OPCIONES)
+    return tmp_path / "enc"
+
+def _descifra_con(tmp_path, clave, destino):
+    return descifrar_directorio(tmp_path / "enc", tmp_path / destino, clave, "user1",
+                                progreso=Progreso(0, salida=None), **OPCIONES)
+
+def test_rotacion_cambia_la_clave_por_lotes(tmp_path):
+    almacen = _almacen(tmp_path)
+    eventos = iso_compliance.total_security_events
+    resumen = rotar_claves(almacen, "clave2024", "clave2025", "user1", tam_lote=2,
+                           progreso=Progreso(0, salida=None), **OPCIONES)
+    assert (resumen["procesados"], resumen["errores"]) == (5, [])
+    # Un evento de auditoría por lote (3 lotes) en lugar de varios por documento
+    assert iso_compliance.total_security_events - eventos == 3
+    assert iso_compliance.security_events[-1]["event_type"] == "AUDIT_BATCH"
+    assert not (almacen / NOMBRE_PUNTO_CONTROL).exists()
+    assert _descifra_con(tmp_path, "clave2025", "dec")["procesados"] == 5
+    for i in range(5):
+        assert (tmp_path / "dec" / "docs" / f"doc{i}.bin").read_bytes() == bytes(range(256)) * (i + 1)
+    assert len(_descifra_con(tmp_path, "clave2024", "dec_vieja")["errores"]) == 5
+
+def test_rotacion_en_procesos_sin_log_propio(tmp_path, monkeypatch):
+    # Los procesos replican el logging del anfitrión: ningún security_audit.log en el directorio actual
+    monkeypatch.chdir(tmp_path)
+    almacen = _almacen(tmp_path)
+    resumen = rotar_claves(almacen, "clave2024", "clave2025", "user1", doc_type="datos_clientes", procesos=2,
+                           tam_lote=2, progreso=Progreso(0, salida=None))
+    assert (resumen["procesados"], resumen["errores"]) == (5, [])
+    assert not (tmp_path / "security_audit.log").exists()
+
+def test_rotacion_reanuda_tras_interrupcion(tmp_path, monkeypatch):
+    almacen = _almacen(tmp_path)
+    original = os.replace
+    renombrados = []
+
+    def cortar(origen, destino):
+        # Se interrumpe entre el cifrado y los metadatos del cuarto documento
+        renombrados.append(destino)
+        if len(renombrados) == 8:
+            raise KeyboardInterrupt
+        return original(origen, destino)
+
+    monkeypatch.setattr(rotacion.os, "replace", cortar)
+    with pytest.raises(KeyboardInterrupt):
+        rotar_claves(almacen, "clave2024", "clave2025", "user1", tam_lote=2,
+                     progreso=Progreso(0, salida=None), **OPCIONES)
+    monkeypatch.setattr(rotacion.os, "replace", original)
+    assert (almacen / NOMBRE_PUNTO_CONTROL).exists()
+    resumen = rotar_claves(almacen, "clave2024", "clave2025", "user1", tam_lote=2,
+                           progreso=Progreso(0, salida=None), **OPCIONES)
+    assert (resumen["procesados"], resumen["omitidos"], resumen["errores"]) == (1, 4, [])
+    assert _descifra_con(tmp_path, "clave2025", "dec")["errores"] == []
+
+def test_rotacion_fallo_entre_renombrados_se_completa(tmp_path, monkeypatch):
+    almacen = _almacen(tmp_path, n=1)
+    original = os.replace
+
+    def fallar_metadatos(origen, destino):
+        # El cifrado nuevo ya está en su sitio; el renombrado de sus metadatos falla
+        if destino.endswith(".json"):
+            raise OSError("disco lleno")
+        return original(origen, destino)
+
+    monkeypatch.setattr(rotacion.os, "replace", fallar_metadatos)
+    resumen = rotar_claves(almacen, "clave2024", "clave2025", "user1", progreso=Progreso(0, salida=None), **OPCIONES)
+    assert len(resumen["errores"]) == 1
+    monkeypatch.setattr(rotacion.os, "replace", original)
+    resumen = rotar_claves(almacen, "clave2024", "clave2025", "user1", progreso=Progreso(0, salida=None), **OPCIONES)
+    assert (resumen["omitidos"], resumen["errores"]) == (1, [])
+    assert _descifra_con(tmp_path, "clave2025", "dec")["errores"] == []
+    assert (tmp_path / "dec" / "docs" / "doc0.bin").read_bytes() == bytes(range(256))
+
+def test_agrupar_auditoria_mantiene_errores():
+    compliance = ISO27001Compliance()
+    with agrupar_auditoria("lote de prueba", compliance) as conteo:
+        compliance.log_security_event("ACCESS_GRANTED", "x")
+        compliance.log_security_event("ACCESS_GRANTED", "y")
+        compliance.audit_trail("PIPELINE_ENTRY", "SYSTEM", {})
+        compliance.log_security_event("MAC_MISMATCH", "z", "ERROR")
+    assert conteo == {"ACCESS_GRANTED": 2, "audit:PIPELINE_ENTRY": 1}
+    assert [e["event_type"] for e in compliance.security_events] == ["MAC_MISMATCH", "AUDIT_BATCH"]
+    assert compliance.audit_log == []
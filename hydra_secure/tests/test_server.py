@@ -0,0 +1,84 @@
+from hydra_secure import server
+from hydra_secure.server import Servidor, Cliente, ServicioSaturado
+from hydra_secure.preparacion import preparar_entrada
+from concurrent.futures import ThreadPoolExecutor
+import time
+import logging
+import pytest
+
+@pytest.fixture(scope="module")
+def servidor():
+    servidor = Servidor(puerto=0, procesos=1).arrancar_en_hilo()
+    yield servidor
+    servidor.detener()
+
+def test_cifrar_y_descifrar_por_el_servicio(servidor):
+    mensaje = "Reporte Q4: ingresos $15,750,000\nmargen 18%"
+    with Cliente(puerto=servidor.puerto) as cliente:
+        cifrado, metadatos = cliente.cifrar(mensaje, "clave", "user1", doc_type="datos_clientes", compresion="zlib")
+        assert cliente.descifrar(cifrado, "clave", "user1", metadatos, doc_type="datos_clientes") == preparar_entrada(mensaje)
+        with pytest.raises(ValueError):
+            cliente.descifrar(cifrado, "otra", "user1", metadatos, doc_type="datos_clientes")
+        with pytest.raises(ValueError):
+            cliente.solicitar("borrar")
+
+def test_control_de_acceso_por_el_servicio(servidor):
+    with Cliente(puerto=servidor.puerto) as cliente:
+        assert cliente.permitido("CEO_001", "reportes_financieros", "decrypt") is True
+        assert cliente.permitido("HACKER_001", "reportes_financieros", "decrypt") is False
+        with pytest.raises(PermissionError):
+            cliente.cifrar("secreto", "clave", "HACKER_001", doc_type="reportes_financieros")
+
+def test_conexiones_reutilizadas_entre_hilos(servidor):
+    atendidas = servidor.atendidas
+    with Cliente(puerto=servidor.puerto, max_conexiones=2) as cliente:
+        def ida_y_vuelta(i):
+            cifrado, metadatos = cliente.cifrar(f"contrato {i}", "clave", "user1", doc_type="datos_clientes")
+            return cliente.descifrar(cifrado, "clave", "user1", metadatos, doc_type="datos_clientes")
+
+        with ThreadPoolExecutor(6) as pool:
+            assert list(pool.map(ida_y_vuelta, range(12))) == [f"contrato {i}" for i in range(12)]
+        # Keep-alive: 24 peticiones por a lo sumo 2 conexiones
+        assert cliente.estado()["conexiones"] <= 2
+    assert servidor.atendidas - atendidas == 24
+
+def test_reconecta_si_el_servicio_cerro_la_conexion_inactiva(servidor, monkeypatch):
+    monkeypatch.setattr(server, "TIEMPO_INACTIVO", 0.5)
+    with Cliente(puerto=servidor.puerto) as cliente:
+        assert "conexiones" in cliente.estado()
+        time.sleep(1.5)
+        # La conexión del pool está cerrada: se descarta y se reintenta en una nueva
+        assert "conexiones" in cliente.estado()
+        assert cliente.permitido("CEO_001", "reportes_financieros", "decrypt") is True
+
+def test_saturado_responde_503():
+    servidor = Servidor(puerto=0, procesos=1, max_pendientes=0).arrancar_en_hilo()
+    try:
+        with Cliente(puerto=servidor.puerto) as cliente:
+            with pytest.raises(ServicioSaturado):
+                cliente.cifrar("hola", "clave", "user1", doc_type="datos_clientes")
+            assert cliente.estado()["rechazadas"] == 1
+    finally:
+        servidor.detener()
+
+def test_procesos_usan_el_logging_del_anfitrion(tmp_path, monkeypatch):
+    # Los procesos replican el logging del anfitrión y no crean un security_audit.log propio
+    monkeypatch.chdir(tmp_path)
+    ruta = tmp_path / "auditoria.log"
+    raiz = logging.getLogger()
+    manejador, nivel = logging.FileHandler(ruta), raiz.level
+    raiz.addHandler(manejador)
+    raiz.setLevel(logging.INFO)
+    try:
+        servidor = Servidor(puerto=0, procesos=1).arrancar_en_hilo()
+        try:
+            with Cliente(puerto=servidor.puerto) as cliente:
+                cliente.cifrar("hola", "clave", "user1", doc_type="datos_clientes")
+        finally:
+            servidor.detener()
+    finally:
+        raiz.removeHandler(manejador)
+        manejador.close()
+        raiz.setLevel(nivel)
+    assert "user1" in ruta.read_text()
+    assert not (tmp_path / "security_audit.log").exists()
@@ -0,0 +1,85 @@
+from hydra_secure import sobres
+from hydra_secure.sobres import (cifrar_para, descifrar_para, conceder, revocar, configurar_clave_maestra,
+                                 cargar_clave_maestra, clave_maestra)
+from hydra_secure.iso_27001_compliance import iso_compliance, ISO27001Compliance
+import os
+import sys
+import pickle
+import subprocess
+import pytest
+
+pytest.importorskip("cryptography")
+
+@pytest.fixture(autouse=True)
+def sin_clave_maestra(monkeypatch):
+    # Cada test parte sin clave maestra, aunque el entorno defina una
+    monkeypatch.delenv("HYDRA_CLAVE_MAESTRA", raising=False)
+    monkeypatch.setattr(sobres, "_clave_maestra", None)
+
+def test_un_cifrado_para_todos_los_autorizados():
+    cifrado, sobre = cifrar_para("Reporte Q4: ingresos $15,750,000", "CFO_001", "reportes_financieros")
+    assert set(sobre["claves"]) == set(iso_compliance.authorized_users("reportes_financieros", "decrypt"))
+    assert "AUD_EXT_001" in sobre["claves"] and "user1" not in sobre["claves"]
+    for lector in ["CEO_001", "AUD_EXT_001", "ACC_001"]:
+        assert descifrar_para(cifrado, sobre, lector) == "Reporte Q4: ingresos $15,750,000"
+    with pytest.raises(PermissionError):
+        descifrar_para(cifrado, sobre, "HACKER_001")
+
+def test_conceder_y_revocar_no_recifran():
+    cifrado, sobre = cifrar_para("Contrato marco", "CFO_001", "contratos", destinatarios=["CFO_001"])
+    with pytest.raises(PermissionError):
+        descifrar_para(cifrado, sobre, "DIR_LEGAL_001")
+    conceder(sobre, "CFO_001", "DIR_LEGAL_001")
+    assert descifrar_para(cifrado, sobre, "DIR_LEGAL_001") == "Contrato marco"
+    # La política manda: no se envuelve la clave para quien no puede leer contratos
+    with pytest.raises(PermissionError):
+        conceder(sobre, "CFO_001", "DIR_SALES_001")
+    revocar(sobre, "DIR_LEGAL_001")
+    with pytest.raises(PermissionError):
+        descifrar_para(cifrado, sobre, "DIR_LEGAL_001")
+
+def test_envoltura_ligada_al_destinatario():
+    cifrado, sobre = cifrar_para("Datos de clientes", "user1", "datos_clientes", destinatarios=["user1", "user2"])
+    # Copiar la envoltura de otro usuario no sirve: está ligada a su KEK y a su identificador
+    sobre["claves"]["user2"] = sobre["claves"]["user1"]
+    with pytest.raises(ValueError, match="manipulada"):
+        descifrar_para(cifrado, sobre, "user2")
+
+def test_sin_clave_maestra_otro_proceso_no_tiene_la_kek(monkeypatch):
+    cifrado, sobre = cifrar_para("Reporte Q4", "CFO_001", "reportes_financieros")
+    assert sobre["kek"] == "memoria"
+    # Otro proceso (otro almacén de claves) no genera una KEK nueva: dice que no la tiene
+    otro = ISO27001Compliance()
+    monkeypatch.setattr(sobres, "iso_compliance", otro)
+    with pytest.raises(ValueError, match="KEK no disponible"):
+        descifrar_para(cifrado, sobre, "CEO_001")
+    assert otro.key_management("kek:CEO_001", "retrieve") is None
+
+def test_sobre_con_clave_maestra_se_abre_en_otro_proceso(tmp_path):
+    maestra = os.urandom(32)
+    configurar_clave_maestra(maestra)
+    cifrado, sobre = cifrar_para("Reporte Q4: ingresos $15,750,000", "CFO_001", "reportes_financieros")
+    assert sobre["kek"].startswith("maestra:")
+    ruta = tmp_path / "sobre.pickle"
+    ruta.write_bytes(pickle.dumps((cifrado, sobre)))
+    raiz = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    codigo = ("import pickle, sys; from hydra_secure.sobres import descifrar_para; "
+              "cifrado, sobre = pickle.load(open(sys.argv[1], 'rb')); print(descifrar_para(cifrado, sobre, 'CEO_001'))")
+    entorno = dict(os.environ, HYDRA_CLAVE_MAESTRA=maestra.hex(), PYTHONPATH=raiz)
+    salida = subprocess.run([sys.executable, "-c", codigo, str(ruta)], env=entorno, cwd=tmp_path,
+                            capture_output=True, text=True, check=True).stdout
+    assert salida.strip() == "Reporte Q4: ingresos $15,750,000"
+    # Con otra clave maestra el error también es de KEK, no de manipulación
+    configurar_clave_maestra(os.urandom(32))
+    with pytest.raises(ValueError, match="KEK no disponible"):
+        descifrar_para(cifrado, sobre, "CEO_001")
+
+def test_cargar_clave_maestra_la_crea_una_vez(tmp_path):
+    ruta = tmp_path / "clave_maestra"
+    cargar_clave_maestra(str(ruta))
+    primera = clave_maestra()
+    assert len(primera) == 32 and ruta.read_bytes() == primera
+    assert ruta.stat().st_mode & 0o077 == 0
+    configurar_clave_maestra(None)
+    cargar_clave_maestra(str(ruta))
+    assert clave_maestra() == primera
@@ -0,0 +1,52 @@
+from hydra_secure.versiones import DocumentoVersionado, cortes
+from hydra_secure.iso_27001_compliance import iso_compliance
+import random
+import pytest
+
+OPCIONES = dict(doc_type="datos_clientes")
+
+def _texto(semilla, palabras=40000):
+    generador = random.Random(semilla)
+    vocabulario = ["informe", "balance", "cliente", "contrato", "anual", "riesgo", "auditoria", "clausula"]
+    return " ".join(generador.choice(vocabulario) for _ in range(palabras))
+
+def _longitudes(documento):
+    return [documento._longitud(id_trozo) for id_trozo in documento.ids()]
+
+def test_edicion_pequena_solo_cifra_trozos_cercanos():
+    documento = DocumentoVersionado()
+    original = _texto(47)
+    primera = documento.guardar(original, "clave", "user1", **OPCIONES)
+    assert primera["nuevos"] == primera["trozos"] > 10
+    editado = original[:150000] + " ANEXO INSERTADO " + original[150000:]
+    eventos = iso_compliance.total_security_events
+    segunda = documento.guardar(editado, "clave", "user1", **OPCIONES)
+    assert segunda["nuevos"] <= 2 and segunda["bytes"] < len(editado) // 5
+    # Un evento por lote de cifrado más el de la versión guardada
+    assert iso_compliance.total_security_events - eventos <= 4
+    # El troceado incremental coincide con trocear el texto entero
+    acumulado, fines = 0, []
+    for longitud in _longitudes(documento):
+        acumulado += longitud
+        fines.append(acumulado)
+    assert fines == cortes(editado.encode("ascii"))
+    # La versión se guarda como delta: copia casi toda la lista anterior
+    delta = documento.versiones[1]["delta"]
+    assert sum(operacion[2] for operacion in delta if operacion[0] == "c") >= primera["trozos"] - 2
+    assert documento.guardar(editado, "clave", "user1", **OPCIONES)["nuevos"] == 0
+    recortado = editado[700:] + " fin"
+    documento.guardar(recortado, "clave", "user1", **OPCIONES)
+    for numero, texto in enumerate([original, editado, editado, recortado]):
+        assert documento.leer("clave", "user1", numero, **OPCIONES) == texto
+
+def test_version_manipulada_o_sin_permiso():
+    documento = DocumentoVersionado()
+    documento.guardar(_texto(1, 3000), "clave", "user1", **OPCIONES)
+    documento.guardar(_texto(2, 3000), "clave", "user1", **OPCIONES)
+    # Reordenar la lista de trozos rompe el MAC de la versión
+    documento.versiones[1]["delta"] = [["n", list(reversed(documento.ids(1)))]]
+    with pytest.raises(ValueError, match="manipulada"):
+        documento.leer("clave", "user1", **OPCIONES)
+    assert documento.leer("clave", "user1", 0, **OPCIONES) == _texto(1, 3000)
+    with pytest.raises(PermissionError):
+        documento.guardar("texto", "clave", "HACKER_001", **OPCIONES)
@@ -0,0 +1,193 @@
+"""
+Documentos versionados con recifrado incremental.
+
+El texto (ya preparado, como en cifrar_pipeline) se corta en trozos definidos
+por el contenido: un hash rodante (gear) marca un corte cuando sus bits altos
+son cero, con un tamaño mínimo y uno máximo. La decisión solo depende de los
+bytes desde el corte anterior, así que una inserción mueve los cortes de su
+entorno y no desplaza los del resto del documento.
+
+Cada trozo se cifra por separado como artefacto autocontenido
+(cifrar_pipeline con autocontenido=True) y se identifica por un HMAC de su
+contenido con la clave. Al guardar una versión nueva, los trozos del
+principio y del final que coinciden con la versión anterior se reconocen sin
+volver a trocearlos, el tramo editado se trocea desde el último corte común
+hasta que vuelve a coincidir con uno antiguo, y solo se cifran los trozos
+cuyo identificador no existe todavía. La versión se guarda como delta sobre
+la anterior (copiar un tramo de su lista de trozos o insertar trozos nuevos)
+con un MAC de la lista completa, y los eventos de auditoría de cada
+operación se agrupan en uno (agrupar_auditoria).
+"""
+import hmac
+import random
+import hashlib
+import datetime
+from difflib import SequenceMatcher
+
+from . import artefacto
+from .pipeline import cifrar_pipeline, descifrar_pipeline, LONGITUD_SALT
+from .preparacion import preparar_entrada
+from .autoajuste import MOTOR_AUTOMATICO
+from .iso_27001_compliance import iso_compliance, agrupar_auditoria
+
+# Trozos de entre 2 KiB y 64 KiB, de unos 10 KiB de media (corte con 13 bits a cero)
+TAM_MINIMO = 2048
+TAM_MAXIMO = 65536
+BITS_CORTE = 13
+_MASCARA = ((1 << BITS_CORTE) - 1) << (64 - BITS_CORTE)
+_VENTANA = 64
+_PRNG_GEAR = random.Random('hydra_secure-gear')
+_GEAR = [_PRNG_GEAR.getrandbits(64) for _ in range(256)]
+
+def cortes(datos, inicio=0, paradas=()):
+    """
+    Posiciones de fin de cada trozo de datos (bytes) a partir de inicio. Se
+    detiene en cuanto un corte cae en paradas (cortes conocidos desde los
+    que el troceado ya coincide).
+    """
+    fin_datos = len(datos)
+    resultado = []
+    while inicio < fin_datos:
+        limite = min(inicio + TAM_MAXIMO, fin_datos)
+        corte = limite
+        h = 0
+        # El hash solo depende de los últimos 64 bytes: basta empezar una ventana antes del mínimo
+        for i in range(max(inicio, inicio + TAM_MINIMO - _VENTANA), limite):
+            h = ((h << 1) + _GEAR[datos[i]]) & 0xFFFFFFFFFFFFFFFF
+            if i + 1 - inicio >= TAM_MINIMO and not h & _MASCARA:
+                corte = i + 1
+                break
+        resultado.append(corte)
+        if corte in paradas:
+            break
+        inicio = corte
+    return resultado
+
+def _identificador(clave, trozo):
+    # HMAC del contenido: mismo trozo, mismo identificador, sin revelarlo sin la clave
+    return hmac.new(clave.encode('utf-8'), b'hydra_secure|trozo|' + trozo, hashlib.sha256).hexdigest()[:32]
+
+def _mac_version(clave, numero, ids):
+    mensaje = f"hydra_secure|version|{numero}|{','.join(ids)}".encode('utf-8')
+    return hmac.new(clave.encode('utf-8'), mensaje, hashlib.sha256).hexdigest()
+
+def _autorizar(id_usuario, doc_type, accion):
+    # Verificación de acceso ISO 27001 A.9.1.1 (aunque no haya trozos que cifrar)
+    if not iso_compliance.access_control(id_usuario, doc_type or 'pipeline', accion):
+        verbo = 'cifrar' if accion == 'encrypt' else 'descifrar'
+        raise PermissionError(f"Usuario {id_usuario} no tiene permisos para {verbo}")
+
+class DocumentoVersionado:
+    """
+    Versiones de un documento como deltas sobre trozos cifrados compartidos.
+    trozos: identificador -> artefacto; versiones: una entrada por versión.
+    """
+
+    def __init__(self, trozos=None, versiones=None):
+        self.trozos = dict(trozos or {})
+        self.versiones = list(versiones or [])
+
+    def ids(self, version=-1):
+        """
+        Identificadores de los trozos de una versión (reaplicando los deltas).
+        """
+        if not self.versiones:
+            return []
+        numero = range(len(self.versiones))[version]
+        ids = []
+        for entrada in self.versiones[:numero + 1]:
+            nuevos = []
+            for operacion in entrada['delta']:
+                if operacion[0] == 'c':
+                    nuevos.extend(ids[operacion[1]:operacion[1] + operacion[2]])
+                else:
+                    nuevos.extend(operacion[1])
+            ids = nuevos
+        return ids
+
+    def _longitud(self, id_trozo):
+        # Sin descifrar: la cabecera del artefacto lleva la longitud con el salt
+        return artefacto.leer(self.trozos[id_trozo])[0]['longitud'] - LONGITUD_SALT
+
+    def _trocear(self, clave, datos, anteriores):
+        # Prefijo y sufijo que no cambiaron (el último trozo antiguo acababa en el fin del texto, no en un corte)
+        prefijo, posicion = 0, 0
+        for id_trozo in anteriores[:-1]:
+            fin = posicion + self._longitud(id_trozo)
+            if fin > len(datos) or _identificador(clave, datos[posicion:fin]) != id_trozo:
+                break
+            prefijo, posicion = prefijo + 1, fin
+        sufijo, inicio_sufijo = [], len(datos)
+        for id_trozo in reversed(anteriores[prefijo:]):
+            inicio = inicio_sufijo - self._longitud(id_trozo)
+            if inicio < posicion or _identificador(clave, datos[inicio:inicio_sufijo]) != id_trozo:
+                break
+            sufijo.append((inicio, inicio_sufijo))
+            inicio_sufijo = inicio
+        sufijo.reverse()
+        # El tramo editado se trocea hasta volver a caer en un corte antiguo
+        paradas = {inicio for inicio, _ in sufijo}
+        tramos = []
+        if posicion not in paradas:
+            for fin in cortes(datos, posicion, paradas):
+                tramos.append((posicion, fin))
+                posicion = fin
+        tramos.extend(tramo for tramo in sufijo if tramo[0] >= posicion)
+        return anteriores[:prefijo], tramos
+
+    def guardar(self, texto, clave, id_usuario, doc_type=None, motor=MOTOR_AUTOMATICO):
+        """
+        Añade una versión con texto y devuelve un resumen: version, trozos,
+        nuevos (trozos cifrados en esta llamada) y bytes cifrados.
+        """
+        _autorizar(id_usuario, doc_type, 'encrypt')
+        datos = preparar_entrada(texto).encode('ascii')
+        anteriores = self.ids()
+        comunes, tramos = self._trocear(clave, datos, anteriores)
+        ids = list(comunes)
+        nuevos = cifrados = 0
+        numero = len(self.versiones)
+        with agrupar_auditoria(f"Version {numero} of {len(tramos)} chunks for user {id_usuario}"):
+            for inicio, fin in tramos:
+                trozo = datos[inicio:fin]
+                id_trozo = _identificador(clave, trozo)
+                if id_trozo not in self.trozos:
+                    self.trozos[id_trozo] = cifrar_pipeline(trozo.decode('ascii'), clave, id_usuario,
+                                                            doc_type=doc_type, motor=motor, autocontenido=True)[0]
+                    nuevos, cifrados = nuevos + 1, cifrados + len(trozo)
+                ids.append(id_trozo)
+        # Delta: tramos copiados de la lista anterior y trozos insertados
+        delta = []
+        for codigo, a1, a2, b1, b2 in SequenceMatcher(None, anteriores, ids, autojunk=False).get_opcodes():
+            if codigo == 'equal':
+                delta.append(['c', a1, a2 - a1])
+            elif b2 > b1:
+                delta.append(['n', ids[b1:b2]])
+        self.versiones.append({'version': numero, 'timestamp': datetime.datetime.now().isoformat(),
+                               'usuario': id_usuario, 'longitud': len(datos), 'delta': delta,
+                               'mac': _mac_version(clave, numero, ids)})
+        iso_compliance.log_security_event('VERSION_SAVED', f"Version {numero} saved ({nuevos} new chunks) "
+                                                           f"for user {id_usuario}")
+        return {'version': numero, 'trozos': len(ids), 'nuevos': nuevos, 'bytes': cifrados}
+
+    def leer(self, clave, id_usuario, version=-1, doc_type=None):
+        """
+        Texto de una versión (la última por defecto).
+        """
+        _autorizar(id_usuario, doc_type, 'decrypt')
+        if not self.versiones:
+            raise ValueError('El documento no tiene versiones.')
+        numero = range(len(self.versiones))[version]
+        ids = self.ids(numero)
+        if not hmac.compare_digest(_mac_version(clave, numero, ids), str(self.versiones[numero].get('mac', ''))):
+            iso_compliance.log_security_event('MAC_MISMATCH', f"Version {numero} list mismatch for user {id_usuario}",
+                                              'ERROR')
+            raise ValueError('La lista de trozos de la versión fue manipulada (MAC no coincide).')
+        partes = []
+        with agrupar_auditoria(f"Read of version {numero} ({len(ids)} chunks) for user {id_usuario}"):
+            for id_trozo in ids:
+                trozo = descifrar_pipeline(self.trozos[id_trozo], clave, id_usuario, doc_type=doc_type)
+                if _identificador(clave, trozo.encode('ascii')) != id_trozo:
+                    raise ValueError('Un trozo no corresponde a su identificador.')
+                partes.append(trozo)
+        return ''.join(partes)
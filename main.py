@@ -1,6 +1,8 @@
 from hydra_secure.pipeline import cifrar_pipeline, descifrar_pipeline
+from hydra_secure.iso_27001_compliance import configurar_logging
 
 if __name__ == "__main__":
+    configurar_logging()
     print("--- DEMO PIPELINE DE CIFRADO/DECIFRADO ---")
     mensaje = input("Mensaje a cifrar: ")
     clave = input("Clave secreta: ")
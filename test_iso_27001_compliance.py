@@ -250,6 +250,21 @@ class TestISO27001Compliance:
         print(f"Última auditoría: {report['last_audit']}")
         print(f"Próxima auditoría: {report['next_audit']}")
 
+    def test_retencion_acotada_de_eventos(self):
+        """A.12.4.1 - La memoria de eventos y auditoría no crece sin límite"""
+        compliance = ISO27001Compliance(max_registros=50)
+        for i in range(500):
+            compliance.log_security_event('TEST_EVENT', f"Evento {i}")
+            compliance.audit_trail('TEST_ACTION', 'test_user', {'i': i})
+        assert len(compliance.security_events) <= 55 and len(compliance.audit_log) <= 55
+        
+        # Se conservan los más recientes y los totales siguen contando todo
+        assert compliance.security_events[-1]['description'] == "Evento 499"
+        assert compliance.audit_log[-1]['details']['i'] == 499
+        report = compliance.compliance_report()
+        assert report['security_events_count'] == 500
+        assert report['audit_entries_count'] == 500
+
 if __name__ == "__main__":
     # Ejecutar tests con salida detallada
     pytest.main([__file__, "-v", "-s"]) 
\ No newline at end of file